@@ -3,101 +3,259 @@ Flask API Backend for PUMA Dashboard
 Provides REST API endpoints to serve UAV telemetry data
 """
 
-from flask import Flask, jsonify, send_from_directory, request
+from flask import Flask, Response, g, jsonify, send_from_directory, request
 from flask_cors import CORS
-import sqlite3
 import pandas as pd
 import numpy as np
-import joblib
-import json
+import hmac
+import ipaddress
 import os
+from urllib.parse import urlencode
+
+from backend.aggregates import read_stats
+from backend.archive import ArchiveReader
+from backend.cache import ResponseCache, request_key, version_etag
+from backend.db import ReadConnectionPool
+from backend.feature_engine import feature_engineering
+from backend.metrics import PROMETHEUS_MIMETYPE, REGISTRY, finish_request, stage, start_request
+from backend.model_registry import ModelRegistry
+from backend.profiler import DEFAULT_DURATION, DEFAULT_INTERVAL, SamplingProfiler
+from backend.rollups import downsample_rollups, newest_bucket, pick_resolution, read_rollups
+from backend.score_store import ScoreStore
+from backend.serialization import (
+    ARROW_MIMETYPE, FORMATS, JSON_MIMETYPE, FastJSONProvider,
+    arrow_stream, dumps, frame_payload, frame_records, msgpack_columns, negotiate
+)
+from backend.stream import TelemetryHub
 
 app = Flask(__name__, static_folder='static')
+app.json = FastJSONProvider(app)  # orjson when installed, NaN -> null
 CORS(app)  # Enable CORS for frontend
 
 # Configuration
-DB_PATH = "data/uav_telemetry.db"
+# Databases, feature list and archive live here (same variable as the producer)
+DATA_DIR = os.environ.get("PUMA_DATA_DIR", "data")
+DB_PATH = os.path.join(DATA_DIR, "uav_telemetry.db")
+SCORES_DB_PATH = os.path.join(DATA_DIR, "telemetry_scores.db")
 MODEL_PATH = "models/lof_novelty.joblib"
 SCALER_PATH = "models/data_scaler.joblib"
-FEATURES_PATH = "data/feature_names.json"
-
-# Load ML assets
-print("Loading ML assets...")
-model = joblib.load(MODEL_PATH)
-scaler = joblib.load(SCALER_PATH)
-with open(FEATURES_PATH, 'r') as f:
-    feature_names = json.load(f)
-print(f"✓ Loaded model with {len(feature_names)} features")
-
-
-def feature_engineering(df):
-    """Feature engineering - must match training pipeline"""
-    df_eng = df.copy()
-
-    # Motor aggregations
-    motor_rpm_cols = ['motor_rpm_1', 'motor_rpm_2', 'motor_rpm_3', 'motor_rpm_4']
-    if all(c in df_eng.columns for c in motor_rpm_cols):
-        df_eng['motor_rpm_std'] = df_eng[motor_rpm_cols].std(axis=1)
-        df_eng['motor_rpm_mean'] = df_eng[motor_rpm_cols].mean(axis=1)
-
-    motor_temp_cols = ['motor_temp_1', 'motor_temp_2', 'motor_temp_3', 'motor_temp_4']
-    if all(c in df_eng.columns for c in motor_temp_cols):
-        df_eng['motor_temp_std'] = df_eng[motor_temp_cols].std(axis=1)
-
-    # Sensor disagreement
-    alt_cols = ['altitude', 'gps_alt', 'lidar_altitude']
-    if all(c in df_eng.columns for c in alt_cols):
-        df_eng['alt_disagreement_std'] = df_eng[alt_cols].std(axis=1)
-
-    # Power system
-    if 'battery_voltage' in df_eng.columns and 'battery_current' in df_eng.columns:
-        df_eng['power_draw'] = df_eng['battery_voltage'] * df_eng['battery_current']
-
-    # Rolling statistics
-    df_eng = df_eng.sort_values(by='timestamp', ascending=True)
-    
-    if 'accel_z' in df_eng.columns:
-        df_eng['roll_accel_z_std'] = df_eng['accel_z'].rolling(window=5, min_periods=1).std()
-
-    if 'gyro_x' in df_eng.columns:
-        df_eng['roll_gyro_x_std'] = df_eng['gyro_x'].rolling(window=5, min_periods=1).std()
-
-    df_eng = df_eng.sort_values(by='timestamp', ascending=False)
-    df_eng = df_eng.fillna(0)
-    
-    return df_eng
+FEATURES_PATH = os.path.join(DATA_DIR, "feature_names.json")
+MODEL_REGISTRY_DIR = "models/registry"
+MODEL_WATCH_INTERVAL = 10  # seconds between registry checks (0 = admin endpoint only)
+# Required in X-Admin-Token for /api/admin/* when set; unset = loopback clients only
+ADMIN_TOKEN = os.environ.get("PUMA_ADMIN_TOKEN")
+# Micro-batching of concurrent scoring calls (see backend/batching.py); off
+# unless a wait is set, since scoring directly was faster in the benchmarks
+SCORE_BATCH_MAX_WAIT_MS = (
+    float(os.environ["PUMA_SCORE_BATCH_WAIT_MS"]) if os.environ.get("PUMA_SCORE_BATCH_WAIT_MS") else None
+)
+SCORE_BATCH_MAX_ROWS = int(os.environ.get("PUMA_SCORE_BATCH_ROWS", 4096))
+# Encoded responses kept for identical requests on unchanged data
+RESPONSE_CACHE_ENTRIES = int(os.environ.get("PUMA_CACHE_ENTRIES", 256))
+RESPONSE_CACHE_MB = int(os.environ.get("PUMA_CACHE_MB", 64))
+# Largest body accepted by POST /api/predict, in rows
+PREDICT_MAX_ROWS = 10000
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+ARCHIVE_FORMAT = "parquet"
+
+# ML assets: newest registry version, else the legacy files above. Loaded in
+# the background so the server is live immediately and ready once it is done.
+model_registry = ModelRegistry(
+    MODEL_REGISTRY_DIR,
+    fallback=(MODEL_PATH, SCALER_PATH, FEATURES_PATH),
+    batching=(
+        {'max_wait': SCORE_BATCH_MAX_WAIT_MS / 1000, 'max_batch': SCORE_BATCH_MAX_ROWS}
+        if SCORE_BATCH_MAX_WAIT_MS is not None else None
+    )
+)
+
+
+def score_features(df_engineered):
+    """
+    Scale engineered features and run the active anomaly model (through the
+    bundle's micro-batcher when PUMA_SCORE_BATCH_WAIT_MS is set)
+    """
+    return model_registry.active.score(df_engineered)
 
 
 def predict_anomalies(df):
-    """Perform anomaly detection on telemetry data"""
+    """Perform anomaly detection on a standalone batch of telemetry data"""
     if df.empty:
         return df
 
-    # Feature engineering
-    df_engineered = feature_engineering(df)
-    
-    # Ensure all features exist
-    missing_cols = set(feature_names) - set(df_engineered.columns)
-    for col in missing_cols:
-        df_engineered[col] = 0
-
-    # Align features
-    df_aligned = df_engineered[feature_names]
-
-    # Scale
-    df_scaled = scaler.transform(df_aligned)
-    
-    # Predict
-    predictions = model.predict(df_scaled)
-    scores = -model.decision_function(df_scaled)
+    # Feature engineering runs oldest row first, like the training pipeline
+    df_sorted = df.sort_values(by='timestamp', ascending=True, kind='stable')
+    with stage('features'):
+        df_engineered = feature_engineering(df_sorted)
+    is_anomaly, scores = score_features(df_engineered)
     
-    # Add results
-    df['is_anomaly'] = (predictions == -1).astype(int)
-    df['anomaly_score'] = scores
+    # Add results (aligned by index)
+    df['is_anomaly'] = pd.Series(is_anomaly, index=df_sorted.index)
+    df['anomaly_score'] = pd.Series(scores, index=df_sorted.index)
     
     return df
 
 
+# Persisted scores: requests only score rows newer than the high-water mark
+score_store = ScoreStore(DB_PATH, SCORES_DB_PATH, score_fn=None)
+
+# Every loaded version (the first one and hot reloads) is swapped into the
+# store, which drops scores of another version
+model_registry.on_swap = lambda bundle: score_store.set_model(bundle.score, bundle.version)
+print("Loading ML assets in the background...")
+model_registry.reload_async()
+if MODEL_WATCH_INTERVAL:
+    model_registry.watch(MODEL_WATCH_INTERVAL)
+
+# Endpoints that score rows and wait for the model (503 until it is loaded)
+MODEL_ENDPOINTS = {
+    'get_telemetry', 'get_stats', 'get_latest_telemetry', 'stream_telemetry',
+    'get_telemetry_history', 'get_telemetry_range', 'get_anomalies', 'predict',
+}
+
+# Long-lived read-only connections shared by all handlers
+read_pool = ReadConnectionPool(DB_PATH, attach={'scores': SCORES_DB_PATH})
+
+# Single shared fan-out for the server-push stream
+telemetry_hub = TelemetryHub(score_store, read_pool, encode=app.json.dumps)
+
+# Responses keyed by endpoint, parameters and data version (see backend/cache.py)
+response_cache = ResponseCache(RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_MB * 1024 * 1024)
+
+# Cold storage written by `python -m backend.archive`
+archive_reader = ArchiveReader(ARCHIVE_DIR, fmt=ARCHIVE_FORMAT)
+
+# Switched on at runtime through /api/admin/profiler
+profiler = SamplingProfiler()
+
+
+def _batcher_stats():
+    active = model_registry.active
+    return active.batcher.stats() if active is not None and active.batcher is not None else {}
+
+
+# Scrape-time values for /metrics, next to the request/stage histograms and
+# scored row counters defined in backend.metrics
+REGISTRY.gauge('puma_model_ready', 'Whether a model version is loaded',
+               lambda: int(model_registry.active is not None))
+REGISTRY.gauge('puma_model_info', 'Active model version (value is always 1)',
+               lambda: {model_registry.active.version: 1} if model_registry.active is not None else None,
+               label='version')
+REGISTRY.gauge('puma_stream_subscribers', 'Open /telemetry/stream clients',
+               lambda: telemetry_hub.subscriber_count)
+REGISTRY.gauge('puma_db_pool_in_use', 'Pooled read connections checked out',
+               lambda: read_pool.stats()['in_use'])
+REGISTRY.gauge('puma_response_cache_lookups_total', 'Response cache lookups by result',
+               lambda: {result: response_cache.stats()[result] for result in ('hits', 'misses', 'coalesced', 'stale')},
+               label='result', kind='counter')
+REGISTRY.gauge('puma_response_cache_bytes', 'Bytes held by the response cache',
+               lambda: response_cache.stats()['bytes'])
+REGISTRY.gauge('puma_scoring_batches_total', 'Model calls made by the micro-batcher',
+               lambda: _batcher_stats().get('batches', 0), kind='counter')
+REGISTRY.gauge('puma_scoring_batch_calls_total', 'Score calls coalesced into those model calls',
+               lambda: _batcher_stats().get('calls', 0), kind='counter')
+REGISTRY.gauge('puma_profiler_running', 'Whether the sampling profiler is running',
+               lambda: int(profiler.running))
+
+
+@app.before_request
+def start_timer():
+    """Collect stage times for the Server-Timing header and latency histogram"""
+    g.request_start = start_request()
+
+
+@app.after_request
+def add_server_timing(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        response.headers['Server-Timing'] = finish_request(
+            start, request.endpoint, request.method, response.status_code
+        )
+    return response
+
+
+@app.before_request
+def require_model():
+    """Answer scoring endpoints with 503 until the first model version is loaded"""
+    if request.endpoint in MODEL_ENDPOINTS and model_registry.active is None:
+        response = jsonify({
+            'error': 'model is loading' if model_registry.last_error is None else 'model failed to load',
+            'detail': model_registry.last_error
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+
+
+def parse_since(conn):
+    """Row id cursor from ?since=<row id> or ?since_ts=<unix timestamp> (0 = no cursor)"""
+    if 'since' in request.args:
+        return int(request.args['since'])
+    if 'since_ts' in request.args:
+        row = conn.execute(
+            "SELECT MAX(rowid) FROM telemetry WHERE timestamp <= ?",
+            (int(request.args['since_ts']),)
+        ).fetchone()
+        return row[0] or 0
+    return 0
+
+
+def binary_response(df, mimetype):
+    """Scored frame as an Arrow IPC stream or a columnar MessagePack body"""
+    if mimetype == ARROW_MIMETYPE:
+        return Response(arrow_stream(df), mimetype=mimetype)
+    return Response(msgpack_columns(df), mimetype=mimetype)
+
+
+def cached(conn, compute, version=None):
+    """
+    Encoded JSON body of this request: from the response cache while the
+    data version (read now unless given) is unchanged, else compute()
+    """
+    return response_cache.get(
+        request_key(request.endpoint, request.args),
+        score_store.data_version(conn) if version is None else version,
+        compute
+    )
+
+
+def json_body(body):
+    """Response for an already encoded JSON body"""
+    return app.response_class(body, mimetype=JSON_MIMETYPE)
+
+
+def check_etag(conn, prepare):
+    """
+    (etag, version) of a conditional request; version is None when the
+    client already holds the current data version (rows, scored range and
+    model version). That is checked before any scoring. Otherwise
+    prepare(conn) scores what the response needs, and the version is read
+    once, after scoring, for both the ETag and the response cache.
+    """
+    if request.if_none_match:
+        etag = version_etag(score_store.data_version(conn))
+        if request.if_none_match.contains(etag):
+            return etag, None
+    prepare(conn)
+    version = score_store.data_version(conn)
+    etag = version_etag(version)
+    return etag, None if request.if_none_match.contains(etag) else version
+
+
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def tagged(response, etag):
+    """Attach the ETag so the next poll can be answered with 304"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
 @app.route('/')
 def index():
     """Serve the dashboard HTML"""
@@ -110,29 +268,36 @@ def get_telemetry():
     Get latest telemetry data with anomaly predictions
     Query params:
     - limit: number of records to return (default: 150)
+    - since / since_ts: only rows newer than this row id / unix timestamp
+    - format: records (default) or columns ({column: [values]})
+    Accept: application/vnd.apache.arrow.stream or application/msgpack
+    returns the rows as a binary columnar body instead of JSON
     """
     try:
         limit = int(request.args.get('limit', 150))
+        fmt = request.args.get('format', 'records')
+        if fmt not in FORMATS:
+            return jsonify({'error': f'unknown format: {fmt}'}), 400
+        mimetype = negotiate(request.accept_mimetypes)
+        if mimetype is None:
+            return jsonify({'error': 'msgpack is not installed on the server'}), 406
         
-        # Connect to database (read-only)
-        db_uri = f'file:{DB_PATH}?mode=ro'
-        conn = sqlite3.connect(db_uri, uri=True)
-        
-        # Fetch data
-        query = f"SELECT * FROM telemetry ORDER BY timestamp DESC LIMIT {limit}"
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        
-        if df.empty:
-            return jsonify([])
-        
-        # Predict anomalies
-        df_results = predict_anomalies(df)
+        # Fetch scored data (read-only, pooled connection)
+        with read_pool.connection() as conn:
+            after_id = parse_since(conn)
+            etag, version = check_etag(conn, lambda conn: score_store.prepare_latest(conn, limit, after_id))
+            if version is None:
+                return not_modified(etag)
+
+            if mimetype == JSON_MIMETYPE:
+                body = cached(conn, lambda: dumps(frame_payload(
+                    score_store.latest(conn, limit, after_id=after_id), fmt
+                )), version)
+                return tagged(json_body(body), etag)
+
+            df_results = score_store.latest(conn, limit, after_id=after_id)
         
-        # Convert to JSON
-        result = df_results.to_dict('records')
-        
-        return jsonify(result)
+        return tagged(binary_response(df_results, mimetype), etag)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -140,102 +305,249 @@ def get_telemetry():
 
 @app.route('/api/stats')
 def get_stats():
-    """Get dashboard statistics"""
+    """
+    Get dashboard statistics
+    total_records counts every stored row. The rates come from running
+    aggregates of scored rows: the top-level ones cover the last hour,
+    `windows` adds the last minute, the current mission (or ?mission_id=)
+    and all scored rows. unscored_records is the scoring backlog those
+    rates do not include yet.
+    """
     try:
-        db_uri = f'file:{DB_PATH}?mode=ro'
-        conn = sqlite3.connect(db_uri, uri=True)
-        
-        # Get total records
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM telemetry")
-        total_records = cursor.fetchone()[0]
-        
-        # Get latest 1000 for stats
-        df = pd.read_sql_query(
-            "SELECT * FROM telemetry ORDER BY timestamp DESC LIMIT 1000",
-            conn
-        )
-        conn.close()
-        
-        if df.empty:
-            return jsonify({
-                'total_records': 0,
-                'anomaly_rate': 0,
-                'avg_altitude': 0,
-                'avg_battery': 0
-            })
-        
-        # Predict anomalies
-        df_results = predict_anomalies(df)
-        
-        stats = {
-            'total_records': total_records,
-            'anomaly_rate': (df_results['is_anomaly'].sum() / len(df_results) * 100),
-            'avg_altitude': df_results['altitude'].mean(),
-            'avg_battery': df_results['battery_level'].mean(),
-            'current_phase': df_results.iloc[0]['mode']
-        }
-        
-        return jsonify(stats)
+        with read_pool.connection() as conn:
+            return json_body(cached(conn, lambda: dumps(
+                read_dashboard_stats(conn, request.args.get('mission_id'))
+            )))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def read_dashboard_stats(conn, mission_id=None):
+    """/api/stats payload: scores new rows, then reads the aggregates"""
+    score_store.score_pending(conn)
+    total_records = score_store.row_count(conn)
+    aggregates = read_stats(conn, mission_id=mission_id)
+
+    if aggregates is None:
+        return {
+            'total_records': total_records,
+            'scored_records': 0,
+            'unscored_records': total_records,
+            'anomaly_rate': 0,
+            'avg_altitude': 0,
+            'avg_battery': 0
+        }
+
+    window = aggregates['windows']['1h']
+    scored_records = aggregates['windows']['all']['records']
+    return {
+        'total_records': total_records,
+        'scored_records': scored_records,
+        'unscored_records': max(0, total_records - scored_records),
+        'anomaly_rate': window['anomaly_rate'],
+        'avg_altitude': window['avg_altitude'],
+        'avg_battery': window['avg_battery'],
+        'current_phase': aggregates['current_phase'],
+        'mission_id': aggregates['mission_id'],
+        'last_timestamp': aggregates['last_timestamp'],
+        'windows': aggregates['windows']
+    }
+
+
 @app.route('/api/health')
 def health_check():
     """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
+    return jsonify(health_payload())
+
+
+def health_payload():
+    """/api/health body, shared with the ASGI server"""
+    active = model_registry.active
+    return {
+        'status': 'healthy' if active is not None else 'starting',
+        'ready': active is not None,
         'database': os.path.exists(DB_PATH),
-        'model_loaded': model is not None
+        'model_loaded': active is not None,
+        'model_version': active.version if active is not None else None,
+        'scorer': active.scorer.kind if active is not None else None,
+        'model_loading': model_registry.loading,
+        'model_error': model_registry.last_error,
+        'stream_subscribers': telemetry_hub.subscriber_count,
+        'db_pool': read_pool.stats(),
+        'response_cache': response_cache.stats(),
+        'scoring_batches': active.batcher.stats() if active is not None and active.batcher is not None else None
+    }
+
+
+@app.route('/api/health/live')
+def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({'status': 'alive'})
+
+
+@app.route('/api/health/ready')
+def readiness():
+    """Readiness probe: 200 once a model is loaded and scoring endpoints work"""
+    active = model_registry.active
+    if active is None:
+        return jsonify({'ready': False, 'loading': model_registry.loading,
+                        'error': model_registry.last_error}), 503
+    return jsonify({'ready': True, 'model_version': active.version})
+
+
+def is_loopback(address):
+    """True for 127.0.0.0/8 and ::1; False for anything else or no address"""
+    try:
+        return ipaddress.ip_address(address).is_loopback
+    except (TypeError, ValueError):
+        return False
+
+
+def admin_allowed():
+    """
+    X-Admin-Token must match PUMA_ADMIN_TOKEN; without a token only
+    loopback clients may use the admin endpoints (the server binds 0.0.0.0)
+    """
+    if not ADMIN_TOKEN:
+        return is_loopback(request.remote_addr)
+    return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN)
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics of this process (text exposition format)"""
+    return Response(REGISTRY.render(), content_type=PROMETHEUS_MIMETYPE)
+
+
+@app.route('/api/admin/profiler')
+def profiler_status():
+    """
+    State of the sampling profiler and its most frequent frames
+    Query params:
+    - folded: 1 returns the folded stacks (flamegraph.pl / speedscope input) as text
+    """
+    if not admin_allowed():
+        return jsonify({'error': 'forbidden'}), 403
+    if request.args.get('folded') == '1':
+        return Response(profiler.folded(), mimetype='text/plain')
+    return jsonify(profiler.status())
+
+
+@app.route('/api/admin/profiler/start', methods=['POST'])
+def start_profiler():
+    """
+    Start sampling every thread's stack
+    Query params:
+    - interval_ms: sampling interval (default: 5)
+    - seconds: stop automatically after this long (default: 30, at most 600)
+    """
+    if not admin_allowed():
+        return jsonify({'error': 'forbidden'}), 403
+    interval = request.args.get('interval_ms', type=float) or DEFAULT_INTERVAL * 1000
+    seconds = request.args.get('seconds', type=float) or DEFAULT_DURATION
+    if not profiler.start(interval=max(interval, 1) / 1000, duration=seconds):
+        return jsonify({'error': 'the profiler is already running'}), 409
+    return jsonify(profiler.status()), 202
+
+
+@app.route('/api/admin/profiler/stop', methods=['POST'])
+def stop_profiler():
+    """Stop the profiler; the samples stay available until the next start"""
+    if not admin_allowed():
+        return jsonify({'error': 'forbidden'}), 403
+    profiler.stop()
+    return jsonify(profiler.status())
+
+
+@app.route('/api/admin/models')
+def list_models():
+    """Registry versions, the active one and the state of a running reload"""
+    if not admin_allowed():
+        return jsonify({'error': 'forbidden'}), 403
+    return jsonify({
+        'active': model_registry.active.describe() if model_registry.active is not None else None,
+        'target': model_registry.target_version(),
+        'versions': model_registry.versions(),
+        'loading': model_registry.loading,
+        'last_error': model_registry.last_error
     })
 
 
+@app.route('/api/admin/models/reload', methods=['POST'])
+def reload_model():
+    """
+    Load a model version in the background and swap it in
+    Query params:
+    - version: registry version to activate (default: pinned or newest)
+    """
+    if not admin_allowed():
+        return jsonify({'error': 'forbidden'}), 403
+    loading = model_registry.reload_async(request.args.get('version'))
+    if loading is None:
+        return jsonify({'error': 'a reload is already running', 'loading': model_registry.loading}), 409
+    return jsonify({'loading': loading}), 202
+
+
+@app.route('/api/predict', methods=['POST'])
+def predict():
+    """
+    Score a standalone batch of telemetry rows (not stored)
+    Body: JSON list of telemetry records, oldest first, or {"rows": [...]}
+    Query params:
+    - format: records (default) or columns ({column: [values]})
+    """
+    try:
+        fmt = request.args.get('format', 'records')
+        if fmt not in FORMATS:
+            return jsonify({'error': f'unknown format: {fmt}'}), 400
+        body = request.get_json(silent=True)
+        rows = body.get('rows') if isinstance(body, dict) else body
+        if not isinstance(rows, list):
+            return jsonify({'error': 'expected a JSON list of telemetry records'}), 400
+        if len(rows) > PREDICT_MAX_ROWS:
+            return jsonify({'error': f'at most {PREDICT_MAX_ROWS} rows per request'}), 413
+
+        df = pd.DataFrame.from_records(rows)
+        if not df.empty and 'timestamp' not in df.columns:
+            return jsonify({'error': 'rows need a timestamp'}), 400
+
+        return jsonify(frame_payload(predict_anomalies(df), fmt))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/telemetry/latest')
 def get_latest_telemetry():
     """
     Get latest telemetry with history
     Query params:
     - history_limit: number of historical records (default: 150)
+    - since / since_ts: only rows newer than this row id / unix timestamp
+    - format: records (default) or columns (history as {column: [values]})
     """
     try:
         history_limit = int(request.args.get('history_limit', 150))
-        print(f"📥 Fetching latest telemetry with history_limit={history_limit}")
-        
-        # Connect to database
-        db_uri = f'file:{DB_PATH}?mode=ro'
-        conn = sqlite3.connect(db_uri, uri=True)
-        print(f"✓ Connected to database: {DB_PATH}")
-        
-        # Fetch data
-        query = f"SELECT * FROM telemetry ORDER BY timestamp DESC LIMIT {history_limit}"
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        print(f"✓ Fetched {len(df)} records from database")
-        
-        if df.empty:
-            print("⚠️ No data found in database")
-            return jsonify({
-                'latest': {},
-                'history': []
-            })
-        
-        # Predict anomalies
-        print("🔮 Running anomaly detection...")
-        df_results = predict_anomalies(df)
-        print(f"✓ Anomaly detection complete")
-        
-        # Get latest and history
-        latest = df_results.iloc[0].to_dict()
-        history = df_results.to_dict('records')
-        
-        print(f"✅ Returning {len(history)} records")
-        return jsonify({
-            'latest': latest,
-            'history': history
-        })
-        
+        fmt = request.args.get('format', 'records')
+        if fmt not in FORMATS:
+            return jsonify({'error': f'unknown format: {fmt}'}), 400
+
+        # Borrow a pooled connection
+        with read_pool.connection() as conn:
+            # Unchanged data: answer 304 without reading or scoring rows
+            after_id = parse_since(conn)
+            etag, version = check_etag(
+                conn, lambda conn: score_store.prepare_latest(conn, history_limit, after_id)
+            )
+            if version is None:
+                return not_modified(etag)
+            
+            # Rows were scored above; identical requests on unchanged data share one encoded body
+            body = cached(conn, lambda: dumps(latest_payload(conn, history_limit, fmt, after_id)), version)
+
+        return tagged(json_body(body), etag)
+
     except Exception as e:
         import traceback
         error_msg = str(e)
@@ -246,16 +558,168 @@ def get_latest_telemetry():
         return jsonify({'error': error_msg, 'trace': stack_trace}), 500
 
 
+def latest_payload(conn, history_limit, fmt, after_id=0):
+    """/telemetry/latest payload: newest row plus history"""
+    df_results = score_store.latest(conn, history_limit, after_id=after_id)
+    if df_results.empty:
+        return {'latest': {}, 'history': frame_payload(df_results, fmt)}
+
+    return {
+        'latest': frame_records(df_results.iloc[:1])[0],
+        'history': frame_payload(df_results, fmt)
+    }
+
+
+@app.route('/telemetry/stream')
+def stream_telemetry():
+    """
+    Server-Sent Events stream: one 'history' event, then a 'telemetry'
+    event for every newly inserted and scored row
+    Query params:
+    - history_limit: number of historical records sent first (default: 150)
+    """
+    history_limit = int(request.args.get('history_limit', 150))
+    return Response(
+        telemetry_hub.stream(history_limit),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/telemetry/history')
+def get_telemetry_history():
+    """
+    Downsampled altitude, battery and anomaly score for charts, served from
+    the 1 s / 10 s / 1 min rollups (cost depends on points, not on the span)
+    Query params:
+    - from / to: unix timestamp range (default: the last 5 minutes of data)
+    - points: maximum points per series (default: 500)
+    - mode: lttb (default) or minmax
+    - vehicle_id: a single vehicle (default: all vehicles combined)
+    """
+    try:
+        points = max(3, int(request.args.get('points', 500)))
+        mode = request.args.get('mode', 'lttb')
+        if mode not in ('lttb', 'minmax'):
+            return jsonify({'error': f'unknown mode: {mode}'}), 400
+        vehicle_id = request.args.get('vehicle_id')
+
+        start_ts = request.args.get('from', type=int)
+        end_ts = request.args.get('to', type=int)
+
+        def compute():
+            # Rows scored here are rolled up in the same transaction
+            score_store.score_pending(conn)
+            return dumps(history_payload(conn, points, mode, vehicle_id, start_ts, end_ts))
+
+        with read_pool.connection() as conn:
+            return json_body(cached(conn, compute))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def history_payload(conn, points, mode, vehicle_id=None, start_ts=None, end_ts=None):
+    """/telemetry/history payload from the rollups committed so far"""
+    newest = newest_bucket(conn)
+    if newest is None:
+        return {'from': None, 'to': None, 'resolution': None, 'series': {}}
+
+    end_ts = end_ts or newest
+    start_ts = start_ts or end_ts - 300
+    resolution = pick_resolution(start_ts, end_ts, points, newest_ts=newest)
+    df_rollups = read_rollups(conn, resolution, start_ts, end_ts, vehicle_id=vehicle_id)
+
+    return {
+        'from': start_ts,
+        'to': end_ts,
+        'resolution': resolution,
+        'mode': mode,
+        'buckets': len(df_rollups),
+        'rows': int(df_rollups['n'].sum()),
+        'anomalies': int(df_rollups['anomalies'].sum()),
+        'series': downsample_rollups(df_rollups, points, mode)
+    }
+
+
+@app.route('/telemetry/range')
+def get_telemetry_range():
+    """
+    Historical telemetry from cold storage (archive files) and the hot table
+    Query params:
+    - from_ts / to_ts: unix timestamp range, inclusive (default: unbounded)
+    - columns: comma-separated fields to return (default: all)
+    - mission_id: only rows of this mission
+    - limit: maximum number of rows, oldest first (default: 10000)
+    - format: records (default) or columns ({column: [values]})
+    Accept: application/vnd.apache.arrow.stream or application/msgpack
+    returns only the rows, as a binary columnar body
+    """
+    try:
+        fmt = request.args.get('format', 'records')
+        if fmt not in FORMATS:
+            return jsonify({'error': f'unknown format: {fmt}'}), 400
+        mimetype = negotiate(request.accept_mimetypes)
+        if mimetype is None:
+            return jsonify({'error': 'msgpack is not installed on the server'}), 406
+        start_ts = request.args.get('from_ts', type=int)
+        end_ts = request.args.get('to_ts', type=int)
+        mission_id = request.args.get('mission_id')
+        limit = int(request.args.get('limit', 10000))
+        columns = request.args.get('columns')
+        columns = [c.strip() for c in columns.split(',') if c.strip()] if columns else None
+
+        with read_pool.connection() as conn:
+            df_results, archive_rows, hot_rows = read_range(conn, start_ts, end_ts, columns, mission_id, limit)
+
+        if mimetype != JSON_MIMETYPE:
+            # Row counts per tier travel as headers next to the binary body
+            response = binary_response(df_results, mimetype)
+            response.headers['X-Archive-Rows'] = str(archive_rows)
+            response.headers['X-Hot-Rows'] = str(hot_rows)
+            return response
+
+        return json_body(dumps(range_payload(df_results, fmt, archive_rows, hot_rows)))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def read_range(conn, start_ts, end_ts, columns, mission_id, limit):
+    """
+    (rows, archive row count, hot row count) for /telemetry/range: the first
+    `limit` rows by id from the archive and the hot table combined
+    """
+    # Archive: memory-mapped files, only the requested columns and days
+    df_archive = archive_reader.read(
+        start_ts, end_ts,
+        columns=None if columns is None else columns + ['is_anomaly', 'anomaly_score'],
+        mission_id=mission_id, limit=limit
+    )
+    df_hot = score_store.between(conn, start_ts, end_ts, columns=columns,
+                                 mission_id=mission_id, limit=limit)
+
+    frames = [df for df in (df_archive, df_hot) if not df.empty]
+    df_results = pd.concat(frames, ignore_index=True) if frames else df_hot
+    df_results = df_results.drop_duplicates(subset='id', keep='last').sort_values('id').head(limit)
+    return df_results, len(df_archive), len(df_hot)
+
+
+def range_payload(df_results, fmt, archive_rows, hot_rows):
+    """/telemetry/range JSON payload"""
+    return {
+        'data': frame_payload(df_results, fmt),
+        'archive_rows': archive_rows,
+        'hot_rows': hot_rows
+    }
+
+
 @app.route('/status')
 def get_database_status():
     """Get database connection status"""
     try:
-        db_uri = f'file:{DB_PATH}?mode=ro'
-        conn = sqlite3.connect(db_uri, uri=True)
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM telemetry")
-        count = cursor.fetchone()[0]
-        conn.close()
+        with read_pool.connection() as conn:
+            count = int(cached(conn, lambda: dumps(score_store.row_count(conn))))
         
         return jsonify({
             'status': 'connected',
@@ -274,42 +738,89 @@ def get_database_status():
 
 @app.route('/telemetry/anomalies')
 def get_anomalies():
-    """Get only anomalous telemetry data"""
+    """
+    Get only anomalous telemetry data, newest first, from the anomaly index
+    Query params:
+    - limit: number of anomalies per page (default: 100)
+    - before / before_id: keyset cursor, only anomalies older than this
+      unix timestamp (and row id); the next page's URL is sent in the Link header
+    - mission_id, event: only anomalies of this mission / event
+    - min_score: only anomalies with at least this anomaly_score
+    - from_ts / to_ts: unix timestamp range, inclusive
+    - since / since_ts: only rows newer than this row id / unix timestamp
+    - format: records (default) or columns ({column: [values]})
+    """
     try:
-        limit = int(request.args.get('limit', 100))
-        
-        # Connect to database
-        db_uri = f'file:{DB_PATH}?mode=ro'
-        conn = sqlite3.connect(db_uri, uri=True)
-        
-        # Fetch data
-        query = f"SELECT * FROM telemetry ORDER BY timestamp DESC LIMIT {limit * 2}"
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        
-        if df.empty:
-            return jsonify([])
-        
-        # Predict anomalies
-        df_results = predict_anomalies(df)
+        fmt = request.args.get('format', 'records')
+        if fmt not in FORMATS:
+            return jsonify({'error': f'unknown format: {fmt}'}), 400
         
-        # Filter only anomalies
-        anomalies = df_results[df_results['is_anomaly'] == 1]
+        # Fetch scored data
+        with read_pool.connection() as conn:
+            # Pages reaching below the scored range still backfill while reading
+            etag, version = check_etag(conn, score_store.score_pending)
+            if version is None:
+                return not_modified(etag)
+
+            body, cursor = cached(conn, lambda: anomaly_page(conn, request.args, parse_since(conn)), version)
         
-        return jsonify(anomalies.to_dict('records'))
+        response = tagged(json_body(body), etag)
+        if cursor is not None:
+            response.headers['Link'] = next_page_link(request.path, request.args, cursor)
+        return response
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def anomaly_page(conn, args, after_id):
+    """
+    (encoded page, next cursor) for /telemetry/anomalies. The cursor is the
+    (timestamp, id) of the page's last row, or None when the page is not full.
+    """
+    limit = int(args.get('limit', 100))
+    before = None
+    if args.get('before') is not None:
+        before_id = args.get('before_id')
+        before = (int(args['before']), int(before_id) if before_id is not None else None)
+    min_score = args.get('min_score')
+    from_ts, to_ts = args.get('from_ts'), args.get('to_ts')
+
+    df = score_store.anomalies(
+        conn, limit, before=before,
+        mission_id=args.get('mission_id'),
+        event=args.get('event'),
+        min_score=float(min_score) if min_score is not None else None,
+        from_ts=int(from_ts) if from_ts is not None else None,
+        to_ts=int(to_ts) if to_ts is not None else None,
+        after_id=after_id or None
+    )
+    cursor = (int(df['timestamp'].iloc[-1]), int(df['id'].iloc[-1])) if len(df) == limit else None
+    return dumps(frame_payload(df, args.get('format', 'records'))), cursor
+
+
+def next_page_link(path, args, cursor):
+    """Link header pointing at the page after cursor, other parameters unchanged"""
+    params = [(name, value) for name in args.keys() for value in args.getlist(name)
+              if name not in ('before', 'before_id')]
+    params += [('before', cursor[0]), ('before_id', cursor[1])]
+    return f'<{path}?{urlencode(params)}>; rel="next"'
+
+
 if __name__ == '__main__':
     print("🚀 Starting PUMA Dashboard API Server...")
     print(f"📊 Dashboard: http://localhost:5000")
     print(f"🔌 API Endpoints:")
     print(f"   - GET /telemetry/latest?history_limit=150")
+    print(f"   - GET /telemetry/stream?history_limit=150 (Server-Sent Events)")
+    print(f"   - GET /telemetry/history?from=&to=&points=500 (downsampled rollups)")
+    print(f"   - GET /telemetry/range?from_ts=&to_ts=&columns= (hot table + archive)")
     print(f"   - GET /status")
-    print(f"   - GET /telemetry/anomalies")
+    print(f"   - GET /telemetry/anomalies?limit=100&before= (keyset pages)")
     print(f"   - GET /api/telemetry")
     print(f"   - GET /api/stats")
-    print(f"   - GET /api/health")
+    print(f"   - GET /api/health (+ /api/health/live, /api/health/ready)")
+    print(f"   - POST /api/predict (score a batch of rows)")
+    print(f"   - GET /api/admin/models, POST /api/admin/models/reload")
+    print(f"   - GET /metrics (Prometheus), /api/admin/profiler (+ /start, /stop)")
     app.run(debug=True, port=5000, host='0.0.0.0')
@@ -0,0 +1,588 @@
+"""
+ASGI (Starlette) variant of the PUMA Dashboard API
+Same routes and responses as api_server.py, served by an event loop:
+    pip install starlette uvicorn
+    uvicorn asgi_server:app --host 0.0.0.0 --port 5000
+
+Idle dashboard polls and SSE streams are coroutines instead of threads, so
+thousands of open connections cost little. Blocking work is moved off the
+loop: database reads and encoding run in a reader thread pool, scoring of
+new rows in a small bounded executor, so slow clients never hold a scoring
+worker. The model registry, score store and connection pool are the ones
+configured in api_server.py.
+"""
+
+import asyncio
+import contextvars
+import functools
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+
+from api_server import (
+    ADMIN_TOKEN, PREDICT_MAX_ROWS, anomaly_page, health_payload, history_payload, is_loopback,
+    latest_payload, model_registry, next_page_link, predict_anomalies, profiler, range_payload,
+    read_dashboard_stats, read_pool, read_range, response_cache, score_store, telemetry_hub
+)
+from backend.metrics import PROMETHEUS_MIMETYPE, REGISTRY, finish_request, start_request
+from backend.profiler import DEFAULT_DURATION, DEFAULT_INTERVAL
+from backend.cache import request_key, version_etag
+from backend.serialization import (
+    ARROW_MIMETYPE, FORMATS, JSON_MIMETYPE, arrow_stream, dumps, frame_payload,
+    msgpack_columns, negotiate
+)
+
+
+# Threads for database reads and response encoding (one pooled connection each)
+READER_THREADS = int(os.environ.get("PUMA_READER_THREADS", 16))
+# Threads scoring new rows; writers serialize on the store's lock anyway
+SCORING_THREADS = int(os.environ.get("PUMA_SCORING_THREADS", 1))
+
+reader_executor = ThreadPoolExecutor(READER_THREADS, thread_name_prefix="db-read")
+scoring_executor = ThreadPoolExecutor(SCORING_THREADS, thread_name_prefix="scoring")
+
+# In-flight score_pending() call shared by concurrent requests
+_scoring = None
+
+
+async def run_read(fn, *args):
+    """Await a blocking read in the reader pool (stage timings count for this request)"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(reader_executor, functools.partial(context.run, fn, *args))
+
+
+def _score_pending():
+    with read_pool.connection() as conn:
+        return score_store.score_pending(conn)
+
+
+async def score_new_rows():
+    """
+    Score rows above the high-water mark in the scoring executor. Requests
+    arriving meanwhile wait for the same run instead of queueing their own;
+    the reads that follow then find nothing left to score.
+    """
+    global _scoring
+    if _scoring is None or _scoring.done():
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        _scoring = loop.run_in_executor(scoring_executor, functools.partial(context.run, _score_pending))
+    await asyncio.shield(_scoring)
+
+
+def json_response(obj, status_code=200, headers=None):
+    return Response(dumps(obj), status_code=status_code, headers=headers,
+                    media_type=JSON_MIMETYPE)
+
+
+def error_response(message, status_code):
+    return json_response({'error': message}, status_code)
+
+
+def requires_model(endpoint):
+    """Answer with 503 until the first model version is loaded"""
+    @functools.wraps(endpoint)
+    async def wrapper(request):
+        if model_registry.active is None:
+            return json_response({
+                'error': 'model is loading' if model_registry.last_error is None else 'model failed to load',
+                'detail': model_registry.last_error
+            }, 503, headers={'Retry-After': '1'})
+        return await endpoint(request)
+    return wrapper
+
+
+def accept_mimetype(request):
+    """Negotiated body type (None: only unavailable msgpack is acceptable)"""
+    return negotiate(parse_accept_header(request.headers.get('accept'), MIMEAccept))
+
+
+def parse_since(conn, params):
+    """Row id cursor from ?since=<row id> or ?since_ts=<unix timestamp> (0 = no cursor)"""
+    if 'since' in params:
+        return int(params['since'])
+    if 'since_ts' in params:
+        row = conn.execute(
+            "SELECT MAX(rowid) FROM telemetry WHERE timestamp <= ?",
+            (int(params['since_ts']),)
+        ).fetchone()
+        return row[0] or 0
+    return 0
+
+
+def int_param(params, name, default=None):
+    value = params.get(name)
+    try:
+        return int(value) if value is not None else default
+    except ValueError:
+        return default
+
+
+def binary_response(df, mimetype, headers=None):
+    """Scored frame as an Arrow IPC stream or a columnar MessagePack body"""
+    if mimetype == ARROW_MIMETYPE:
+        return StreamingResponse(arrow_stream(df), media_type=mimetype, headers=headers)
+    return Response(msgpack_columns(df), media_type=mimetype, headers=headers)
+
+
+def etag_headers(etag):
+    return {'ETag': quote_etag(etag), 'Cache-Control': 'no-cache'}
+
+
+def not_modified(etag):
+    return Response(status_code=304, headers=etag_headers(etag))
+
+
+def cached(request, conn, compute, version=None):
+    """Encoded body from the shared response cache while the data version is unchanged"""
+    return response_cache.get(
+        request_key(request.scope['endpoint'].__name__, request.query_params),
+        score_store.data_version(conn) if version is None else version,
+        compute
+    )
+
+
+def _current_etag():
+    with read_pool.connection() as conn:
+        return version_etag(score_store.data_version(conn))
+
+
+def _read_tagged(if_none_match, prepare, read):
+    """
+    (etag, result): prepare(conn) scores what the response needs, then the
+    data version is read once for the ETag and read(conn, version). result
+    is None when the client already holds that version.
+    """
+    with read_pool.connection() as conn:
+        prepare(conn)
+        version = score_store.data_version(conn)
+        etag = version_etag(version)
+        if parse_etags(if_none_match).contains(etag):
+            return etag, None
+        return etag, read(conn, version)
+
+
+async def tagged_read(request, prepare, read):
+    """
+    (etag, result) as in _read_tagged. A conditional request is checked
+    before new rows are scored, so a 304 costs one version query.
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match:
+        etag = await run_read(_current_etag)
+        if parse_etags(if_none_match).contains(etag):
+            return etag, None
+    await score_new_rows()
+    return await run_read(_read_tagged, if_none_match, prepare, read)
+
+
+async def index(request):
+    """Serve the dashboard HTML"""
+    return FileResponse('dashboard.html')
+
+
+@requires_model
+async def get_telemetry(request):
+    """Latest telemetry data with anomaly predictions (see api_server.get_telemetry)"""
+    try:
+        params = request.query_params
+        limit = int(params.get('limit', 150))
+        fmt = params.get('format', 'records')
+        if fmt not in FORMATS:
+            return error_response(f'unknown format: {fmt}', 400)
+        mimetype = accept_mimetype(request)
+        if mimetype is None:
+            return error_response('msgpack is not installed on the server', 406)
+
+        def prepare(conn):
+            score_store.prepare_latest(conn, limit, parse_since(conn, params))
+
+        def read(conn, version):
+            if mimetype != JSON_MIMETYPE:
+                return score_store.latest(conn, limit, after_id=parse_since(conn, params))
+            return cached(request, conn, lambda: dumps(frame_payload(
+                score_store.latest(conn, limit, after_id=parse_since(conn, params)), fmt
+            )), version)
+
+        etag, result = await tagged_read(request, prepare, read)
+        if result is None:
+            return not_modified(etag)
+        if mimetype != JSON_MIMETYPE:
+            return binary_response(result, mimetype, headers=etag_headers(etag))
+        return Response(result, media_type=JSON_MIMETYPE, headers=etag_headers(etag))
+
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@requires_model
+async def get_stats(request):
+    """Dashboard statistics from the running aggregates (see api_server.get_stats)"""
+    try:
+        mission_id = request.query_params.get('mission_id')
+        await score_new_rows()
+
+        def read():
+            with read_pool.connection() as conn:
+                return cached(request, conn, lambda: dumps(read_dashboard_stats(conn, mission_id)))
+
+        return Response(await run_read(read), media_type=JSON_MIMETYPE)
+
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+async def health_check(request):
+    """Health check endpoint"""
+    return json_response({**health_payload(), 'server': 'asgi'})
+
+
+async def liveness(request):
+    """Liveness probe: the event loop is serving requests"""
+    return json_response({'status': 'alive'})
+
+
+async def readiness(request):
+    """Readiness probe: 200 once a model is loaded and scoring endpoints work"""
+    active = model_registry.active
+    if active is None:
+        return json_response({'ready': False, 'loading': model_registry.loading,
+                              'error': model_registry.last_error}, 503)
+    return json_response({'ready': True, 'model_version': active.version})
+
+
+def admin_allowed(request):
+    """Token check as in api_server.admin_allowed; loopback clients only without a token"""
+    if not ADMIN_TOKEN:
+        return request.client is not None and is_loopback(request.client.host)
+    return hmac.compare_digest(request.headers.get('x-admin-token', ''), ADMIN_TOKEN)
+
+
+async def list_models(request):
+    """Registry versions, the active one and the state of a running reload"""
+    if not admin_allowed(request):
+        return error_response('forbidden', 403)
+    active = model_registry.active
+    return json_response({
+        'active': active.describe() if active is not None else None,
+        'target': model_registry.target_version(),
+        'versions': model_registry.versions(),
+        'loading': model_registry.loading,
+        'last_error': model_registry.last_error
+    })
+
+
+async def reload_model(request):
+    """Load a model version (?version=) in the background and swap it in"""
+    if not admin_allowed(request):
+        return error_response('forbidden', 403)
+    loading = model_registry.reload_async(request.query_params.get('version'))
+    if loading is None:
+        return json_response({'error': 'a reload is already running',
+                              'loading': model_registry.loading}, 409)
+    return json_response({'loading': loading}, 202)
+
+
+@requires_model
+async def predict(request):
+    """Score a standalone batch of telemetry rows (see api_server.predict)"""
+    try:
+        fmt = request.query_params.get('format', 'records')
+        if fmt not in FORMATS:
+            return error_response(f'unknown format: {fmt}', 400)
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+        rows = body.get('rows') if isinstance(body, dict) else body
+        if not isinstance(rows, list):
+            return error_response('expected a JSON list of telemetry records', 400)
+        if len(rows) > PREDICT_MAX_ROWS:
+            return error_response(f'at most {PREDICT_MAX_ROWS} rows per request', 413)
+
+        def score():
+            df = pd.DataFrame.from_records(rows)
+            if not df.empty and 'timestamp' not in df.columns:
+                return None
+            # Reader threads, not the scoring executor: concurrent calls batch together
+            return dumps(frame_payload(predict_anomalies(df), fmt))
+
+        body = await run_read(score)
+        if body is None:
+            return error_response('rows need a timestamp', 400)
+        return Response(body, media_type=JSON_MIMETYPE)
+
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@requires_model
+async def get_latest_telemetry(request):
+    """Latest telemetry with history (see api_server.get_latest_telemetry)"""
+    try:
+        params = request.query_params
+        history_limit = int(params.get('history_limit', 150))
+        fmt = params.get('format', 'records')
+        if fmt not in FORMATS:
+            return error_response(f'unknown format: {fmt}', 400)
+
+        def prepare(conn):
+            score_store.prepare_latest(conn, history_limit, parse_since(conn, params))
+
+        def read(conn, version):
+            return cached(request, conn, lambda: dumps(
+                latest_payload(conn, history_limit, fmt, parse_since(conn, params))
+            ), version)
+
+        etag, body = await tagged_read(request, prepare, read)
+        if body is None:
+            return not_modified(etag)
+        return Response(body, media_type=JSON_MIMETYPE, headers=etag_headers(etag))
+
+    except Exception as e:
+        print(f"❌ ERROR in /telemetry/latest: {e}")
+        return error_response(str(e), 500)
+
+
+@requires_model
+async def stream_telemetry(request):
+    """
+    Server-Sent Events stream: one 'history' event, then a 'telemetry'
+    event for every newly inserted and scored row
+    Query params:
+    - history_limit: number of historical records sent first (default: 150)
+    """
+    history_limit = int(request.query_params.get('history_limit', 150))
+    return StreamingResponse(
+        telemetry_hub.astream(history_limit, run_read),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@requires_model
+async def get_telemetry_history(request):
+    """Downsampled chart series from the rollups (see api_server.get_telemetry_history)"""
+    try:
+        params = request.query_params
+        points = max(3, int(params.get('points', 500)))
+        mode = params.get('mode', 'lttb')
+        if mode not in ('lttb', 'minmax'):
+            return error_response(f'unknown mode: {mode}', 400)
+        vehicle_id = params.get('vehicle_id')
+        start_ts, end_ts = int_param(params, 'from'), int_param(params, 'to')
+
+        await score_new_rows()
+
+        def read():
+            with read_pool.connection() as conn:
+                return cached(request, conn, lambda: dumps(
+                    history_payload(conn, points, mode, vehicle_id, start_ts, end_ts)
+                ))
+
+        return Response(await run_read(read), media_type=JSON_MIMETYPE)
+
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@requires_model
+async def get_telemetry_range(request):
+    """Historical telemetry from the archive and the hot table (see api_server.get_telemetry_range)"""
+    try:
+        params = request.query_params
+        fmt = params.get('format', 'records')
+        if fmt not in FORMATS:
+            return error_response(f'unknown format: {fmt}', 400)
+        mimetype = accept_mimetype(request)
+        if mimetype is None:
+            return error_response('msgpack is not installed on the server', 406)
+        start_ts = int_param(params, 'from_ts')
+        end_ts = int_param(params, 'to_ts')
+        mission_id = params.get('mission_id')
+        limit = int(params.get('limit', 10000))
+        columns = params.get('columns')
+        columns = [c.strip() for c in columns.split(',') if c.strip()] if columns else None
+
+        await score_new_rows()
+
+        def read():
+            with read_pool.connection() as conn:
+                df_results, archive_rows, hot_rows = read_range(conn, start_ts, end_ts, columns, mission_id, limit)
+            if mimetype != JSON_MIMETYPE:
+                return df_results, archive_rows, hot_rows
+            return dumps(range_payload(df_results, fmt, archive_rows, hot_rows)), archive_rows, hot_rows
+
+        result, archive_rows, hot_rows = await run_read(read)
+        if mimetype != JSON_MIMETYPE:
+            return binary_response(result, mimetype, headers={
+                'X-Archive-Rows': str(archive_rows),
+                'X-Hot-Rows': str(hot_rows)
+            })
+        return Response(result, media_type=JSON_MIMETYPE)
+
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+async def get_database_status(request):
+    """Get database connection status"""
+    try:
+        def read():
+            with read_pool.connection() as conn:
+                return int(cached(request, conn, lambda: dumps(score_store.row_count(conn))))
+
+        count = await run_read(read)
+        return json_response({
+            'status': 'connected',
+            'connected': True,
+            'total_records': count,
+            'message': f'Database connected with {count} records'
+        })
+
+    except Exception as e:
+        return json_response({
+            'status': 'disconnected',
+            'connected': False,
+            'message': str(e)
+        }, 500)
+
+
+@requires_model
+async def get_anomalies(request):
+    """Keyset-paginated anomalies from the anomaly index (see api_server.get_anomalies)"""
+    try:
+        params = request.query_params
+        fmt = params.get('format', 'records')
+        if fmt not in FORMATS:
+            return error_response(f'unknown format: {fmt}', 400)
+
+        def read(conn, version):
+            return cached(request, conn, lambda: anomaly_page(conn, params, parse_since(conn, params)), version)
+
+        # New rows are scored by tagged_read; deep pages still backfill while reading
+        etag, page = await tagged_read(request, score_store.score_pending, read)
+        if page is None:
+            return not_modified(etag)
+        body, cursor = page
+        headers = etag_headers(etag)
+        if cursor is not None:
+            headers['Link'] = next_page_link(request.url.path, params, cursor)
+        return Response(body, media_type=JSON_MIMETYPE, headers=headers)
+
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+async def metrics(request):
+    """Prometheus metrics of this process (text exposition format)"""
+    return Response(REGISTRY.render(), headers={'Content-Type': PROMETHEUS_MIMETYPE})
+
+
+async def profiler_status(request):
+    """Sampling profiler state, or its folded stacks with ?folded=1"""
+    if not admin_allowed(request):
+        return error_response('forbidden', 403)
+    if request.query_params.get('folded') == '1':
+        return PlainTextResponse(profiler.folded())
+    return json_response(profiler.status())
+
+
+async def start_profiler(request):
+    """Start sampling (?interval_ms=5&seconds=30)"""
+    if not admin_allowed(request):
+        return error_response('forbidden', 403)
+    try:
+        interval = float(request.query_params.get('interval_ms') or DEFAULT_INTERVAL * 1000)
+        seconds = float(request.query_params.get('seconds') or DEFAULT_DURATION)
+    except ValueError:
+        return error_response('interval_ms and seconds must be numbers', 400)
+    if not profiler.start(interval=max(interval, 1) / 1000, duration=seconds):
+        return error_response('the profiler is already running', 409)
+    return json_response(profiler.status(), 202)
+
+
+async def stop_profiler(request):
+    """Stop the profiler; the samples stay available until the next start"""
+    if not admin_allowed(request):
+        return error_response('forbidden', 403)
+    await run_read(profiler.stop)
+    return json_response(profiler.status())
+
+
+class ServerTimingMiddleware:
+    """Stage timings as a Server-Timing header plus the request latency histogram"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        start = start_request()
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                endpoint = scope.get('endpoint')
+                header = finish_request(start, endpoint.__name__ if endpoint is not None else None,
+                                        scope['method'], message['status'])
+                message['headers'] = list(message.get('headers', [])) + [
+                    (b'server-timing', header.encode('latin-1'))
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    print("🚀 PUMA ASGI server started "
+          f"({READER_THREADS} reader threads, {SCORING_THREADS} scoring threads)")
+    yield
+    reader_executor.shutdown(wait=False, cancel_futures=True)
+    scoring_executor.shutdown(wait=True, cancel_futures=True)
+    read_pool.close_all()
+
+
+routes = [
+    Route('/', index),
+    Route('/api/telemetry', get_telemetry),
+    Route('/api/stats', get_stats),
+    Route('/api/health', health_check),
+    Route('/api/health/live', liveness),
+    Route('/api/health/ready', readiness),
+    Route('/api/admin/models', list_models),
+    Route('/api/admin/models/reload', reload_model, methods=['POST']),
+    Route('/api/predict', predict, methods=['POST']),
+    Route('/api/admin/profiler', profiler_status),
+    Route('/api/admin/profiler/start', start_profiler, methods=['POST']),
+    Route('/api/admin/profiler/stop', stop_profiler, methods=['POST']),
+    Route('/metrics', metrics),
+    Route('/telemetry/latest', get_latest_telemetry),
+    Route('/telemetry/stream', stream_telemetry),
+    Route('/telemetry/history', get_telemetry_history),
+    Route('/telemetry/range', get_telemetry_range),
+    Route('/status', get_database_status),
+    Route('/telemetry/anomalies', get_anomalies),
+]
+
+app = Starlette(
+    routes=routes,
+    middleware=[
+        Middleware(ServerTimingMiddleware),
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+    ],
+    lifespan=lifespan,
+)
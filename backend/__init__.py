@@ -0,0 +1,4 @@
+"""
+Backend components for the PUMA Dashboard API
+Shared by api_server.py; the telemetry producer lives in src/
+"""
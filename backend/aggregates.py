@@ -0,0 +1,222 @@
+"""
+Running dashboard aggregates
+Counters and sums behind /api/stats, updated in the same transaction that
+stores new scores: overall totals, per mission, and per-second / per-minute
+buckets for the sliding windows. Reading the stats is a handful of
+primary-key lookups, independent of the table size.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+AGGREGATE_SCHEMAS = [
+    """
+    CREATE TABLE IF NOT EXISTS stats_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        n INTEGER NOT NULL,
+        anomalies INTEGER NOT NULL,
+        altitude_sum REAL NOT NULL,
+        battery_sum REAL NOT NULL,
+        last_id INTEGER,
+        last_timestamp INTEGER,
+        last_mode TEXT,
+        last_mission_id TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_missions (
+        mission_id TEXT PRIMARY KEY,
+        n INTEGER NOT NULL,
+        anomalies INTEGER NOT NULL,
+        altitude_sum REAL NOT NULL,
+        battery_sum REAL NOT NULL,
+        first_timestamp INTEGER,
+        last_timestamp INTEGER,
+        last_mode TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_seconds (
+        bucket INTEGER PRIMARY KEY,
+        n INTEGER NOT NULL,
+        anomalies INTEGER NOT NULL,
+        altitude_sum REAL NOT NULL,
+        battery_sum REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_minutes (
+        bucket INTEGER PRIMARY KEY,
+        n INTEGER NOT NULL,
+        anomalies INTEGER NOT NULL,
+        altitude_sum REAL NOT NULL,
+        battery_sum REAL NOT NULL
+    )
+    """,
+]
+
+AGGREGATE_TABLES = ('stats_totals', 'stats_missions', 'stats_seconds', 'stats_minutes')
+
+# name -> (bucket table, bucket size, window length in seconds)
+STATS_WINDOWS = {
+    '1m': ('stats_seconds', 1, 60),
+    '1h': ('stats_minutes', 60, 3600),
+}
+# Buckets kept per table, relative to the newest bucket
+STATS_RETENTION = {'stats_seconds': 2 * 3600, 'stats_minutes': 2 * 24 * 3600}
+
+_SUMS = "n = n + excluded.n, anomalies = anomalies + excluded.anomalies, " \
+        "altitude_sum = altitude_sum + excluded.altitude_sum, battery_sum = battery_sum + excluded.battery_sum"
+# Backfilled (older) ids still add to the sums; only a newer batch moves last_*
+_LATEST = ", ".join(
+    f"{col} = CASE WHEN excluded.last_id >= COALESCE(last_id, 0) THEN excluded.{col} ELSE {col} END"
+    for col in ('last_id', 'last_timestamp', 'last_mode', 'last_mission_id')
+)
+
+
+def _summary(keys, anomalies, altitude, battery, timestamps, modes=None):
+    """
+    Per-key counts and sums, first/last timestamp and last non-null mode, as
+    lists. NumPy reductions instead of a pandas groupby, whose fixed cost
+    dominated the usual one-row batch.
+    """
+    groups, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    size = len(groups)
+    first_ts = np.full(size, np.iinfo(np.int64).max)
+    np.minimum.at(first_ts, inverse, timestamps)
+    last_ts = np.full(size, np.iinfo(np.int64).min)
+    np.maximum.at(last_ts, inverse, timestamps)
+    summary = {
+        'key': np.asarray(keys, dtype=object)[first].tolist(),
+        'n': np.bincount(inverse, minlength=size).tolist(),
+        'anomalies': np.bincount(inverse, weights=anomalies, minlength=size).astype(np.int64).tolist(),
+        'altitude_sum': np.bincount(inverse, weights=altitude, minlength=size).tolist(),
+        'battery_sum': np.bincount(inverse, weights=battery, minlength=size).tolist(),
+        'first_timestamp': first_ts.tolist(),
+        'last_timestamp': last_ts.tolist(),
+    }
+    if modes is not None:
+        # Like groupby().last(): the last row of the group with a mode
+        rows = np.where(pd.notna(modes), np.arange(len(keys)), -1)
+        last_row = np.full(size, -1)
+        np.maximum.at(last_row, inverse, rows)
+        summary['last_mode'] = [modes[row] if row >= 0 else None for row in last_row.tolist()]
+    return summary
+
+
+def apply_aggregates(conn, df, is_anomaly, scores):
+    """
+    Add a batch of newly scored rows (oldest first) to every aggregate.
+    Runs on the caller's connection without committing.
+    """
+    if df.empty:
+        return
+    n = len(df)
+    ids = df['id'].to_numpy()
+    timestamps = pd.to_numeric(df['timestamp'], errors='coerce').fillna(0).astype(np.int64).to_numpy()
+    if 'mission_id' in df.columns:
+        mission_ids = df['mission_id'].fillna('').astype(str).to_numpy(dtype=object)
+    else:
+        mission_ids = np.full(n, '', dtype=object)
+    modes = df['mode'].to_numpy(dtype=object) if 'mode' in df.columns else np.full(n, None, dtype=object)
+    anomalies = np.asarray(is_anomaly, dtype=np.int64)
+    altitude = pd.to_numeric(df['altitude'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    battery = pd.to_numeric(df['battery_level'], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+    last_mode = modes[-1] if pd.notna(modes[-1]) else None
+    conn.execute(
+        "INSERT INTO stats_totals (id, n, anomalies, altitude_sum, battery_sum, "
+        "last_id, last_timestamp, last_mode, last_mission_id) VALUES (0, ?, ?, ?, ?, ?, ?, ?, ?) "
+        f"ON CONFLICT(id) DO UPDATE SET {_SUMS}, {_LATEST}",
+        (n, int(anomalies.sum()), float(altitude.sum()), float(battery.sum()),
+         int(ids[-1]), int(timestamps[-1]), last_mode, mission_ids[-1])
+    )
+
+    missions = _summary(mission_ids, anomalies, altitude, battery, timestamps, modes)
+    conn.executemany(
+        "INSERT INTO stats_missions (mission_id, n, anomalies, altitude_sum, battery_sum, "
+        "first_timestamp, last_timestamp, last_mode) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+        f"ON CONFLICT(mission_id) DO UPDATE SET {_SUMS}, "
+        "first_timestamp = MIN(first_timestamp, excluded.first_timestamp), "
+        "last_mode = CASE WHEN excluded.last_timestamp >= last_timestamp "
+        "THEN excluded.last_mode ELSE last_mode END, "
+        "last_timestamp = MAX(last_timestamp, excluded.last_timestamp)",
+        zip(missions['key'], missions['n'], missions['anomalies'], missions['altitude_sum'],
+            missions['battery_sum'], missions['first_timestamp'], missions['last_timestamp'],
+            missions['last_mode'])
+    )
+
+    for table, size, _ in STATS_WINDOWS.values():
+        buckets = _summary(timestamps // size * size, anomalies, altitude, battery, timestamps)
+        conn.executemany(
+            f"INSERT INTO {table} (bucket, n, anomalies, altitude_sum, battery_sum) "
+            f"VALUES (?, ?, ?, ?, ?) ON CONFLICT(bucket) DO UPDATE SET {_SUMS}",
+            zip(buckets['key'], buckets['n'], buckets['anomalies'], buckets['altitude_sum'], buckets['battery_sum'])
+        )
+
+
+def prune_aggregates(conn):
+    """Drop window buckets that no window can reach any more"""
+    for table, retention in STATS_RETENTION.items():
+        conn.execute(
+            f"DELETE FROM {table} WHERE bucket < (SELECT MAX(bucket) FROM {table}) - ?",
+            (retention,)
+        )
+
+
+def aggregates_empty(conn):
+    return conn.execute("SELECT 1 FROM stats_totals LIMIT 1").fetchone() is None
+
+
+def _rates(n, anomalies, altitude_sum, battery_sum):
+    n = n or 0
+    return {
+        'records': n,
+        'anomalies': anomalies or 0,
+        'anomaly_rate': (anomalies / n * 100) if n else 0,
+        'avg_altitude': (altitude_sum / n) if n else 0,
+        'avg_battery': (battery_sum / n) if n else 0,
+    }
+
+
+def read_stats(conn, mission_id=None, schema='scores'):
+    """
+    Totals, the sliding windows ending at the newest scored row, and the
+    current (or given) mission; None when nothing has been scored yet
+    """
+    totals = conn.execute(
+        f"SELECT n, anomalies, altitude_sum, battery_sum, last_timestamp, last_mode, last_mission_id "
+        f"FROM {schema}.stats_totals WHERE id = 0"
+    ).fetchone()
+    if totals is None:
+        return None
+    n, anomalies, altitude_sum, battery_sum, last_timestamp, last_mode, last_mission_id = totals
+
+    windows = {'all': _rates(n, anomalies, altitude_sum, battery_sum)}
+    for name, (table, size, length) in STATS_WINDOWS.items():
+        newest = last_timestamp // size * size
+        row = conn.execute(
+            f"SELECT SUM(n), SUM(anomalies), SUM(altitude_sum), SUM(battery_sum) "
+            f"FROM {schema}.{table} WHERE bucket > ? AND bucket <= ?",
+            (newest - length, newest)
+        ).fetchone()
+        windows[name] = _rates(*row)
+
+    mission_id = last_mission_id if mission_id is None else mission_id
+    row = conn.execute(
+        f"SELECT n, anomalies, altitude_sum, battery_sum, first_timestamp, last_timestamp, last_mode "
+        f"FROM {schema}.stats_missions WHERE mission_id = ?",
+        (mission_id or '',)
+    ).fetchone()
+    if row is not None:
+        windows['mission'] = dict(_rates(*row[:4]), mission_id=mission_id,
+                                  first_timestamp=row[4], last_timestamp=row[5], mode=row[6])
+
+    return {
+        'last_timestamp': last_timestamp,
+        'current_phase': last_mode,
+        'mission_id': last_mission_id,
+        'windows': windows,
+    }
@@ -0,0 +1,116 @@
+"""
+Index of anomalous telemetry rows
+One row per scored anomaly (timestamp, mission, event, score), written in
+the same transaction as the scores. The scores database cannot index
+telemetry columns across the ATTACH boundary, so the columns the anomaly
+list filters and sorts on are copied here. Paging is keyset-based on
+(timestamp, telemetry_id): every page is an index range scan, however rare
+anomalies are and however deep the page.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+ANOMALY_INDEX_TABLE = 'anomaly_index'
+
+ANOMALY_INDEX_SCHEMAS = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {ANOMALY_INDEX_TABLE} (
+        telemetry_id INTEGER PRIMARY KEY,
+        timestamp INTEGER NOT NULL,
+        mission_id TEXT,
+        event TEXT,
+        anomaly_score REAL NOT NULL
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_anomaly_index_time ON {ANOMALY_INDEX_TABLE} (timestamp, telemetry_id)",
+    f"CREATE INDEX IF NOT EXISTS idx_anomaly_index_mission ON {ANOMALY_INDEX_TABLE} (mission_id, timestamp, telemetry_id)",
+    f"CREATE INDEX IF NOT EXISTS idx_anomaly_index_event ON {ANOMALY_INDEX_TABLE} (event, timestamp, telemetry_id)",
+]
+
+
+def _column(df, name):
+    if name not in df.columns:
+        return [None] * len(df)
+    return df[name].astype(object).where(df[name].notna(), None).tolist()
+
+
+def apply_anomaly_index(conn, df, is_anomaly, scores):
+    """
+    Index the anomalous rows of a newly scored batch. Runs on the caller's
+    connection without committing.
+    """
+    if df.empty:
+        return
+    flagged = np.asarray(is_anomaly) == 1
+    ids = df['id'].to_numpy()
+    # A rescored range replaces whatever was indexed for it
+    conn.execute(
+        f"DELETE FROM {ANOMALY_INDEX_TABLE} WHERE telemetry_id >= ? AND telemetry_id <= ?",
+        (int(ids.min()), int(ids.max()))
+    )
+    if not flagged.any():
+        return
+
+    rows = df[flagged]
+    timestamps = pd.to_numeric(rows['timestamp'], errors='coerce').fillna(0).astype(np.int64)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {ANOMALY_INDEX_TABLE} "
+        "(telemetry_id, timestamp, mission_id, event, anomaly_score) VALUES (?, ?, ?, ?, ?)",
+        zip(rows['id'].tolist(), timestamps.tolist(), _column(rows, 'mission_id'),
+            _column(rows, 'event'), np.asarray(scores)[flagged].tolist())
+    )
+
+
+def anomaly_index_stale(conn):
+    """True when stored scores contain anomalies the index does not (scores predating it)"""
+    if conn.execute(f"SELECT 1 FROM {ANOMALY_INDEX_TABLE} LIMIT 1").fetchone():
+        return False
+    return conn.execute("SELECT 1 FROM telemetry_scores WHERE is_anomaly = 1 LIMIT 1").fetchone() is not None
+
+
+def anomaly_page_query(projection, limit, before=None, mission_id=None, event=None,
+                       min_score=None, from_ts=None, to_ts=None, after_id=None, schema='scores'):
+    """
+    (sql, params) for one page of anomalous rows, newest first.
+    before=(timestamp, telemetry_id) continues after the last row of the
+    previous page; before=(timestamp, None) starts below that timestamp.
+    """
+    conditions, params = [], []
+    if before is not None:
+        before_ts, before_id = before
+        if before_id is None:
+            conditions.append("a.timestamp < ?")
+            params.append(int(before_ts))
+        else:
+            conditions.append("(a.timestamp, a.telemetry_id) < (?, ?)")
+            params.extend([int(before_ts), int(before_id)])
+    if mission_id is not None:
+        conditions.append("a.mission_id = ?")
+        params.append(str(mission_id))
+    if event is not None:
+        conditions.append("a.event = ?")
+        params.append(str(event))
+    if min_score is not None:
+        conditions.append("a.anomaly_score >= ?")
+        params.append(float(min_score))
+    if from_ts is not None:
+        conditions.append("a.timestamp >= ?")
+        params.append(int(from_ts))
+    if to_ts is not None:
+        conditions.append("a.timestamp <= ?")
+        params.append(int(to_ts))
+    if after_id is not None:
+        conditions.append("a.telemetry_id > ?")
+        params.append(int(after_id))
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+
+    sql = (
+        f"SELECT {projection}, s.is_anomaly, s.anomaly_score, s.model_version "
+        f"FROM {schema}.{ANOMALY_INDEX_TABLE} a "
+        "JOIN telemetry t ON t.rowid = a.telemetry_id "
+        f"JOIN {schema}.telemetry_scores s ON s.telemetry_id = a.telemetry_id "
+        f"{where}ORDER BY a.timestamp DESC, a.telemetry_id DESC LIMIT ?"
+    )
+    return sql, params + [int(limit)]
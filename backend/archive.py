@@ -0,0 +1,365 @@
+"""
+Columnar cold storage for historical telemetry
+Rows older than a configurable age are moved from the SQLite `telemetry`
+table into day/mission partitioned Parquet (or Arrow IPC) files, so the hot
+table stays small and long-range reads only touch the columns they need.
+
+Layout: <archive_dir>/day=YYYY-MM-DD/mission_id=<id>/part-<first row id>.<ext>
+The day is the UTC date of each row's timestamp, so writer and reader agree
+whatever time zones the producer and the servers run in.
+
+Run as a background process next to the producer:
+    python -m backend.archive --max-age-hours 24 --interval 300
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+
+DEFAULT_ARCHIVE_DIR = "data/archive"
+DEFAULT_MAX_AGE_SECONDS = 24 * 3600
+# Rows moved per transaction; keeps each write lock on the hot table short
+DEFAULT_BATCH_ROWS = 50000
+# Rows collected before files are written; fewer, larger files per mission
+DEFAULT_FLUSH_ROWS = 1000000
+
+FORMATS = {'parquet': 'parquet', 'arrow': 'arrow'}
+PARTITION_SCHEMA = pa.schema([('day', pa.string()), ('mission_id', pa.string())])
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+# Score columns carried over from the score store
+SCORE_FIELDS = [('is_anomaly', pa.int64()), ('anomaly_score', pa.float64())]
+
+SQLITE_TYPES = {'INTEGER': pa.int64(), 'REAL': pa.float64(), 'TEXT': pa.string()}
+
+
+def _file_extension(fmt):
+    return 'parquet' if fmt == 'parquet' else 'arrow'
+
+
+def _partition_value(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return NULL_PARTITION
+    return quote(str(value), safe='')
+
+
+def _utc_day(ts):
+    return time.strftime('%Y-%m-%d', time.gmtime(int(ts)))
+
+
+def _day_keys(df):
+    """Partition day per row: the UTC date of its timestamp"""
+    timestamps = pd.to_numeric(df['timestamp'], errors='coerce')
+    return pd.to_datetime(timestamps, unit='s', utc=True).dt.strftime('%Y-%m-%d').fillna(NULL_PARTITION)
+
+
+class TelemetryArchiver:
+    """
+    Moves old telemetry rows (and their scores) into columnar files.
+    Files are written before the rows are deleted; rows left behind by an
+    interrupted pass are archived again and de-duplicated on read.
+    """
+
+    def __init__(self, db_path, archive_dir=DEFAULT_ARCHIVE_DIR, scores_path=None,
+                 max_age_seconds=DEFAULT_MAX_AGE_SECONDS,
+                 batch_rows=DEFAULT_BATCH_ROWS, flush_rows=DEFAULT_FLUSH_ROWS, fmt='parquet'):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown archive format: {fmt}")
+        self.db_path = db_path
+        self.archive_dir = archive_dir
+        self.scores_path = scores_path
+        self.max_age_seconds = max_age_seconds
+        self.batch_rows = batch_rows
+        self.flush_rows = flush_rows
+        self.fmt = fmt
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA busy_timeout=30000;")
+        has_scores = bool(self.scores_path) and os.path.exists(self.scores_path)
+        if has_scores:
+            conn.execute("ATTACH DATABASE ? AS scores", (self.scores_path,))
+        return conn, has_scores
+
+    def _schema(self, conn):
+        """Arrow schema from the declared SQLite column types, stable across batches"""
+        fields = []
+        for _, name, decl_type, *_ in conn.execute("PRAGMA main.table_info(telemetry)"):
+            if name == 'mission_id':
+                continue  # stored in the partition path
+            arrow_type = pa.int64() if name == 'id' else SQLITE_TYPES.get(decl_type.upper(), pa.float64())
+            fields.append((name, arrow_type))
+        return pa.schema(fields + SCORE_FIELDS)
+
+    def _write_group(self, table, day, mission_id, first_id):
+        directory = os.path.join(
+            self.archive_dir, f"day={_partition_value(day)}", f"mission_id={_partition_value(mission_id)}"
+        )
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{first_id:012d}.{_file_extension(self.fmt)}"
+        # Hidden temp name: dataset discovery skips files starting with '.'
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+
+        if self.fmt == 'parquet':
+            pq.write_table(table, tmp_path, compression='zstd')
+        else:
+            # Uncompressed IPC so readers can memory-map it without copying
+            feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, os.path.join(directory, name))
+
+    def _read_batch(self, conn, has_scores, cutoff, after_id):
+        """Up to batch_rows rows older than cutoff with rowid above after_id"""
+        columns = [row[1] for row in conn.execute("PRAGMA main.table_info(telemetry)") if row[1] != 'id']
+        projection = ", ".join(["t.rowid AS id"] + [f't."{col}"' for col in columns])
+        if has_scores:
+            query = (f"SELECT {projection}, s.is_anomaly, s.anomaly_score FROM telemetry t "
+                     "LEFT JOIN scores.telemetry_scores s ON s.telemetry_id = t.rowid ")
+        else:
+            query = f"SELECT {projection}, NULL AS is_anomaly, NULL AS anomaly_score FROM telemetry t "
+
+        # The newest row always stays: the producer resumes from it
+        return pd.read_sql_query(
+            query + "WHERE t.rowid > ? AND t.timestamp < ? "
+            "AND t.rowid < (SELECT MAX(rowid) FROM telemetry) ORDER BY t.rowid LIMIT ?",
+            conn, params=(after_id, cutoff, self.batch_rows)
+        )
+
+    def _partition(self, df, schema):
+        """Split a batch into Arrow tables keyed by (day, mission_id)"""
+        days = _day_keys(df)
+        missions = df['mission_id'] if 'mission_id' in df.columns else pd.Series(None, index=df.index)
+
+        # One conversion for the whole batch, then a slice per partition
+        table = pa.Table.from_pandas(df.drop(columns=['mission_id'], errors='ignore'),
+                                     schema=schema, preserve_index=False)
+        groups = pd.DataFrame({'day': days, 'mission_id': missions.fillna(NULL_PARTITION)}) \
+            .groupby(['day', 'mission_id'], sort=False).indices
+        return {key: table.take(rows) for key, rows in groups.items()}
+
+    def _delete(self, conn, has_scores, first_id, last_id, cutoff):
+        """Remove archived rows in batch_rows-sized transactions"""
+        # Same predicate as the read: rows in the id range older than the cutoff
+        for lo in range(first_id, last_id + 1, self.batch_rows):
+            hi = min(last_id, lo + self.batch_rows - 1)
+            conn.execute("DELETE FROM telemetry WHERE rowid BETWEEN ? AND ? AND timestamp < ?", (lo, hi, cutoff))
+            conn.commit()
+        if has_scores:
+            conn.execute(
+                "DELETE FROM scores.telemetry_scores WHERE telemetry_id <= ? "
+                "AND telemetry_id NOT IN (SELECT rowid FROM telemetry WHERE rowid <= ?)",
+                (last_id, last_id)
+            )
+            conn.commit()
+
+    def archive_once(self, now=None):
+        """
+        Move every row older than max_age_seconds; returns the number moved.
+        Rows are read in batches and collected per partition until
+        flush_rows is reached, so each file holds many batches' worth of a mission.
+        """
+        cutoff = int((time.time() if now is None else now) - self.max_age_seconds)
+        conn, has_scores = self._connect()
+        moved = 0
+        try:
+            schema = self._schema(conn)
+            last_id = 0
+            while True:
+                first_id, pending, buffered = None, {}, 0
+                while buffered < self.flush_rows:
+                    df = self._read_batch(conn, has_scores, cutoff, last_id)
+                    if df.empty:
+                        break
+                    if first_id is None:
+                        first_id = int(df['id'].iloc[0])
+                    last_id = int(df['id'].iloc[-1])
+                    for key, table in self._partition(df, schema).items():
+                        pending.setdefault(key, []).append(table)
+                    buffered += len(df)
+
+                if not buffered:
+                    break
+
+                # Files first, then the rows: an interrupted pass never loses data
+                for (day, mission_id), tables in pending.items():
+                    self._write_group(pa.concat_tables(tables), day,
+                                      None if mission_id == NULL_PARTITION else mission_id, first_id)
+                self._delete(conn, has_scores, first_id, last_id, cutoff)
+                moved += buffered
+                print(f"📦 Archived {buffered} rows into {len(pending)} files ({moved} this pass)")
+        finally:
+            conn.close()
+        return moved
+
+    def run_forever(self, interval):
+        """Background loop: archive, then sleep `interval` seconds"""
+        while True:
+            try:
+                moved = self.archive_once()
+                if moved:
+                    print(f"✓ Moved {moved} rows to {self.archive_dir}")
+            except Exception as e:
+                print(f"❌ Archive error: {e}")
+            time.sleep(interval)
+
+
+class ArchiveReader:
+    """
+    Reads historical ranges from the archive through a memory-mapped
+    filesystem, loading only the requested columns and partitions.
+    """
+
+    def __init__(self, archive_dir=DEFAULT_ARCHIVE_DIR, fmt='parquet'):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown archive format: {fmt}")
+        self.archive_dir = archive_dir
+        self.fmt = fmt
+        self._filesystem = pa.fs.LocalFileSystem(use_mmap=True)
+        # (files, unified schema) of the last discovery; footers are read once per file set
+        self._schema_cache = None
+
+    def _dataset(self):
+        if not os.path.isdir(self.archive_dir):
+            return None
+        dataset = ds.dataset(
+            self.archive_dir, format=FORMATS[self.fmt], filesystem=self._filesystem,
+            partitioning=ds.HivePartitioning(PARTITION_SCHEMA, null_fallback=NULL_PARTITION, segment_encoding='uri'),
+            exclude_invalid_files=False
+        )
+        if not dataset.files:
+            return None
+        return dataset.replace_schema(self._unified_schema(dataset))
+
+    def _unified_schema(self, dataset):
+        """
+        Union of every file's columns. Discovery only inspects the first
+        file, which drops columns added to the telemetry table later on.
+        """
+        files = tuple(dataset.files)
+        cached = self._schema_cache
+        if cached is not None and cached[0] == files:
+            return cached[1]
+        schema = pa.unify_schemas(
+            [fragment.physical_schema for fragment in dataset.get_fragments()] + [PARTITION_SCHEMA]
+        )
+        self._schema_cache = (files, schema)
+        return schema
+
+    @staticmethod
+    def _first_id(fragment):
+        """Smallest row id in a file, from its part-<first row id> name"""
+        name = os.path.basename(fragment.path)
+        try:
+            return int(name.split('-', 1)[1].split('.', 1)[0])
+        except (IndexError, ValueError):
+            return 0
+
+    def _read_limited(self, dataset, columns, condition, limit):
+        """
+        The `limit` lowest ids matching condition. Files are visited in
+        first-id order and each holds its rows in id order, so the scan stops
+        once no remaining file can start below the limit-th id collected.
+        """
+        fragments = sorted(dataset.get_fragments(filter=condition), key=self._first_id)
+        tables, ids = [], None
+        for fragment in fragments:
+            if ids is not None and len(ids) >= limit and self._first_id(fragment) > ids[limit - 1]:
+                break
+            scanner = ds.Scanner.from_fragment(fragment, schema=dataset.schema, columns=columns, filter=condition)
+            table = scanner.head(limit)
+            if table.num_rows == 0:
+                continue
+            tables.append(table)
+            ids = np.unique(np.concatenate([ids, table.column('id').to_numpy()]) if ids is not None
+                            else table.column('id').to_numpy())
+        if not tables:
+            return None
+        return pa.concat_tables(tables)
+
+    def read(self, start_ts=None, end_ts=None, columns=None, mission_id=None, limit=None):
+        """
+        Archived rows with start_ts <= timestamp <= end_ts, oldest first.
+        columns limits the result to these fields (id and timestamp are always included).
+        limit returns only the first `limit` rows by id and stops reading early.
+        """
+        dataset = self._dataset()
+        if dataset is None:
+            return pd.DataFrame()
+
+        if columns is not None:
+            available = set(dataset.schema.names)
+            columns = ['id', 'timestamp'] + [c for c in columns if c in available and c not in ('id', 'timestamp')]
+
+        conditions = []
+        if start_ts is not None:
+            conditions.append(ds.field('timestamp') >= int(start_ts))
+            # Partition pruning: whole day directories are skipped. One day of
+            # margin keeps archives partitioned by the producer's local date readable
+            conditions.append(ds.field('day') >= _utc_day(int(start_ts) - 86400))
+        if end_ts is not None:
+            conditions.append(ds.field('timestamp') <= int(end_ts))
+            conditions.append(ds.field('day') <= _utc_day(int(end_ts) + 86400))
+        if mission_id is not None:
+            conditions.append(ds.field('mission_id') == str(mission_id))
+
+        condition = None
+        for c in conditions:
+            condition = c if condition is None else condition & c
+
+        if limit is None:
+            table = dataset.to_table(columns=columns, filter=condition)
+        else:
+            table = self._read_limited(dataset, columns, condition, limit)
+        if table is None or table.num_rows == 0:
+            return pd.DataFrame(columns=columns or dataset.schema.names)
+
+        df = table.sort_by('id').to_pandas()
+        # A re-run after an interrupted pass may have written a row twice
+        df = df.drop_duplicates(subset='id', keep='last').reset_index(drop=True)
+        return df if limit is None else df.head(limit)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Move old telemetry into columnar cold storage")
+    parser.add_argument("--db", default="data/uav_telemetry.db", help="Telemetry database")
+    parser.add_argument("--scores", default="data/telemetry_scores.db", help="Score store database")
+    parser.add_argument("--out", default=DEFAULT_ARCHIVE_DIR, help="Archive directory")
+    parser.add_argument("--max-age-hours", type=float, default=DEFAULT_MAX_AGE_SECONDS / 3600,
+                        help="Archive rows older than this (default: 24)")
+    parser.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS,
+                        help="Rows moved per transaction (default: 50000)")
+    parser.add_argument("--flush-rows", type=int, default=DEFAULT_FLUSH_ROWS,
+                        help="Rows collected before files are written (default: 1000000)")
+    parser.add_argument("--format", choices=sorted(FORMATS), default='parquet',
+                        help="File format (default: parquet)")
+    parser.add_argument("--interval", type=float, default=0,
+                        help="Repeat every N seconds (default: run once)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    archiver = TelemetryArchiver(
+        args.db, args.out, scores_path=args.scores,
+        max_age_seconds=args.max_age_hours * 3600,
+        batch_rows=args.batch_rows, flush_rows=args.flush_rows, fmt=args.format
+    )
+    print(f"🗄️  Archiving rows older than {args.max_age_hours:g} h from {args.db} to {args.out} ({args.format})")
+    if args.interval > 0:
+        archiver.run_forever(args.interval)
+    else:
+        moved = archiver.archive_once()
+        print(f"✓ Moved {moved} rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+Micro-batching in front of the anomaly model
+Concurrent score calls are collected for a few milliseconds and run as one
+vectorized scorer call. Rows are not deduplicated. The score store claims
+rows by id under its lock, so its chunks never overlap and there is no
+repeated id to key on. /api/predict rows carry no id, and finding identical
+feature rows meant sorting every batch, which cost more than it saved.
+
+There is no scheduler thread: the first caller of a batch collects it and
+runs the model, the others wait for their slice of the result. A caller
+that arrives while the model is idle is scored at once; batches only form
+while another batch is being scored, so a lone request pays no extra wait.
+A batch takes whole calls up to max_batch rows (a single larger call is
+scored alone); calls left over are handed to the next leader.
+
+The score store scores new rows under its own lock, so its calls never
+overlap each other; what coalesces are /api/predict requests, with each
+other and with the store's scoring.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+
+# Longest time a batch leader waits for more callers (seconds)
+DEFAULT_MAX_WAIT = 0.002
+# Rows after which a batch is run without waiting further
+DEFAULT_MAX_BATCH = 4096
+# Upper bounds of the batch size histogram (rows per model call)
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 50, 150, 500, 2000, 10000)
+
+
+class _Call:
+    """One caller's rows and, once scored, its results"""
+
+    __slots__ = ('X', 'done', 'lead', 'result', 'error')
+
+    def __init__(self, X):
+        self.X = X
+        self.done = threading.Event()
+        self.lead = False
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent score(X) calls into one score_fn call.
+    score_fn(X) -> (is_anomaly, anomaly_score) arrays, one entry per row of X.
+    """
+
+    def __init__(self, score_fn, max_wait=DEFAULT_MAX_WAIT, max_batch=DEFAULT_MAX_BATCH):
+        self.score_fn = score_fn
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+
+        self._cond = threading.Condition()
+        self._pending = []
+        self._pending_rows = 0
+        self._collecting = False
+        self._running = 0
+
+        self._stats = {
+            'calls': 0,
+            'batches': 0,
+            'rows': 0,
+            'max_batch_rows': 0,
+            'wait_seconds': 0.0,
+            'score_seconds': 0.0,
+        }
+        self._histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    def score(self, X):
+        """(is_anomaly, anomaly_score) for the rows of X, possibly batched with other callers"""
+        X = np.ascontiguousarray(X, dtype=float)
+        if len(X) == 0:
+            return self.score_fn(X)
+        call = _Call(X)
+        with self._cond:
+            self._stats['calls'] += 1
+            self._pending.append(call)
+            self._pending_rows += len(X)
+            leader = not self._collecting
+            if leader:
+                self._collecting = True
+            elif self._pending_rows >= self.max_batch:
+                self._cond.notify_all()
+
+        if leader:
+            self._lead()
+
+        call.done.wait()
+        while call.lead:
+            # Left over by a full batch: this call collects the next one
+            call.lead = False
+            call.done.clear()
+            self._lead()
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _lead(self):
+        start = time.perf_counter()
+        with self._cond:
+            # Only wait for company while the model is busy with another batch
+            if self._running:
+                self._cond.wait_for(
+                    lambda: self._pending_rows >= self.max_batch or not self._running,
+                    timeout=self.max_wait
+                )
+            batch, rows = [], 0
+            for call in self._pending:
+                if batch and rows + len(call.X) > self.max_batch:
+                    break
+                batch.append(call)
+                rows += len(call.X)
+            self._pending = self._pending[len(batch):]
+            self._pending_rows -= rows
+            if self._pending:
+                successor = self._pending[0]
+                successor.lead = True
+                successor.done.set()
+            else:
+                self._collecting = False
+            self._running += 1
+            self._stats['wait_seconds'] += time.perf_counter() - start
+
+        try:
+            self._run(batch)
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._cond.notify_all()
+
+    def _run(self, batch):
+        try:
+            X = batch[0].X if len(batch) == 1 else np.concatenate([call.X for call in batch])
+            start = time.perf_counter()
+            is_anomaly, scores = self.score_fn(X)
+            elapsed = time.perf_counter() - start
+            is_anomaly, scores = np.asarray(is_anomaly), np.asarray(scores)
+        except Exception as e:
+            for call in batch:
+                call.error = e
+                call.done.set()
+            return
+
+        offset = 0
+        for call in batch:
+            end = offset + len(call.X)
+            call.result = (is_anomaly[offset:end], scores[offset:end])
+            offset = end
+            call.done.set()
+
+        with self._cond:
+            self._stats['batches'] += 1
+            self._stats['rows'] += len(X)
+            self._stats['max_batch_rows'] = max(self._stats['max_batch_rows'], len(X))
+            self._stats['score_seconds'] += elapsed
+            self._histogram[np.searchsorted(BATCH_SIZE_BUCKETS, len(X))] += 1
+
+    def stats(self):
+        """Counters plus the batch size histogram (rows per model call)"""
+        with self._cond:
+            stats = dict(self._stats)
+            histogram = list(self._histogram)
+        batches = stats['batches']
+        stats['calls_per_batch'] = stats['calls'] / batches if batches else 0.0
+        stats['mean_batch_rows'] = stats['rows'] / batches if batches else 0.0
+        stats['batch_rows_histogram'] = {
+            **{f"le_{bound}": count for bound, count in zip(BATCH_SIZE_BUCKETS, histogram)},
+            'inf': histogram[-1],
+        }
+        stats['max_wait_ms'] = self.max_wait * 1000
+        stats['max_batch'] = self.max_batch
+        return stats
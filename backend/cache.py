@@ -0,0 +1,130 @@
+"""
+In-process cache of encoded responses
+Entries are keyed by (endpoint, query parameters) and stamped with the data
+version read just before they were computed (see ScoreStore.data_version;
+the body may already contain a few later commits). A lookup only
+hits when the caller's version matches, so a commit by the producer (or a
+model swap) invalidates every entry without any notification; stale entries
+are replaced on the next miss or evicted as least recently used.
+
+Identical requests that miss at the same time are computed once
+("single-flight"): the first caller computes, the others wait for its result.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def request_key(endpoint, args):
+    """Cache key of a request: endpoint plus its sorted query parameters"""
+    return (endpoint, tuple(sorted((name, tuple(args.getlist(name))) for name in args.keys())))
+
+
+def version_etag(version):
+    """Opaque ETag of a data version: changes with new rows, backfills and model swaps"""
+    return hashlib.blake2b(repr(version).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _size(value):
+    """Bytes held by an entry: the body, or the body of a (body, extra...) tuple"""
+    return len(value[0]) if isinstance(value, tuple) else len(value)
+
+
+class ResponseCache:
+    """
+    Bounded LRU of encoded bodies (bytes, or a tuple of the body and small
+    extras such as paging cursors). compute() is only called on a miss, once
+    per (key, version) however many callers are waiting.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()  # key -> (version, body)
+        self._bytes = 0
+        self._in_flight = {}           # (key, version) -> Future
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'stale': 0,
+            'evictions': 0,
+        }
+
+    def get(self, key, version, compute):
+        """Body for key at version: cached, another caller's result, or compute()"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == version:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry[1]
+                # Computed from older data: drop it now instead of at eviction
+                self._stats['stale'] += 1
+                self._discard(key)
+
+            future = self._in_flight.get((key, version))
+            leader = future is None
+            if leader:
+                future = self._in_flight[(key, version)] = Future()
+                self._stats['misses'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            body = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[(key, version)]
+
+        future.set_result(body)
+        self._store(key, version, body)
+        return body
+
+    def _discard(self, key):
+        _, body = self._entries.pop(key)
+        self._bytes -= _size(body)
+
+    def _store(self, key, version, body):
+        if _size(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (version, body)
+            self._bytes += _size(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        lookups = stats['hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_ratio'] = (stats['hits'] + stats['coalesced']) / lookups if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['max_bytes'] = self.max_bytes
+        return stats
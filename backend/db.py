@@ -0,0 +1,136 @@
+"""
+Pooled read-only SQLite connections
+Handlers borrow a long-lived, read-tuned connection instead of paying the
+connect/parse/close cost and a cold page cache on every request.
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+# Read-side tuning applied to every pooled connection
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024     # bytes mapped instead of read()
+DEFAULT_CACHE_SIZE_KIB = 32 * 1024        # page cache per connection
+DEFAULT_CACHED_STATEMENTS = 256           # prepared statements kept per connection
+# Idle connections kept for reuse; extra ones are closed when returned
+DEFAULT_MAX_IDLE = 16
+
+
+class ReadConnectionPool:
+    """
+    Pool of read-only connections to the telemetry database with optional
+    attached databases (e.g. the score store). A connection is owned by one
+    thread at a time: borrowed for a request and handed back afterwards.
+    Connections run in autocommit: each statement reads the latest committed
+    state, there is no snapshot across the statements of one request.
+    """
+
+    def __init__(self, db_path, attach=None,
+                 mmap_size=DEFAULT_MMAP_SIZE,
+                 cache_size_kib=DEFAULT_CACHE_SIZE_KIB,
+                 cached_statements=DEFAULT_CACHED_STATEMENTS,
+                 max_idle=DEFAULT_MAX_IDLE):
+        self.db_path = db_path
+        self.attach = dict(attach or {})
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self.cached_statements = cached_statements
+        self.max_idle = max_idle
+
+        self._idle = []
+        self._lock = threading.Lock()
+        self._stats = {
+            'opened': 0,
+            'closed': 0,
+            'checkouts': 0,
+            'reused': 0,
+            'in_use': 0,
+            'errors': 0,
+        }
+
+    def _open(self):
+        conn = sqlite3.connect(
+            f'file:{self.db_path}?mode=ro', uri=True,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        schemas = ['main']
+        for alias, path in self.attach.items():
+            conn.execute(f"ATTACH DATABASE ? AS {alias}", (f'file:{path}?mode=ro',))
+            schemas.append(alias)
+
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        for schema in schemas:
+            conn.execute(f"PRAGMA {schema}.mmap_size={int(self.mmap_size)}")
+            conn.execute(f"PRAGMA {schema}.cache_size={-int(self.cache_size_kib)}")
+        return conn
+
+    def acquire(self):
+        """Borrow a connection; pair with release()"""
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['in_use'] += 1
+            if self._idle:
+                self._stats['reused'] += 1
+                return self._idle.pop()
+
+        try:
+            conn = self._open()
+        except Exception:
+            with self._lock:
+                self._stats['in_use'] -= 1
+                self._stats['errors'] += 1
+            raise
+
+        with self._lock:
+            self._stats['opened'] += 1
+        return conn
+
+    def release(self, conn, broken=False):
+        """Return a borrowed connection; broken ones are closed instead of reused"""
+        with self._lock:
+            self._stats['in_use'] -= 1
+            if broken:
+                self._stats['errors'] += 1
+            elif len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+            self._stats['closed'] += 1
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with-block"""
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except sqlite3.DatabaseError:
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._stats['closed'] += len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        """Pool counters for /api/health"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+        stats['max_idle'] = self.max_idle
+        stats['reuse_ratio'] = (stats['reused'] / stats['checkouts']) if stats['checkouts'] else 0.0
+        stats['pragmas'] = {
+            'mmap_size': self.mmap_size,
+            'cache_size_kib': self.cache_size_kib,
+            'query_only': True,
+            'cached_statements': self.cached_statements,
+        }
+        return stats
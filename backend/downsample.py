@@ -0,0 +1,64 @@
+"""
+Shape-preserving downsampling for chart series
+"""
+
+import numpy as np
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: indices of n_out points of (x, y) that
+    keep the visual shape of the series (first and last point always kept)
+    """
+    n = len(x)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])[:max(n_out, 1)]
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Bucket edges for the n - 2 inner points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Average of the next bucket is the third triangle vertex
+        next_lo, next_hi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        next_hi = max(next_hi, next_lo + 1)
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(x, y_min, y_max, n_out):
+    """
+    Min/max buckets: for n_out // 2 equal-count buckets, the lowest and the
+    highest point in time order. Returns (x, y) arrays.
+    """
+    n = len(x)
+    x = np.asarray(x, dtype=float)
+    y_min = np.asarray(y_min, dtype=float)
+    y_max = np.asarray(y_max, dtype=float)
+    n_buckets = max(1, n_out // 2)
+    if n <= n_buckets:
+        return x, (y_min + y_max) / 2
+
+    out_x, out_y = [], []
+    for rows in np.array_split(np.arange(n), n_buckets):
+        lo = rows[np.argmin(y_min[rows])]
+        hi = rows[np.argmax(y_max[rows])]
+        for idx, value in sorted([(lo, y_min[lo]), (hi, y_max[hi])]):
+            out_x.append(x[idx])
+            out_y.append(value)
+    return np.array(out_x), np.array(out_y)
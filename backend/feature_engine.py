@@ -0,0 +1,153 @@
+"""
+Incremental feature engine
+Produces the engineered features of train_model_adaptive.ipynb one batch of
+new rows at a time, keeping ring buffers for the rolling windows so results
+never depend on how much history a request loads.
+"""
+
+import warnings
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+MOTOR_RPM_COLS = ['motor_rpm_1', 'motor_rpm_2', 'motor_rpm_3', 'motor_rpm_4']
+MOTOR_TEMP_COLS = ['motor_temp_1', 'motor_temp_2', 'motor_temp_3', 'motor_temp_4']
+ALT_COLS = ['altitude', 'gps_alt', 'lidar_altitude']
+
+# Rolling window of the training pipeline: rolling(window=5, min_periods=1).std()
+ROLLING_WINDOW = 5
+ROLLING_FEATURES = {
+    'accel_z': 'roll_accel_z_std',
+    'gyro_x': 'roll_gyro_x_std',
+}
+# Rows are grouped by this column for the rolling windows (fleet mode)
+KEY_COLUMN = 'vehicle_id'
+
+
+def _row_std(df, cols):
+    """Sample std across columns, skipping NaN like DataFrame.std(axis=1)"""
+    values = df[cols].to_numpy(dtype=float)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanstd(values, axis=1, ddof=1)
+
+
+def _row_mean(df, cols):
+    values = df[cols].to_numpy(dtype=float)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanmean(values, axis=1)
+
+
+class FeatureEngine:
+    """
+    Stateful feature engineering over telemetry rows in arrival order.
+    Only the last ROLLING_WINDOW - 1 raw values per rolling column are kept,
+    so each new row costs O(1) regardless of the table size.
+
+    Rolling windows are tracked per key_column value (one per vehicle in
+    fleet mode); rows without the column or with a NULL key share one window.
+    """
+
+    def __init__(self, window=ROLLING_WINDOW, key_column=KEY_COLUMN):
+        self.window = window
+        self.key_column = key_column
+        self._buffers = {}
+
+    def reset(self):
+        """Forget the rolling history"""
+        self._buffers.clear()
+
+    def _key_buffers(self, key):
+        buffers = self._buffers.get(key)
+        if buffers is None:
+            buffers = {col: deque(maxlen=self.window - 1) for col in ROLLING_FEATURES}
+            self._buffers[key] = buffers
+        return buffers
+
+    def _groups(self, df):
+        """(key, positional row indices) per key, rows kept in arrival order"""
+        if df.empty:
+            return []
+        if self.key_column not in df.columns:
+            return [(None, np.arange(len(df)))]
+
+        codes, uniques = pd.factorize(df[self.key_column], use_na_sentinel=False)
+        if len(uniques) == 1:
+            key = uniques[0]
+            return [(None if pd.isna(key) else key, np.arange(len(df)))]
+
+        order = np.argsort(codes, kind='stable')
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        return [
+            (None if pd.isna(uniques[codes[rows[0]]]) else uniques[codes[rows[0]]], rows)
+            for rows in np.split(order, bounds)
+        ]
+
+    def prime(self, df):
+        """Feed context rows (oldest first) into the rolling buffers without scoring them"""
+        for key, rows in self._groups(df):
+            buffers = self._key_buffers(key)
+            for col, buffer in buffers.items():
+                if col in df.columns:
+                    buffer.extend(df[col].to_numpy(dtype=float)[rows][-(self.window - 1):])
+
+    def _rolling_std(self, buffer, values):
+        history = np.full(self.window - 1, np.nan)
+        if buffer:
+            history[-len(buffer):] = np.fromiter(buffer, dtype=float, count=len(buffer))
+
+        series = np.concatenate([history, values])
+        windows = np.lib.stride_tricks.sliding_window_view(series, self.window)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            result = np.nanstd(windows, axis=1, ddof=1)
+
+        buffer.extend(values[-(self.window - 1):])
+        return result
+
+    def transform(self, df):
+        """
+        Engineer features for new rows (oldest first) and advance the state.
+        Returns a copy of df with the engineered columns; NaN becomes 0 like
+        the training pipeline's fillna(0).
+        """
+        df_eng = df.copy()
+
+        # Motor aggregations
+        if all(c in df_eng.columns for c in MOTOR_RPM_COLS):
+            df_eng['motor_rpm_std'] = _row_std(df_eng, MOTOR_RPM_COLS)
+            df_eng['motor_rpm_mean'] = _row_mean(df_eng, MOTOR_RPM_COLS)
+
+        if all(c in df_eng.columns for c in MOTOR_TEMP_COLS):
+            df_eng['motor_temp_std'] = _row_std(df_eng, MOTOR_TEMP_COLS)
+
+        # Sensor disagreement
+        if all(c in df_eng.columns for c in ALT_COLS):
+            df_eng['alt_disagreement_std'] = _row_std(df_eng, ALT_COLS)
+
+        # Power system
+        if 'battery_voltage' in df_eng.columns and 'battery_current' in df_eng.columns:
+            df_eng['power_draw'] = df_eng['battery_voltage'] * df_eng['battery_current']
+
+        # Rolling statistics from the ring buffers, per vehicle
+        rolling_cols = [col for col in ROLLING_FEATURES if col in df_eng.columns]
+        if rolling_cols:
+            results = {col: np.empty(len(df_eng)) for col in rolling_cols}
+            for key, rows in self._groups(df_eng):
+                buffers = self._key_buffers(key)
+                for col in rolling_cols:
+                    values = df_eng[col].to_numpy(dtype=float)[rows]
+                    results[col][rows] = self._rolling_std(buffers[col], values)
+            for col in rolling_cols:
+                df_eng[ROLLING_FEATURES[col]] = results[col]
+
+        return df_eng.fillna(0)
+
+
+def feature_engineering(df):
+    """One-shot feature engineering for a standalone batch, oldest row first"""
+    return FeatureEngine().transform(df)
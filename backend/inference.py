@@ -0,0 +1,366 @@
+"""
+Compiled NumPy scorers for the exported anomaly models
+The fitted IsolationForest / LocalOutlierFactor (novelty) models are turned
+into plain arrays once at load time, so scoring a batch is one vectorized
+pass that returns label and score together, without sklearn's per-call
+input validation or a second predict() pass.
+
+compile_model() checks the compiled scorer against the sklearn model on a
+sample and falls back to the sklearn model when they disagree or the model
+type is not supported. The compiled path wins on the small batches of live
+polling; batches of SKLEARN_MIN_ROWS or more still go to the sklearn model,
+whose multithreaded neighbour search / tree traversal is faster there.
+
+A validated scorer can be saved as plain .npy files next to the model
+(<model>.compiled/); loading that needs neither sklearn nor unpickling and
+memory-maps the arrays (such a scorer has no sklearn model and scores every
+batch size itself):
+    python -m backend.inference --model models/lof_novelty.joblib --scaler models/data_scaler.joblib
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+
+EULER_GAMMA = 0.5772156649015329
+# Allowed absolute difference between compiled and sklearn decision values
+VALIDATION_TOLERANCE = 1e-9
+VALIDATION_ROWS = 256
+# Batch sizes timed by --measure: single rows, a poll, a chart history, a backlog chunk
+MEASURE_BATCHES = (1, 10, 150, 2000)
+
+
+def _average_path_length(n_samples):
+    """Average path length of an unsuccessful BST search in n samples (Liu et al.)"""
+    n_samples = np.asarray(n_samples, dtype=float)
+    result = np.zeros_like(n_samples)
+    result[n_samples == 2] = 1.0
+    large = n_samples > 2
+    n = n_samples[large]
+    result[large] = 2.0 * (np.log(n - 1.0) + EULER_GAMMA) - 2.0 * (n - 1.0) / n
+    return result
+
+
+class ScalerTransform:
+    """StandardScaler.transform as (X - mean) / scale"""
+
+    def __init__(self, scaler=None, mean=None, scale=None):
+        if scaler is not None:
+            mean = getattr(scaler, 'mean_', None) if scaler.with_mean else None
+            scale = getattr(scaler, 'scale_', None) if scaler.with_std else None
+        self.mean = mean
+        self.scale = scale
+
+    def __call__(self, X):
+        X = np.array(X, dtype=float)
+        if self.mean is not None:
+            X -= self.mean
+        if self.scale is not None:
+            X /= self.scale
+        return X
+
+
+class Scorer:
+    """
+    Base scorer: decision_function(X_scaled) -> decision values (< 0 = anomaly).
+    score(X) scales raw features and returns (is_anomaly, anomaly_score) with
+    anomaly_score = -decision, the convention of the API.
+    """
+
+    kind = 'sklearn'
+    # Attributes saved by save_scorer (arrays as .npy, scalars in scorer.json)
+    ARRAYS = ()
+    SCALARS = ()
+    # Batches at least this large are scored by the sklearn model when one is loaded
+    SKLEARN_MIN_ROWS = None
+
+    def __init__(self, model, scaler=None):
+        self.model = model
+        self.scale = ScalerTransform(scaler) if scaler is not None else None
+
+    def decision_function(self, X):
+        return self.model.decision_function(X)
+
+    def score(self, X):
+        X = np.asarray(X, dtype=float)
+        if self.scale is not None:
+            X = self.scale(X)
+        if self.SKLEARN_MIN_ROWS is not None and self.model is not None and len(X) >= self.SKLEARN_MIN_ROWS:
+            decision = self.model.decision_function(X)
+        else:
+            decision = self.decision_function(X)
+        return (decision < 0).astype(int), -decision
+
+
+class IsolationForestScorer(Scorer):
+    """
+    All trees flattened into one node array; every (row, tree) pair walks
+    down in lock-step, one vectorized step per tree level
+    """
+
+    kind = 'isolation_forest'
+    ARRAYS = ('feature', 'threshold', 'left', 'right', 'leaf_value', 'roots')
+    SCALARS = ('max_depth', 'denominator', 'offset')
+    SKLEARN_MIN_ROWS = 1000
+
+    def __init__(self, model, scaler=None):
+        super().__init__(model, scaler)
+        n_features = model.n_features_in_
+        subsample = model._max_features != n_features
+
+        features, thresholds, lefts, rights, leaf_values, roots = [], [], [], [], [], []
+        offset = 0
+        self.max_depth = 0
+        for tree, tree_features in zip(model.estimators_, model.estimators_features_):
+            t = tree.tree_
+            left, right = t.children_left, t.children_right
+            depth = np.zeros(t.node_count)
+            # Children always come after their parent in sklearn's node order
+            for node in range(t.node_count):
+                if left[node] != -1:
+                    depth[left[node]] = depth[right[node]] = depth[node] + 1
+            is_leaf = left == -1
+
+            feature = np.where(is_leaf, 0, t.feature)
+            if subsample:
+                feature = np.asarray(tree_features)[feature]
+            features.append(feature)
+            thresholds.append(t.threshold)
+            # Leaves point to themselves so finished walks stay in place
+            own = np.arange(t.node_count) + offset
+            lefts.append(np.where(is_leaf, own, left + offset))
+            rights.append(np.where(is_leaf, own, right + offset))
+            leaf_values.append(np.where(is_leaf, depth + _average_path_length(t.n_node_samples), 0.0))
+            roots.append(offset)
+            offset += t.node_count
+            self.max_depth = max(self.max_depth, int(depth.max()))
+
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds)
+        self.left = np.concatenate(lefts).astype(np.intp)
+        self.right = np.concatenate(rights).astype(np.intp)
+        self.leaf_value = np.concatenate(leaf_values)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.denominator = len(model.estimators_) * _average_path_length([model._max_samples])[0]
+        self.offset = model.offset_
+
+    def decision_function(self, X):
+        # sklearn's trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+
+        depths = self.leaf_value[node].sum(axis=1)
+        if self.denominator == 0:
+            scores = -np.ones(len(X))
+        else:
+            scores = -(2.0 ** (-depths / self.denominator))
+        return scores - self.offset
+
+
+class LOFScorer(Scorer):
+    """
+    Novelty LOF from the scaled training set, its k-distances and local
+    reachability densities. Neighbours are found by brute force with one
+    matrix product per CHUNK_ROWS rows, as sklearn does for this many features.
+    """
+
+    kind = 'lof'
+    ARRAYS = ('fit_X', 'fit_sq', 'k_distance', 'lrd')
+    SCALARS = ('k', 'offset')
+    SKLEARN_MIN_ROWS = 32
+    # Keeps the (rows x training rows) distance block cache-sized
+    CHUNK_ROWS = 64
+
+    def __init__(self, model, scaler=None):
+        super().__init__(model, scaler)
+        self.fit_X = np.asarray(model._fit_X, dtype=float)
+        self.fit_sq = np.einsum('ij,ij->i', self.fit_X, self.fit_X)
+        self.k = model.n_neighbors_
+        self.k_distance = model._distances_fit_X_[:, self.k - 1]
+        self.lrd = model._lrd
+        self.offset = model.offset_
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=float)
+        if len(X) > self.CHUNK_ROWS:
+            return np.concatenate([self.decision_function(X[lo:lo + self.CHUNK_ROWS])
+                                   for lo in range(0, len(X), self.CHUNK_ROWS)])
+        sq = np.einsum('ij,ij->i', X, X)
+        d2 = sq[:, None] - 2.0 * (X @ self.fit_X.T) + self.fit_sq[None, :]
+        np.maximum(d2, 0, out=d2)
+
+        neighbors = np.argpartition(d2, self.k - 1, axis=1)[:, :self.k]
+        distances = np.sqrt(np.take_along_axis(d2, neighbors, axis=1))
+
+        reach = np.maximum(distances, self.k_distance[neighbors])
+        lrd = 1.0 / (reach.mean(axis=1) + 1e-10)
+        scores = -(self.lrd[neighbors] / lrd[:, None]).mean(axis=1)
+        return scores - self.offset
+
+
+SCORERS = {
+    'IsolationForest': IsolationForestScorer,
+    'LocalOutlierFactor': LOFScorer,
+}
+
+
+def validation_sample(model, rows=VALIDATION_ROWS, seed=0):
+    """Scaled-space inputs for validation: training rows when stored, plus random points"""
+    rng = np.random.default_rng(seed)
+    n_features = model.n_features_in_
+    samples = [rng.normal(0, 2, (rows, n_features))]
+    fit_X = getattr(model, '_fit_X', None)
+    if fit_X is not None:
+        picked = fit_X[rng.choice(len(fit_X), min(rows, len(fit_X)), replace=False)]
+        samples.append(picked + rng.normal(0, 0.1, picked.shape))
+    return np.vstack(samples)
+
+
+def compile_model(model, scaler=None, validate=True):
+    """
+    Compiled scorer for model (with the scaler folded in), or a plain
+    sklearn-backed Scorer when compiling is unsupported or validation fails
+    """
+    scorer_cls = SCORERS.get(type(model).__name__)
+    if scorer_cls is None or (scorer_cls is LOFScorer and not getattr(model, 'novelty', False)):
+        print(f"⚠️ No compiled scorer for {type(model).__name__}, using sklearn")
+        return Scorer(model, scaler)
+
+    try:
+        scorer = scorer_cls(model, scaler)
+        if validate:
+            X = validation_sample(model)
+            expected = model.decision_function(X)
+            actual = scorer.decision_function(X)
+            max_diff = float(np.max(np.abs(actual - expected)))
+            if not np.isfinite(max_diff) or max_diff > VALIDATION_TOLERANCE:
+                print(f"⚠️ Compiled {scorer.kind} scorer differs from sklearn "
+                      f"(max diff {max_diff:.3g}), using sklearn")
+                return Scorer(model, scaler)
+    except Exception as e:
+        print(f"⚠️ Could not compile {type(model).__name__}: {e}, using sklearn")
+        return Scorer(model, scaler)
+
+    print(f"✓ Compiled {scorer.kind} scorer validated against sklearn")
+    return scorer
+
+
+def compiled_path(model_path):
+    """Directory of the saved compiled scorer for a model file"""
+    return os.path.splitext(model_path)[0] + '.compiled'
+
+
+def save_scorer(scorer, directory):
+    """Write a compiled scorer (and its scaler) as .npy arrays plus scorer.json"""
+    if not scorer.ARRAYS:
+        raise ValueError(f"{scorer.kind} scorer cannot be saved")
+    os.makedirs(directory, exist_ok=True)
+    arrays = {name: getattr(scorer, name) for name in scorer.ARRAYS}
+    if scorer.scale is not None:
+        arrays['scaler_mean'] = scorer.scale.mean
+        arrays['scaler_scale'] = scorer.scale.scale
+    saved = []
+    for name, value in arrays.items():
+        if value is not None:
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(value))
+            saved.append(name)
+
+    meta = {
+        'kind': scorer.kind,
+        'arrays': saved,
+        'scalars': {name: float(getattr(scorer, name)) for name in scorer.SCALARS},
+    }
+    # scorer.json last: its presence marks a complete export
+    tmp_path = os.path.join(directory, '.scorer.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, 'scorer.json'))
+
+
+def load_scorer(directory, mmap_mode='r'):
+    """Scorer saved by save_scorer, with its arrays memory-mapped"""
+    with open(os.path.join(directory, 'scorer.json'), 'r') as f:
+        meta = json.load(f)
+    scorer_cls = {cls.kind: cls for cls in SCORERS.values()}[meta['kind']]
+
+    scorer = scorer_cls.__new__(scorer_cls)
+    scorer.model = None
+    arrays = {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in meta['arrays']
+    }
+    for name in scorer_cls.ARRAYS:
+        setattr(scorer, name, arrays[name])
+    for name, value in meta['scalars'].items():
+        setattr(scorer, name, int(value) if name in ('k', 'max_depth') else value)
+    scorer.scale = None
+    if 'scaler_mean' in arrays or 'scaler_scale' in arrays:
+        scorer.scale = ScalerTransform(mean=arrays.get('scaler_mean'), scale=arrays.get('scaler_scale'))
+    return scorer
+
+
+def is_fresh(directory, model_path):
+    """True when directory holds a complete export newer than the model file"""
+    meta_path = os.path.join(directory, 'scorer.json')
+    return os.path.exists(meta_path) and os.path.getmtime(meta_path) >= os.path.getmtime(model_path)
+
+
+def measure(scorer, n_features, batch_sizes=MEASURE_BATCHES, repeat=20, seed=0):
+    """Seconds per scored batch for each batch size (best of `repeat` runs)"""
+    rng = np.random.default_rng(seed)
+    timings = {}
+    for size in batch_sizes:
+        X = rng.normal(0, 1, (size, n_features))
+        if scorer.scale is not None:
+            # Raw-feature scale, so the folded-in scaler sees realistic values
+            if scorer.scale.scale is not None:
+                X = X * scorer.scale.scale
+            if scorer.scale.mean is not None:
+                X = X + scorer.scale.mean
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            scorer.score(X)
+            best = min(best, time.perf_counter() - start)
+        timings[size] = best
+    return timings
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compile and save an anomaly model for fast loading")
+    parser.add_argument("--model", required=True, help="Fitted IsolationForest/LOF joblib file")
+    parser.add_argument("--scaler", help="StandardScaler joblib file folded into the scorer")
+    parser.add_argument("--out", help="Output directory (default: <model>.compiled)")
+    parser.add_argument("--measure", action="store_true",
+                        help="Also print the scoring cost per batch size (for sizing API workers)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    import joblib
+
+    args = parse_args(argv)
+    model = joblib.load(args.model)
+    scaler = joblib.load(args.scaler) if args.scaler else None
+    scorer = compile_model(model, scaler)
+    if not scorer.ARRAYS:
+        raise SystemExit(f"❌ {type(model).__name__} could not be compiled")
+    out = args.out or compiled_path(args.model)
+    save_scorer(scorer, out)
+    print(f"✓ Saved {scorer.kind} scorer to {out}")
+
+    if args.measure:
+        for size, seconds in measure(scorer, model.n_features_in_).items():
+            print(f"   {size:>5} rows: {seconds * 1000:8.2f} ms  ({seconds / size * 1e6:7.1f} µs/row)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Hot-path timing and Prometheus metrics
+Request stages are timed with `with stage('db'):`. The stage times of the
+current request are collected in a context variable and returned as a
+Server-Timing header; every timing also feeds a histogram that /metrics
+exposes in the Prometheus text format. Metrics are per process: scrape each
+worker, or aggregate with the `instance` label.
+
+Stages: db (SQL reads), features (feature engineering), score (model call,
+including any micro-batch wait), store (score/rollup writes), frame
+(DataFrame to JSON-ready columns), encode (JSON encoding).
+"""
+
+import bisect
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Stage -> seconds for the request being handled in this context
+_timings = contextvars.ContextVar('puma_stage_timings', default=None)
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+def _number(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, optionally labelled"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally labelled"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        lines = []
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), values[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket"
+                             f"{_labels(self.label_names + ('le',), key + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(values[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """
+    Value read at scrape time from fn(): a number, or {label value: number}
+    for one label. kind='counter' exposes a running total kept elsewhere
+    (e.g. a pool's stats()).
+    """
+
+    def __init__(self, name, help, fn, label=None, kind='gauge'):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.label = label
+        self.kind = kind
+
+    def render(self):
+        value = self.fn()
+        if value is None:
+            return []
+        if self.label is None:
+            return [f"{self.name} {_number(value)}"]
+        return [f"{self.name}{_labels((self.label,), (key,))} {_number(v)}"
+                for key, v in sorted(value.items())]
+
+
+class Registry:
+    """Named metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, fn, label=None, kind='gauge'):
+        return self.register(Gauge(name, help, fn, label, kind))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.render()
+            except Exception:
+                # A failing gauge callback must not break the whole scrape
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'puma_request_duration_seconds', 'HTTP request latency', ('endpoint', 'method', 'status'))
+STAGE_SECONDS = REGISTRY.histogram(
+    'puma_stage_duration_seconds', 'Time spent per hot-path stage', ('stage',))
+ROWS_SCORED = REGISTRY.counter('puma_rows_scored_total', 'Telemetry rows scored and stored')
+ANOMALIES_SCORED = REGISTRY.counter('puma_anomalies_total', 'Stored rows flagged as anomalous')
+
+
+@contextmanager
+def stage(name):
+    """Time a block as one stage of the current request (and of the histogram)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timings = _timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def start_request():
+    """Begin collecting stage times in this context; returns the start time"""
+    _timings.set({})
+    return time.perf_counter()
+
+
+def finish_request(start, endpoint, method, status):
+    """
+    Record the request latency and return its Server-Timing header value
+    (stages in ms, plus the total)
+    """
+    total = time.perf_counter() - start
+    REQUEST_SECONDS.observe(total, endpoint=endpoint or 'unknown', method=method, status=status)
+    timings = _timings.get() or {}
+    _timings.set(None)
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ', '.join(parts)
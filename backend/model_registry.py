@@ -0,0 +1,252 @@
+"""
+Versioned model registry with hot reload
+Each version is a directory holding everything needed to score:
+
+    models/registry/<version>/
+        model.joblib           (or lof_novelty.joblib / isolation_forest.joblib)
+        data_scaler.joblib
+        feature_names.json
+        model_metadata.json
+
+A <model>.compiled/ directory written by `python -m backend.inference` is
+loaded instead of the joblib files when present (no sklearn import; large
+batches are then scored by the compiled code too).
+
+Version names must sort in release order (e.g. v0001, v0002 or a
+YYYYMMDD-HHMMSS stamp). The newest version is active unless an ACTIVE file
+in the registry pins another one. New versions are loaded and compiled in a
+background thread and then swapped in atomically; requests in flight finish
+on the bundle they started with.
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+
+from backend.batching import MicroBatcher
+from backend.inference import compile_model, compiled_path, is_fresh, load_scorer
+from backend.metrics import stage
+
+
+DEFAULT_REGISTRY_DIR = "models/registry"
+MODEL_FILES = ('model.joblib', 'lof_novelty.joblib', 'isolation_forest.joblib')
+SCALER_FILE = 'data_scaler.joblib'
+FEATURES_FILE = 'feature_names.json'
+METADATA_FILE = 'model_metadata.json'
+# Optional file in the registry root naming the version to serve
+ACTIVE_FILE = 'ACTIVE'
+DEFAULT_WATCH_INTERVAL = 10
+
+
+class ModelBundle:
+    """One loaded model version: compiled scorer (scaler folded in) and feature order"""
+
+    def __init__(self, version, scorer, feature_names, metadata=None, source='joblib'):
+        self.version = version
+        self.scorer = scorer
+        self.feature_names = list(feature_names)
+        self.metadata = metadata or {}
+        self.source = source
+        # Optional MicroBatcher coalescing concurrent score() calls
+        self.batcher = None
+
+    def score(self, df_engineered):
+        """(is_anomaly, anomaly_score) arrays for engineered feature rows"""
+        X = np.zeros((len(df_engineered), len(self.feature_names)))
+        # Missing features are scored as 0, like the training pipeline's fill
+        for i, name in enumerate(self.feature_names):
+            if name in df_engineered.columns:
+                X[:, i] = df_engineered[name].to_numpy(dtype=float)
+        with stage('score'):
+            if self.batcher is not None:
+                return self.batcher.score(X)
+            return self.scorer.score(X)
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'scorer': self.scorer.kind,
+            'source': self.source,
+            'features': len(self.feature_names),
+            'date_trained': self.metadata.get('date_trained'),
+        }
+
+
+def load_bundle(version, model_path, scaler_path, features_path, metadata_path=None):
+    """
+    Load one model version. A fresh <model>.compiled/ export is memory-mapped
+    without importing sklearn; otherwise the joblib files are loaded (large
+    arrays memory-mapped) and compiled.
+    """
+    with open(features_path, 'r') as f:
+        feature_names = json.load(f)
+    metadata = {}
+    if metadata_path and os.path.exists(metadata_path):
+        with open(metadata_path, 'r') as f:
+            metadata = json.load(f)
+
+    compiled = compiled_path(model_path)
+    if is_fresh(compiled, model_path):
+        return ModelBundle(version, load_scorer(compiled), feature_names, metadata, source='compiled')
+
+    import joblib
+
+    model = joblib.load(model_path, mmap_mode='r')
+    scaler = joblib.load(scaler_path)
+    return ModelBundle(version, compile_model(model, scaler), feature_names, metadata)
+
+
+class ModelRegistry:
+    """
+    Serves the active ModelBundle and swaps in new versions.
+    fallback=(model_path, scaler_path, features_path) is used while the
+    registry directory holds no version; its version name is derived from
+    the model file's modification time.
+    on_swap(bundle) is called before every swap becomes visible (e.g. to
+    invalidate scores); requests keep the previous bundle until it returns.
+    batching: MicroBatcher options (max_wait, max_batch) given to every
+    loaded bundle; None scores each call on its own.
+    """
+
+    def __init__(self, root=DEFAULT_REGISTRY_DIR, fallback=None, on_swap=None, batching=None):
+        self.root = root
+        self.fallback = fallback
+        self.on_swap = on_swap
+        self.batching = batching
+        self._active = None
+        self._lock = threading.Lock()
+        # Serializes swaps: on_swap and publishing the bundle happen as one step
+        self._swap_lock = threading.Lock()
+        self._loading = None
+        self.last_error = None
+        # Version whose last load failed; the watcher does not retry it
+        self.failed_version = None
+        self._watcher = None
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def loading(self):
+        return self._loading
+
+    def versions(self):
+        """Complete version directories, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.startswith('.')
+            and os.path.exists(os.path.join(self.root, name, METADATA_FILE))
+            and self._model_file(os.path.join(self.root, name)) is not None
+        )
+
+    def _model_file(self, directory):
+        for name in MODEL_FILES:
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def target_version(self):
+        """Version that should be active: the pinned one, else the newest"""
+        pin = os.path.join(self.root, ACTIVE_FILE)
+        if os.path.exists(pin):
+            with open(pin, 'r') as f:
+                pinned = f.read().strip()
+            if pinned:
+                return pinned
+        versions = self.versions()
+        if versions:
+            return versions[-1]
+        if self.fallback is not None:
+            return f"legacy-{int(os.path.getmtime(self.fallback[0]))}"
+        return None
+
+    def _load(self, version):
+        directory = os.path.join(self.root, version)
+        if os.path.isdir(directory):
+            model_path = self._model_file(directory)
+            if model_path is None:
+                raise FileNotFoundError(f"No model file in {directory}")
+            return load_bundle(
+                version, model_path,
+                os.path.join(directory, SCALER_FILE),
+                os.path.join(directory, FEATURES_FILE),
+                os.path.join(directory, METADATA_FILE),
+            )
+        if self.fallback is not None and version.startswith('legacy-'):
+            model_path, scaler_path, features_path = self.fallback
+            return load_bundle(version, model_path, scaler_path, features_path,
+                               os.path.join(os.path.dirname(model_path), METADATA_FILE))
+        raise FileNotFoundError(f"Unknown model version: {version}")
+
+    def load(self, version=None):
+        """Load a version (default: target_version()) and make it active"""
+        version = version or self.target_version()
+        if version is None:
+            raise FileNotFoundError(f"No model versions in {self.root} and no fallback model")
+
+        bundle = self._load(version)
+        if self.batching is not None:
+            bundle.batcher = MicroBatcher(bundle.scorer.score, **self.batching)
+        with self._swap_lock:
+            previous = self._active
+            # Consumers (the score store) switch first: once the bundle is
+            # visible, nothing scores with it under the previous version
+            if self.on_swap is not None and (previous is None or previous.version != bundle.version):
+                self.on_swap(bundle)
+            with self._lock:
+                self._active = bundle
+        print(f"✓ Model version {bundle.version} active ({bundle.scorer.kind} scorer)")
+        return bundle
+
+    def reload_async(self, version=None):
+        """
+        Load a version in a background thread; returns the version being
+        loaded, or None when another load is already running
+        """
+        with self._lock:
+            if self._loading is not None:
+                return None
+            self._loading = version or self.target_version()
+
+        target = self._loading
+
+        def run():
+            try:
+                self.load(target)
+                self.last_error = self.failed_version = None
+            except Exception as e:
+                self.last_error = f"{target}: {e}"
+                self.failed_version = target
+                print(f"❌ Model reload failed: {self.last_error}")
+            finally:
+                self._loading = None
+
+        threading.Thread(target=run, name="model-reload", daemon=True).start()
+        return target
+
+    def watch(self, interval=DEFAULT_WATCH_INTERVAL):
+        """Poll the registry and hot-load whenever the target version changes"""
+        if self._watcher is not None:
+            return
+
+        def run():
+            stop = threading.Event()
+            while not stop.wait(interval):
+                try:
+                    target = self.target_version()
+                except OSError:
+                    continue
+                active = self._active
+                if target is None or target == self.failed_version:
+                    continue
+                if active is None or active.version != target:
+                    self.reload_async(target)
+
+        self._watcher = threading.Thread(target=run, name="model-watch", daemon=True)
+        self._watcher.start()
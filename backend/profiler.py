@@ -0,0 +1,119 @@
+"""
+On-demand sampling profiler
+While running, a background thread records the stack of every other
+thread at a fixed interval. The result is a set of folded stacks
+("outer;inner;leaf count" per line), the input format of flamegraph.pl and
+speedscope. Sampling costs nothing while stopped and is switched on and off
+at runtime (see /api/admin/profiler in api_server.py).
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+DEFAULT_INTERVAL = 0.005
+# A profile stops by itself after this many seconds unless given another limit
+DEFAULT_DURATION = 30
+MAX_DURATION = 600
+# Distinct stacks kept; further ones are counted under one bucket
+MAX_STACKS = 20000
+OVERFLOW_STACK = '[other stacks]'
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Folded-stack sampler over all threads of the process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._stacks = Counter()
+        self.samples = 0
+        self.interval = None
+        self.started_at = None
+        self.stopped_at = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=DEFAULT_INTERVAL, duration=DEFAULT_DURATION):
+        """Start a new profile; False when one is already running"""
+        with self._lock:
+            if self.running:
+                return False
+            self._stacks = Counter()
+            self.samples = 0
+            self.interval = interval
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._stop = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, args=(interval, min(duration, MAX_DURATION), self._stop),
+                name="sampling-profiler", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """Stop the running profile (if any) and wait for the sampler to exit"""
+        thread = self._thread
+        self._stop.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self, interval, duration, stop):
+        own = threading.get_ident()
+        deadline = time.monotonic() + duration
+        while not stop.wait(interval) and time.monotonic() < deadline:
+            self._sample(own)
+        self.stopped_at = time.time()
+
+    def _sample(self, own):
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            stacks.append(';'.join(reversed(names)))
+
+        with self._lock:
+            for stack in stacks:
+                if stack not in self._stacks and len(self._stacks) >= MAX_STACKS:
+                    stack = OVERFLOW_STACK
+                self._stacks[stack] += 1
+            self.samples += 1
+
+    def folded(self):
+        """Folded stacks of the current or last profile, most frequent first"""
+        with self._lock:
+            stacks = self._stacks.most_common()
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def status(self, top=20):
+        """State of the profiler and the most frequent leaf frames"""
+        with self._lock:
+            stacks = list(self._stacks.items())
+        leaves = Counter()
+        for stack, count in stacks:
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return {
+            'running': self.running,
+            'interval_ms': self.interval * 1000 if self.interval else None,
+            'samples': self.samples,
+            'stacks': len(stacks),
+            'started_at': self.started_at,
+            'stopped_at': self.stopped_at,
+            'top_frames': leaves.most_common(top),
+        }
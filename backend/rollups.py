@@ -0,0 +1,206 @@
+"""
+Multi-resolution rollups
+Per-bucket counts, sums and extremes of the charted series at 1 s, 10 s and
+1 min resolution, updated in the same transaction that stores new scores.
+A chart over any time span then reads a bounded number of buckets instead
+of raw telemetry.
+"""
+
+import numpy as np
+import pandas as pd
+
+from backend.downsample import lttb, minmax
+
+
+ROLLUP_RESOLUTIONS = (1, 10, 60)
+# Seconds of data kept per resolution (None = forever), relative to the newest bucket
+ROLLUP_RETENTION = {1: 6 * 3600, 10: 7 * 24 * 3600, 60: None}
+ROLLUP_SERIES = ('altitude', 'battery_level', 'anomaly_score')
+# A resolution is used while the range holds at most points * OVERSAMPLE buckets
+OVERSAMPLE = 4
+
+
+def rollup_table(resolution):
+    return f"rollup_{resolution}s"
+
+
+def rollup_schemas():
+    """CREATE statements for every resolution"""
+    series = ", ".join(
+        f"{name}_sum REAL, {name}_min REAL, {name}_max REAL" for name in ROLLUP_SERIES
+    )
+    return [
+        f"""
+        CREATE TABLE IF NOT EXISTS {rollup_table(resolution)} (
+            bucket INTEGER NOT NULL,
+            vehicle_id TEXT NOT NULL DEFAULT '',
+            n INTEGER NOT NULL,
+            anomalies INTEGER NOT NULL,
+            {series},
+            PRIMARY KEY (bucket, vehicle_id)
+        ) WITHOUT ROWID
+        """
+        for resolution in ROLLUP_RESOLUTIONS
+    ]
+
+
+def _upsert_sql(resolution):
+    columns = ['bucket', 'vehicle_id', 'n', 'anomalies']
+    updates = ["n = n + excluded.n", "anomalies = anomalies + excluded.anomalies"]
+    for name in ROLLUP_SERIES:
+        columns += [f"{name}_sum", f"{name}_min", f"{name}_max"]
+        updates += [
+            f"{name}_sum = COALESCE({name}_sum, 0) + COALESCE(excluded.{name}_sum, 0)",
+            f"{name}_min = MIN(COALESCE({name}_min, excluded.{name}_min), COALESCE(excluded.{name}_min, {name}_min))",
+            f"{name}_max = MAX(COALESCE({name}_max, excluded.{name}_max), COALESCE(excluded.{name}_max, {name}_max))",
+        ]
+    return (
+        f"INSERT INTO {rollup_table(resolution)} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT(bucket, vehicle_id) DO UPDATE SET {', '.join(updates)}"
+    )
+
+
+def _numeric(df, column):
+    return pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+
+
+def apply_rollups(conn, df, is_anomaly, scores):
+    """
+    Add a batch of newly scored rows to every resolution.
+    Runs on the caller's connection without committing, so the rollups
+    and the scores are stored atomically.
+
+    Buckets are reduced with NumPy (bincount / ufunc.at) rather than a
+    pandas groupby, whose fixed cost dominated the usual one-row batch.
+    NaN values are skipped like pandas does: sums count them as 0 and an
+    all-NaN bucket has no min/max.
+    """
+    timestamps = _numeric(df, 'timestamp')
+    valid = ~np.isnan(timestamps)
+    if not valid.any():
+        return
+
+    timestamps = timestamps[valid].astype(np.int64)
+    if 'vehicle_id' in df.columns:
+        vehicle_ids = df['vehicle_id'].fillna('').astype(str).to_numpy()[valid]
+    else:
+        vehicle_ids = np.full(len(timestamps), '', dtype=object)
+    vehicle_codes, vehicles = pd.factorize(vehicle_ids)
+    vehicles = np.asarray(vehicles, dtype=object)
+    anomalies = np.asarray(is_anomaly, dtype=np.int64)[valid]
+    series = {
+        'altitude': _numeric(df, 'altitude')[valid],
+        'battery_level': _numeric(df, 'battery_level')[valid],
+        'anomaly_score': np.asarray(scores, dtype=float)[valid],
+    }
+
+    for resolution in ROLLUP_RESOLUTIONS:
+        buckets = timestamps // resolution * resolution
+        keys, first, inverse = np.unique(buckets * len(vehicles) + vehicle_codes,
+                                         return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        size = len(keys)
+        columns = [
+            buckets[first].tolist(),
+            vehicles[vehicle_codes[first]].tolist(),
+            np.bincount(inverse, minlength=size).tolist(),
+            np.bincount(inverse, weights=anomalies, minlength=size).astype(np.int64).tolist(),
+        ]
+        for name in ROLLUP_SERIES:
+            values = series[name]
+            missing = np.isnan(values)
+            present = np.bincount(inverse, weights=~missing, minlength=size) > 0
+            lows = np.full(size, np.inf)
+            np.minimum.at(lows, inverse, np.where(missing, np.inf, values))
+            highs = np.full(size, -np.inf)
+            np.maximum.at(highs, inverse, np.where(missing, -np.inf, values))
+            columns += [
+                np.bincount(inverse, weights=np.where(missing, 0.0, values), minlength=size).tolist(),
+                [low if ok else None for low, ok in zip(lows.tolist(), present.tolist())],
+                [high if ok else None for high, ok in zip(highs.tolist(), present.tolist())],
+            ]
+        conn.executemany(_upsert_sql(resolution), zip(*columns))
+
+
+def prune_rollups(conn):
+    """Drop buckets older than each resolution's retention (relative to its newest bucket)"""
+    for resolution, retention in ROLLUP_RETENTION.items():
+        if retention is None:
+            continue
+        table = rollup_table(resolution)
+        conn.execute(
+            f"DELETE FROM {table} WHERE bucket < (SELECT MAX(bucket) FROM {table}) - ?",
+            (retention,)
+        )
+
+
+def pick_resolution(start_ts, end_ts, points, newest_ts=None):
+    """
+    Finest resolution that keeps the bucket count near `points` and still
+    covers start_ts within its retention
+    """
+    span = max(1, end_ts - start_ts)
+    for resolution in ROLLUP_RESOLUTIONS:
+        retention = ROLLUP_RETENTION[resolution]
+        if retention is not None and newest_ts is not None and start_ts < newest_ts - retention:
+            continue
+        if span / resolution <= points * OVERSAMPLE:
+            return resolution
+    return ROLLUP_RESOLUTIONS[-1]
+
+
+def read_rollups(conn, resolution, start_ts, end_ts, vehicle_id=None, schema='scores'):
+    """
+    Buckets of one resolution in [start_ts, end_ts], oldest first, with
+    <series>_avg/_min/_max per bucket. Without vehicle_id the buckets of
+    all vehicles are combined.
+    """
+    series = ", ".join(
+        f"SUM({name}_sum) * 1.0 / SUM(n) AS {name}_avg, "
+        f"MIN({name}_min) AS {name}_min, MAX({name}_max) AS {name}_max"
+        for name in ROLLUP_SERIES
+    )
+    params = [int(start_ts) // resolution * resolution, int(end_ts)]
+    vehicle_filter = ""
+    if vehicle_id is not None:
+        vehicle_filter = "AND vehicle_id = ? "
+        params.append(vehicle_id)
+
+    return pd.read_sql_query(
+        f"SELECT bucket, SUM(n) AS n, SUM(anomalies) AS anomalies, {series} "
+        f"FROM {schema}.{rollup_table(resolution)} "
+        f"WHERE bucket >= ? AND bucket <= ? {vehicle_filter}"
+        "GROUP BY bucket ORDER BY bucket",
+        conn, params=params
+    )
+
+
+def newest_bucket(conn, schema='scores'):
+    """Newest 1 s bucket (unix timestamp of the latest rolled-up row), or None"""
+    return conn.execute(
+        f"SELECT MAX(bucket) FROM {schema}.{rollup_table(ROLLUP_RESOLUTIONS[0])}"
+    ).fetchone()[0]
+
+
+def downsample_rollups(df, points, mode='lttb'):
+    """
+    {series: {'t': [...], 'v': [...]}} with at most `points` points per series.
+    lttb keeps the shape of the bucket averages; minmax keeps each bucket
+    group's extremes so spikes are never averaged away.
+    """
+    buckets = df['bucket'].to_numpy()
+    series = {}
+    for name in ROLLUP_SERIES:
+        if mode == 'minmax':
+            t, v = minmax(buckets, df[f"{name}_min"].to_numpy(dtype=float),
+                          df[f"{name}_max"].to_numpy(dtype=float), points)
+        else:
+            values = df[f"{name}_avg"].to_numpy(dtype=float)
+            idx = lttb(buckets, values, points)
+            t, v = buckets[idx], values[idx]
+        series[name] = {
+            't': [int(x) for x in t],
+            'v': [None if np.isnan(y) else float(y) for y in v],
+        }
+    return series
@@ -0,0 +1,493 @@
+"""
+Persistent anomaly score store
+Keeps is_anomaly/anomaly_score per telemetry row in a sidecar SQLite database,
+so each request only scores rows that arrived since the previous call.
+Chart rollups (backend.rollups), the dashboard aggregates
+(backend.aggregates) and the anomaly index (backend.anomaly_index) are
+maintained next to the scores.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from backend.aggregates import (
+    AGGREGATE_SCHEMAS, AGGREGATE_TABLES, aggregates_empty, apply_aggregates, prune_aggregates
+)
+from backend.anomaly_index import (
+    ANOMALY_INDEX_SCHEMAS, ANOMALY_INDEX_TABLE, anomaly_index_stale, anomaly_page_query,
+    apply_anomaly_index
+)
+from backend.feature_engine import FeatureEngine, KEY_COLUMN, ROLLING_WINDOW
+from backend.metrics import ANOMALIES_SCORED, ROWS_SCORED, stage
+from backend.rollups import (
+    ROLLUP_RESOLUTIONS, apply_rollups, prune_rollups, rollup_schemas, rollup_table
+)
+
+
+SCORES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS telemetry_scores (
+    telemetry_id INTEGER PRIMARY KEY,
+    is_anomaly INTEGER NOT NULL,
+    anomaly_score REAL NOT NULL,
+    model_version TEXT
+)
+"""
+
+# Store-wide settings, e.g. the model version all stored scores belong to
+META_SCHEMA = """
+CREATE TABLE IF NOT EXISTS score_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+)
+"""
+
+# Tables derived from the scores, emptied when the model changes
+DERIVED_TABLES = [rollup_table(resolution) for resolution in ROLLUP_RESOLUTIONS] + list(AGGREGATE_TABLES) \
+    + [ANOMALY_INDEX_TABLE]
+
+# Rows scored on a fresh store before the first request is answered
+DEFAULT_BACKFILL_ROWS = 1000
+# Older rows an anomaly page may score when it reaches below the scored range
+DEFAULT_ANOMALY_BACKFILL_ROWS = 20000
+# Upper bound of rows loaded and scored in one pass
+DEFAULT_CHUNK_ROWS = 2000
+# Seconds a worker waits for another process's scoring transaction
+WRITE_LOCK_TIMEOUT = 60
+# Rows searched backwards for each vehicle's rolling context; a vehicle not
+# seen within this range starts with an empty window
+PRIME_LOOKBACK_ROWS = 20000
+
+
+class ScoreStore:
+    """
+    Scores live in `telemetry_scores`, keyed by the telemetry rowid.
+    The scored rows always form one contiguous id range: MAX(telemetry_id)
+    is the high-water mark for new rows and MIN(telemetry_id) the floor
+    for deeper history requests.
+
+    score_fn(df_engineered) -> (is_anomaly, anomaly_score) arrays.
+    model_version labels every stored score; scores of another version are
+    dropped (see set_model) and rescored on demand.
+    """
+
+    def __init__(self, db_path, scores_path, score_fn, model_version=None,
+                 backfill_rows=DEFAULT_BACKFILL_ROWS,
+                 chunk_rows=DEFAULT_CHUNK_ROWS):
+        self.db_path = db_path
+        self.scores_path = scores_path
+        self.score_fn = score_fn
+        self.model_version = None
+        self.backfill_rows = backfill_rows
+        self.chunk_rows = chunk_rows
+        self._lock = threading.Lock()
+
+        # Streaming feature state of the newest scored row (head_id)
+        self._engine = FeatureEngine()
+        self._head_id = None
+
+        # (schema_version, telemetry columns), refreshed when the schema changes
+        self._columns = (None, [])
+        # Scores stored before the rollup/aggregate tables existed are rolled up once
+        self._rollups_checked = False
+
+        scores_dir = os.path.dirname(scores_path)
+        if scores_dir:
+            os.makedirs(scores_dir, exist_ok=True)
+        self._writer = sqlite3.connect(scores_path, timeout=WRITE_LOCK_TIMEOUT, check_same_thread=False)
+        self._writer.execute("PRAGMA journal_mode=WAL;")
+        self._writer.execute(SCORES_SCHEMA)
+        self._writer.execute(META_SCHEMA)
+        score_columns = [row[1] for row in self._writer.execute("PRAGMA table_info(telemetry_scores)")]
+        if 'model_version' not in score_columns:
+            self._writer.execute("ALTER TABLE telemetry_scores ADD COLUMN model_version TEXT")
+        for schema in rollup_schemas() + AGGREGATE_SCHEMAS + ANOMALY_INDEX_SCHEMAS:
+            self._writer.execute(schema)
+        self._writer.commit()
+        self.set_model(score_fn, model_version)
+
+    def set_model(self, score_fn, model_version=None):
+        """
+        Switch scoring to another model. Waits for a running scoring pass;
+        when the version differs from the stored one, all scores and their
+        rollups/aggregates are invalidated in one transaction and the newest
+        rows are rescored by the next request.
+        """
+        with self._lock:
+            self.score_fn = score_fn
+            self.model_version = model_version
+            if model_version is None:
+                return
+
+            with self._transaction():
+                stored = self._stored_version()
+                if stored is not None and stored != model_version:
+                    self._writer.execute("DELETE FROM telemetry_scores")
+                    for table in DERIVED_TABLES:
+                        self._writer.execute(f"DELETE FROM {table}")
+                    self._engine = FeatureEngine()
+                    self._head_id = None
+                    print(f"♻️ Scores of model {stored} invalidated, rescoring with {model_version}")
+                self._writer.execute(
+                    "INSERT OR REPLACE INTO score_meta (key, value) VALUES ('model_version', ?)",
+                    (model_version,)
+                )
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Write transaction on the scores database. BEGIN IMMEDIATE takes the
+        write lock up front, so API worker processes sharing the store score
+        one at a time and re-read the high-water mark under the lock.
+        """
+        self._writer.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._writer.rollback()
+            raise
+        self._writer.commit()
+
+    def _stored_version(self):
+        row = self._writer.execute("SELECT value FROM score_meta WHERE key = 'model_version'").fetchone()
+        return row[0] if row is not None else None
+
+    def _version_current(self):
+        """False while another worker has already switched the store to a different model"""
+        stored = self._stored_version()
+        return stored is None or stored == self.model_version
+
+    def connect(self):
+        """Open a read-only telemetry connection with the score table attached"""
+        conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True)
+        conn.execute("ATTACH DATABASE ? AS scores", (f'file:{self.scores_path}?mode=ro',))
+        return conn
+
+    def _projection(self, conn, alias='t', only=None):
+        """
+        Telemetry columns with the row id exposed once as `id`, for both the
+        legacy table (implicit rowid) and the migrated one (id INTEGER PRIMARY KEY).
+        only restricts the projection to these columns (unknown names are ignored).
+        """
+        schema_version = conn.execute("PRAGMA main.schema_version").fetchone()[0]
+        cached_version, columns = self._columns
+        if schema_version != cached_version:
+            columns = [
+                row[1] for row in conn.execute("PRAGMA main.table_info(telemetry)")
+                if row[1] != 'id'
+            ]
+            self._columns = (schema_version, columns)
+
+        if only is not None:
+            columns = [col for col in columns if col in set(only)]
+        return ", ".join([f"{alias}.rowid AS id"] + [f'{alias}."{col}"' for col in columns])
+
+    def _scored_bounds(self):
+        return self._writer.execute(
+            "SELECT MIN(telemetry_id), MAX(telemetry_id) FROM telemetry_scores"
+        ).fetchone()
+
+    def score_pending(self, conn):
+        """
+        Score every telemetry row above the high-water mark, one chunk per
+        transaction. Another worker may advance the mark in between; each
+        chunk starts from the mark as stored.
+        """
+        max_id = conn.execute("SELECT MAX(rowid) FROM telemetry").fetchone()[0]
+        if max_id is None:
+            return 0
+        if self._rollups_checked:
+            # Up to date as the caller's connection sees it: no lock, no write transaction
+            high_water = conn.execute("SELECT MAX(telemetry_id) FROM scores.telemetry_scores").fetchone()[0]
+            if high_water is not None and high_water >= max_id:
+                return 0
+
+        with self._lock:
+
+            if not self._rollups_checked:
+                with self._transaction():
+                    self._rebuild_rollups(conn)
+                self._rollups_checked = True
+
+            scored = 0
+            while True:
+                with self._transaction():
+                    if not self._version_current():
+                        # This worker rescores once its own registry has swapped too
+                        break
+                    _, high_water = self._scored_bounds()
+                    if high_water is None:
+                        start = max(1, max_id - self.backfill_rows + 1)
+                    else:
+                        start = high_water + 1
+                    if start > max_id:
+                        break
+
+                    chunk_hi = min(max_id, start + self.chunk_rows - 1)
+                    if self._head_id != start - 1:
+                        self._engine = self._primed_engine(conn, start)
+                    # Re-prime on the next call if scoring fails half way
+                    self._head_id = None
+                    scored += self._score_range(conn, start, chunk_hi, self._engine)
+                    self._head_id = chunk_hi
+
+            if scored:
+                with self._transaction():
+                    prune_rollups(self._writer)
+                    prune_aggregates(self._writer)
+            return scored
+
+    def backfill(self, conn, lo_id):
+        """Score older rows from lo_id up to the current floor of the store"""
+        with self._lock, self._transaction():
+            floor, _ = self._scored_bounds()
+            if floor is None or lo_id >= floor or not self._version_current():
+                return 0
+            engine = self._primed_engine(conn, lo_id)
+            return self._score_range(conn, lo_id, floor - 1, engine)
+
+    def _rebuild_rollups(self, conn):
+        """Roll up already stored scores into the rollup/aggregate/index tables that are still empty"""
+        rollups = not self._writer.execute(
+            f"SELECT 1 FROM {rollup_table(ROLLUP_RESOLUTIONS[0])} LIMIT 1"
+        ).fetchone()
+        aggregates = aggregates_empty(self._writer)
+        anomalies = anomaly_index_stale(self._writer)
+        floor, high_water = self._scored_bounds()
+        if floor is None or not (rollups or aggregates or anomalies):
+            return
+
+        lo_id = floor
+        while lo_id <= high_water:
+            chunk_hi = min(high_water, lo_id + self.chunk_rows - 1)
+            df = pd.read_sql_query(
+                f"SELECT {self._projection(conn)}, s.is_anomaly, s.anomaly_score "
+                "FROM telemetry t JOIN scores.telemetry_scores s ON s.telemetry_id = t.rowid "
+                "WHERE t.rowid >= ? AND t.rowid <= ?",
+                conn, params=(lo_id, chunk_hi)
+            )
+            if not df.empty:
+                is_anomaly, scores = df['is_anomaly'].to_numpy(), df['anomaly_score'].to_numpy()
+                if rollups:
+                    apply_rollups(self._writer, df, is_anomaly, scores)
+                if aggregates:
+                    apply_aggregates(self._writer, df, is_anomaly, scores)
+                if anomalies:
+                    apply_anomaly_index(self._writer, df, is_anomaly, scores)
+            lo_id = chunk_hi + 1
+
+    def _primed_engine(self, conn, start_id):
+        """Feature engine holding the rolling context of the rows before start_id"""
+        engine = FeatureEngine()
+        projection = self._projection(conn)
+
+        if KEY_COLUMN in self._columns[1]:
+            # Last ROLLING_WINDOW - 1 rows of every vehicle active in the lookback
+            context = pd.read_sql_query(
+                f"SELECT * FROM ("
+                f"  SELECT {projection}, ROW_NUMBER() OVER ("
+                f'    PARTITION BY t."{KEY_COLUMN}" ORDER BY t.rowid DESC) AS _rn '
+                "  FROM telemetry t WHERE t.rowid < ? AND t.rowid >= ?"
+                ") WHERE _rn <= ? ORDER BY id",
+                conn, params=(start_id, start_id - PRIME_LOOKBACK_ROWS, ROLLING_WINDOW - 1)
+            )
+        else:
+            context = pd.read_sql_query(
+                f"SELECT {projection} FROM telemetry t "
+                "WHERE t.rowid < ? ORDER BY t.rowid DESC LIMIT ?",
+                conn, params=(start_id, ROLLING_WINDOW - 1)
+            ).iloc[::-1]
+
+        engine.prime(context)
+        return engine
+
+    def _score_range(self, conn, lo_id, hi_id, engine):
+        scored = 0
+        while lo_id <= hi_id:
+            chunk_hi = min(hi_id, lo_id + self.chunk_rows - 1)
+
+            with stage('db'):
+                df = pd.read_sql_query(
+                    f"SELECT {self._projection(conn)} FROM telemetry t "
+                    "WHERE t.rowid >= ? AND t.rowid <= ? ORDER BY t.rowid",
+                    conn, params=(lo_id, chunk_hi)
+                )
+            if not df.empty:
+                with stage('features'):
+                    df_engineered = engine.transform(df)
+                is_anomaly, scores = self.score_fn(df_engineered)
+
+                with stage('store'):
+                    self._writer.executemany(
+                        "INSERT OR REPLACE INTO telemetry_scores "
+                        "(telemetry_id, is_anomaly, anomaly_score, model_version) VALUES (?, ?, ?, ?)",
+                        zip(df['id'].tolist(), is_anomaly.tolist(), scores.tolist(),
+                            [self.model_version] * len(df))
+                    )
+                    # Rollups, aggregates and the anomaly index change in the same transaction as the scores
+                    apply_rollups(self._writer, df, is_anomaly, scores)
+                    apply_aggregates(self._writer, df, is_anomaly, scores)
+                    apply_anomaly_index(self._writer, df, is_anomaly, scores)
+                scored += len(df)
+                ROWS_SCORED.inc(len(df))
+                ANOMALIES_SCORED.inc(int(is_anomaly.sum()))
+
+            lo_id = chunk_hi + 1
+        return scored
+
+    def _read_latest(self, conn, limit, after_id):
+        with stage('db'):
+            return pd.read_sql_query(
+                f"SELECT {self._projection(conn)}, s.is_anomaly, s.anomaly_score, s.model_version "
+                "FROM telemetry t "
+                "LEFT JOIN scores.telemetry_scores s ON s.telemetry_id = t.rowid "
+                "WHERE t.rowid > ? ORDER BY t.rowid DESC LIMIT ?",
+                conn, params=(after_id, limit)
+            )
+
+    def between(self, conn, start_ts=None, end_ts=None, columns=None, mission_id=None, limit=None):
+        """
+        Scored telemetry rows with start_ts <= timestamp <= end_ts, oldest first.
+        columns limits the telemetry fields read (id and timestamp are always included).
+        """
+        self.score_pending(conn)
+        only = None if columns is None else ['timestamp'] + list(columns)
+
+        conditions, params = [], []
+        if start_ts is not None:
+            conditions.append("t.timestamp >= ?")
+            params.append(int(start_ts))
+        if end_ts is not None:
+            conditions.append("t.timestamp <= ?")
+            params.append(int(end_ts))
+        if mission_id is not None:
+            conditions.append("t.mission_id = ?")
+            params.append(str(mission_id))
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+
+        with stage('db'):
+            return pd.read_sql_query(
+                f"SELECT {self._projection(conn, only=only)}, s.is_anomaly, s.anomaly_score, s.model_version "
+                "FROM telemetry t "
+                "LEFT JOIN scores.telemetry_scores s ON s.telemetry_id = t.rowid "
+                f"{where}ORDER BY t.rowid LIMIT ?",
+                conn, params=params + [-1 if limit is None else limit]
+            )
+
+    def anomalies(self, conn, limit, before=None, mission_id=None, event=None, min_score=None,
+                  from_ts=None, to_ts=None, after_id=None,
+                  backfill_limit=DEFAULT_ANOMALY_BACKFILL_ROWS):
+        """
+        One page of anomalous rows, newest first, read from the anomaly index
+        (filters and the before=(timestamp, id) cursor: see anomaly_page_query).
+        A page that runs out of scored rows scores older ones first, at most
+        backfill_limit rows per call.
+        """
+        self.score_pending(conn)
+        sql, params = anomaly_page_query(
+            self._projection(conn), limit, before=before, mission_id=mission_id, event=event,
+            min_score=min_score, from_ts=from_ts, to_ts=to_ts, after_id=after_id
+        )
+        with stage('db'):
+            df = pd.read_sql_query(sql, conn, params=params)
+
+        budget = backfill_limit
+        while len(df) < limit and budget > 0:
+            floor = conn.execute("SELECT MIN(telemetry_id) FROM scores.telemetry_scores").fetchone()[0]
+            lowest = conn.execute("SELECT MIN(rowid) FROM telemetry").fetchone()[0]
+            if floor is None or lowest is None or floor <= lowest:
+                break
+            if after_id is not None and floor <= after_id + 1:
+                break
+            if from_ts is not None:
+                floor_ts = conn.execute("SELECT timestamp FROM telemetry WHERE rowid = ?", (floor,)).fetchone()
+                if floor_ts is not None and floor_ts[0] < from_ts:
+                    break
+
+            scored = self.backfill(conn, max(lowest, floor - min(budget, self.chunk_rows)))
+            if not scored:
+                break
+            budget -= scored
+            with stage('db'):
+                df = pd.read_sql_query(sql, conn, params=params)
+
+        return df
+
+    def max_id(self, conn):
+        """Id of the newest telemetry row (0 for an empty table)"""
+        return conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM telemetry").fetchone()[0]
+
+    def data_version(self, conn):
+        """
+        Version of what the read endpoints return: the newest and oldest
+        row ids (retention deletes the oldest rows), the floor of the scored
+        range (backfills lower it) and the model version of the stored scores.
+        Pooled read connections run in autocommit, so this query and the
+        body read after it do not share a snapshot: the body may include
+        later commits, never earlier ones. A version can therefore tag a
+        slightly newer body, and the next change of version replaces it.
+        """
+        lo_id, hi_id = conn.execute(
+            # Separate subqueries: SQLite only optimizes a lone MIN()/MAX() to an index seek
+            "SELECT COALESCE((SELECT MIN(rowid) FROM telemetry), 0), "
+            "COALESCE((SELECT MAX(rowid) FROM telemetry), 0)"
+        ).fetchone()
+        try:
+            floor, model = conn.execute(
+                "SELECT (SELECT MIN(telemetry_id) FROM scores.telemetry_scores), "
+                "(SELECT value FROM scores.score_meta WHERE key = 'model_version')"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            floor, model = None, None
+        return (hi_id, lo_id, floor, model)
+
+    def row_count(self, conn):
+        """
+        Number of telemetry rows, from the producer's trigger-maintained
+        counter when present (COUNT(*) otherwise)
+        """
+        try:
+            row = conn.execute("SELECT total FROM telemetry_row_count WHERE id = 0").fetchone()
+        except sqlite3.OperationalError:
+            row = None
+        if row is not None:
+            return row[0]
+        return conn.execute("SELECT COUNT(*) FROM telemetry").fetchone()[0]
+
+    def since(self, conn, after_id, limit=None):
+        """Scored telemetry rows with id above after_id, oldest first"""
+        self.score_pending(conn)
+        with stage('db'):
+            return pd.read_sql_query(
+                f"SELECT {self._projection(conn)}, s.is_anomaly, s.anomaly_score, s.model_version "
+                "FROM telemetry t "
+                "LEFT JOIN scores.telemetry_scores s ON s.telemetry_id = t.rowid "
+                "WHERE t.rowid > ? ORDER BY t.rowid LIMIT ?",
+                conn, params=(after_id, -1 if limit is None else limit)
+            )
+
+    def prepare_latest(self, conn, limit, after_id=0):
+        """
+        Score every row latest(conn, limit, after_id) returns: rows above the
+        high-water mark, then older ones when the window reaches below the floor
+        """
+        self.score_pending(conn)
+        lowest, floor = conn.execute(
+            "SELECT (SELECT MIN(rowid) FROM ("
+            "  SELECT rowid FROM telemetry WHERE rowid > ? ORDER BY rowid DESC LIMIT ?)), "
+            "(SELECT MIN(telemetry_id) FROM scores.telemetry_scores)",
+            (after_id, limit)
+        ).fetchone()
+        if lowest is not None and floor is not None and lowest < floor:
+            self.backfill(conn, lowest)
+
+    def latest(self, conn, limit, after_id=0):
+        """
+        Latest `limit` telemetry rows with their scores, newest first.
+        after_id restricts the result to rows newer than a client's cursor.
+        """
+        self.prepare_latest(conn, limit, after_id)
+        return self._read_latest(conn, limit, after_id)
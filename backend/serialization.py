@@ -0,0 +1,192 @@
+"""
+Fast encoding of telemetry frames
+Frames are converted column by column (one C-level tolist per column instead
+of one dict of boxed values per cell) and encoded with orjson when it is
+installed. NaN/inf become null and NumPy integers/floats are written as plain
+numbers on both paths.
+
+Bulk clients can negotiate a binary body instead: an Arrow IPC stream written
+straight from the column buffers, or (with msgpack installed) a columnar
+MessagePack map.
+"""
+
+import json
+import math
+
+import numpy as np
+import pyarrow as pa
+from flask.json.provider import JSONProvider
+
+from backend.metrics import stage
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library encoder is the fallback
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional, only needed for application/msgpack responses
+    msgpack = None
+
+
+# ?format= layouts: one object per row, or one array per column
+FORMATS = ('records', 'columns')
+
+JSON_MIMETYPE = 'application/json'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+MSGPACK_MIMETYPE = 'application/msgpack'
+# Rows per Arrow record batch, i.e. per chunk of a streamed response
+ARROW_BATCH_ROWS = 10000
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return None if not np.isfinite(obj) else float(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _finite(obj):
+    """Replace NaN/inf floats by None (standard library path only)"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+def dumps(obj):
+    """Encode obj as compact UTF-8 JSON bytes"""
+    with stage('encode'):
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+        return json.dumps(_finite(obj), default=_default, separators=(',', ':'),
+                          allow_nan=False).encode('utf-8')
+
+
+def column_values(series):
+    """One column as a JSON-ready sequence (numeric arrays pass through to orjson)"""
+    values = series.to_numpy()
+    if values.dtype.kind in 'biuf':
+        if orjson is not None:
+            return np.ascontiguousarray(values)
+        if values.dtype.kind == 'f' and not np.isfinite(values).all():
+            return [None if not math.isfinite(v) else v for v in values.tolist()]
+        return values.tolist()
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def frame_columns(df):
+    """{column: [values...]} for every column of df"""
+    return {str(col): column_values(df[col]) for col in df.columns}
+
+
+def frame_records(df):
+    """[{column: value}, ...], like df.to_dict('records') but built per column"""
+    names = [str(col) for col in df.columns]
+    columns = [
+        values.tolist() if isinstance(values, np.ndarray) else values
+        for values in (column_values(df[col]) for col in df.columns)
+    ]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def frame_payload(df, fmt='records'):
+    """df in the requested ?format= layout"""
+    with stage('frame'):
+        if fmt == 'columns':
+            return frame_columns(df)
+        return frame_records(df)
+
+
+def negotiate(accept_mimetypes):
+    """
+    Body type for a request's Accept header: JSON unless the client prefers
+    Arrow or MessagePack; None when only an unavailable type (MessagePack
+    without msgpack installed) is acceptable
+    """
+    best = accept_mimetypes.best_match([JSON_MIMETYPE, ARROW_MIMETYPE, MSGPACK_MIMETYPE],
+                                       default=JSON_MIMETYPE)
+    if best == MSGPACK_MIMETYPE and msgpack is None:
+        return JSON_MIMETYPE if accept_mimetypes.quality(JSON_MIMETYPE) else None
+    return best
+
+
+class _ChunkSink:
+    """Write target collecting the IPC writer's output until it is yielded"""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def arrow_stream(df, batch_rows=ARROW_BATCH_ROWS):
+    """
+    Generator of Arrow IPC stream bytes for df: the schema first, then one
+    chunk per record batch, converted from the column arrays without
+    building per-row Python objects
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        yield sink.drain()
+        for batch in table.to_batches(max_chunksize=batch_rows):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def msgpack_columns(df):
+    """Columnar MessagePack map {column: [values]}, NaN kept as float (requires msgpack)"""
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if series.dtype.kind in 'biuf':
+            columns[str(col)] = series.to_numpy().tolist()
+        else:
+            columns[str(col)] = series.astype(object).where(series.notna(), None).tolist()
+    return msgpack.packb(columns, use_bin_type=True)
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by dumps(), so jsonify() takes the fast path too"""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
@@ -0,0 +1,219 @@
+"""
+Server-push telemetry stream
+One background thread scores and serializes each new telemetry row once,
+then fans the encoded event out to every subscribed dashboard.
+Subscribers are either threads (stream(), WSGI) or asyncio tasks
+(astream(), ASGI); an idle asyncio subscriber costs no thread.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+
+from backend.serialization import frame_records
+
+
+# How often the fan-out thread checks the database for new rows
+DEFAULT_POLL_INTERVAL = 0.2
+# Events buffered per subscriber before it is considered too slow and dropped
+DEFAULT_SUBSCRIBER_BUFFER = 1000
+# Idle time after which a keep-alive comment is sent to each client
+KEEPALIVE_SECONDS = 15
+
+
+def format_sse(data, event=None):
+    """Format one Server-Sent Events message"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {data}\n\n"
+
+
+class Subscription:
+    """Queue of encoded events for one connected client"""
+
+    def __init__(self, buffer_size):
+        self.events = queue.Queue(maxsize=buffer_size)
+        self.closed = False
+
+    def get(self, timeout):
+        """Next (row_id, message) pair, or None after timeout"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def deliver(self, item):
+        """Queue an event from the fan-out thread; raises queue.Full"""
+        self.events.put_nowait(item)
+
+
+class AsyncSubscription:
+    """Subscription read by a coroutine on the given event loop"""
+
+    def __init__(self, loop, buffer_size):
+        self.loop = loop
+        self.events = asyncio.Queue(maxsize=buffer_size)
+        self.closed = False
+
+    async def get(self, timeout):
+        """Next (row_id, message) pair, or None after timeout"""
+        try:
+            return await asyncio.wait_for(self.events.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def _put(self, item):
+        try:
+            self.events.put_nowait(item)
+        except asyncio.QueueFull:
+            self.closed = True
+
+    def deliver(self, item):
+        """Hand an event to the loop from the fan-out thread; raises queue.Full"""
+        # qsize() from another thread is approximate; _put() catches the rest
+        if self.closed or self.events.full():
+            raise queue.Full
+        try:
+            self.loop.call_soon_threadsafe(self._put, item)
+        except RuntimeError:  # loop closed
+            raise queue.Full
+
+
+class TelemetryHub:
+    """
+    Shared fan-out for newly scored telemetry rows.
+    The polling thread only runs while at least one client is subscribed.
+    """
+
+    def __init__(self, score_store, pool, encode,
+                 poll_interval=DEFAULT_POLL_INTERVAL,
+                 subscriber_buffer=DEFAULT_SUBSCRIBER_BUFFER):
+        self.score_store = score_store
+        self.pool = pool
+        self.encode = encode
+        self.poll_interval = poll_interval
+        self.subscriber_buffer = subscriber_buffer
+
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_id = 0
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def subscribe(self, subscription=None):
+        """Register a client; events are queued from this moment on"""
+        if subscription is None:
+            subscription = Subscription(self.subscriber_buffer)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                # Baseline before the client reads its history, so no row
+                # inserted in between is missed (duplicates are skipped)
+                self._last_id = self._max_id()
+                self._thread = threading.Thread(
+                    target=self._run, name="telemetry-hub", daemon=True
+                )
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.closed = True
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _publish(self, row_id, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            try:
+                subscription.deliver((row_id, message))
+            except queue.Full:
+                # Slow client: drop it instead of buffering without bound
+                print("⚠️ Dropping slow telemetry stream subscriber")
+                self.unsubscribe(subscription)
+
+    def _max_id(self):
+        with self.pool.connection() as conn:
+            return self.score_store.max_id(conn)
+
+    def _poll(self, conn):
+        df_new = self.score_store.since(conn, self._last_id)
+        if df_new.empty:
+            return
+
+        for row in frame_records(df_new):
+            self._publish(row['id'], format_sse(self.encode(row), event='telemetry'))
+        self._last_id = int(df_new['id'].iloc[-1])
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    break
+
+            try:
+                with self.pool.connection() as conn:
+                    self._poll(conn)
+            except Exception as e:
+                print(f"❌ Telemetry stream error: {e}")
+
+            time.sleep(self.poll_interval)
+
+    def _history(self, history_limit):
+        with self.pool.connection() as conn:
+            return self.score_store.latest(conn, history_limit)
+
+    def stream(self, history_limit):
+        """Generator of SSE messages: the initial history, then live rows"""
+        subscription = self.subscribe()
+        try:
+            df_history = self._history(history_limit)
+
+            last_sent = int(df_history['id'].iloc[0]) if not df_history.empty else 0
+            yield format_sse(self.encode(frame_records(df_history)), event='history')
+
+            while not subscription.closed:
+                item = subscription.get(timeout=KEEPALIVE_SECONDS)
+                if item is None:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                row_id, message = item
+                # Rows already included in the initial history are skipped
+                if row_id > last_sent:
+                    last_sent = row_id
+                    yield message
+        finally:
+            self.unsubscribe(subscription)
+
+    async def astream(self, history_limit, run_blocking):
+        """
+        Async generator of SSE messages for ASGI servers. run_blocking(fn, *args)
+        awaits fn in a worker thread (used for the history read).
+        """
+        subscription = self.subscribe(
+            AsyncSubscription(asyncio.get_running_loop(), self.subscriber_buffer)
+        )
+        try:
+            df_history = await run_blocking(self._history, history_limit)
+
+            last_sent = int(df_history['id'].iloc[0]) if not df_history.empty else 0
+            yield format_sse(self.encode(frame_records(df_history)), event='history')
+
+            while not subscription.closed:
+                item = await subscription.get(timeout=KEEPALIVE_SECONDS)
+                if item is None:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                row_id, message = item
+                if row_id > last_sent:
+                    last_sent = row_id
+                    yield message
+        finally:
+            self.unsubscribe(subscription)
@@ -0,0 +1,14 @@
+"""
+Offline benchmarks for the scoring and ingestion hot paths
+Everything runs on synthetic telemetry from src/generate_dummy_data.py and
+on models trained from it with fixed seeds, so two runs on the same machine
+are comparable without the data/ or models/ files of a deployment:
+
+    python -m benchmarks.run                      # all suites -> benchmarks/results/<commit>.json
+    python -m benchmarks.run --quick --only scoring,serialization
+    python -m benchmarks.run --compare benchmarks/results/<older commit>.json
+
+Suites: features, scaling, scoring (IsolationForest vs LOF, sklearn vs the
+compiled scorers), serialization, producer (inserts/s of the batched writer)
+and endpoints (Flask test client against a temporary database).
+"""
@@ -0,0 +1,170 @@
+"""
+Endpoint latency through the Flask test client
+api_server.py opens data/ and models/ relative to the working directory, so
+the suite builds a temporary workspace with that layout (a producer-made
+database of synthetic rows and the benchmark LOF model) and runs the
+requests in a child process started there:
+
+    python -m benchmarks.endpoints <workspace> <out.json> [--min-time S]
+
+Every endpoint is timed twice: "cold" clears the response cache before each
+request, "cached" repeats the identical request on unchanged data.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic
+from benchmarks.suites import _init_producer_db, result, time_call
+
+
+ENDPOINTS = [
+    ('status', '/status'),
+    ('latest', '/telemetry/latest?history_limit=150'),
+    ('history', '/telemetry/history?points=500'),
+    ('stats', '/api/stats'),
+    ('anomalies', '/telemetry/anomalies?limit=100'),
+    ('telemetry_1000', '/api/telemetry?limit=1000'),
+    ('telemetry_1000_columns', '/api/telemetry?limit=1000&format=columns'),
+]
+PREDICT_BATCHES = (1, 150, 1000)
+MODEL_LOAD_TIMEOUT = 300
+
+
+def build_workspace(directory, models, rows):
+    """data/uav_telemetry.db with `rows` synthetic rows ending now, plus models/ and feature names"""
+    producer = synthetic.src_module('uav_producer')
+    data_dir = os.path.join(directory, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    shutil.copy(synthetic.FEATURES_PATH, os.path.join(data_dir, 'feature_names.json'))
+    synthetic.save_models(models, os.path.join(directory, 'models'), 'lof')
+
+    db_path = os.path.join(data_dir, 'uav_telemetry.db')
+    columns = _init_producer_db(producer, data_dir, db_path)
+    df = synthetic.telemetry_frame(rows)
+    df['timestamp'] = int(time.time()) - len(df) + 1 + np.arange(len(df), dtype=np.int64)
+    df['vehicle_id'] = 'UAV-001'
+
+    conn = sqlite3.connect(db_path)
+    producer.configure_writer_connection(conn)
+    writer = producer.TelemetryWriter(conn, columns, batch_size=len(df))
+    writer.write_batch({col: df[col].to_numpy() for col in df.columns})
+    writer.flush()
+    conn.close()
+    return db_path
+
+
+def run(ctx):
+    """Build a workspace, run the child process and return its results"""
+    with tempfile.TemporaryDirectory(prefix='puma-bench-api-') as workspace:
+        build_workspace(workspace, ctx['models'], ctx['endpoint_rows'])
+        out_path = os.path.join(workspace, 'results.json')
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [synthetic.REPO_ROOT, env.get('PYTHONPATH')]))
+        proc = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.endpoints', workspace, out_path,
+             '--min-time', str(ctx['min_time'])],
+            cwd=workspace, env=env, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"endpoint benchmark failed:\n{proc.stderr[-4000:]}")
+        with open(out_path, 'r') as f:
+            return json.load(f)
+
+
+def _request(client, method, path, **kwargs):
+    response = client.open(path, method=method, **kwargs)
+    if response.status_code != 200:
+        raise RuntimeError(f"{method} {path} -> {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response
+
+
+def measure(min_time):
+    """Results for every endpoint; runs inside the workspace"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import api_server
+
+        deadline = time.monotonic() + MODEL_LOAD_TIMEOUT
+        while api_server.model_registry.active is None:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"model did not load: {api_server.model_registry.last_error}")
+            time.sleep(0.05)
+
+    client = api_server.app.test_client()
+    cache = api_server.response_cache
+    out = []
+
+    # First scoring request: every stored row goes through features, model and store
+    with api_server.read_pool.connection() as conn:
+        backlog = api_server.score_store.max_id(conn)
+    start = time.perf_counter()
+    _request(client, 'GET', '/telemetry/latest?history_limit=150')
+    out.append(result('endpoints', 'backlog_scoring', backlog, [time.perf_counter() - start]))
+
+    for name, path in ENDPOINTS:
+        def cold():
+            cache.clear()
+            _request(client, 'GET', path)
+
+        out.append(result('endpoints', f'{name}/cold', 1, time_call(cold, min_time)))
+        out.append(result('endpoints', f'{name}/cached', 1,
+                          time_call(lambda: _request(client, 'GET', path), min_time)))
+
+    # Live poll: one new producer row, then the dashboard's request scores it
+    producer_conn = sqlite3.connect(api_server.DB_PATH)
+    cursor = producer_conn.execute("SELECT * FROM telemetry ORDER BY id DESC LIMIT 1")
+    columns = [d[0] for d in cursor.description if d[0] != 'id']
+    last = dict(zip([d[0] for d in cursor.description], cursor.fetchone()))
+    insert_sql = f"INSERT INTO telemetry ({','.join(columns)}) VALUES ({','.join('?' for _ in columns)})"
+
+    def insert_and_poll():
+        last['timestamp'] += 1
+        producer_conn.execute(insert_sql, [last[col] for col in columns])
+        producer_conn.commit()
+        _request(client, 'GET', '/telemetry/latest?history_limit=150')
+
+    out.append(result('endpoints', 'latest_after_insert', 1, time_call(insert_and_poll, min_time)))
+
+    df = pd.read_sql_query(
+        f"SELECT {', '.join(columns)} FROM telemetry ORDER BY id LIMIT {max(PREDICT_BATCHES)}", producer_conn
+    )
+    producer_conn.close()
+    records = df.astype(object).where(df.notna(), None).to_dict('records')
+    for batch in PREDICT_BATCHES:
+        body = records[:batch]
+        out.append(result('endpoints', 'predict', batch,
+                          time_call(lambda: _request(client, 'POST', '/api/predict', json=body), min_time)))
+    return out
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time API endpoints inside a benchmark workspace")
+    parser.add_argument("workspace", help="Directory with data/ and models/ (see build_workspace)")
+    parser.add_argument("out", help="Where to write the JSON results")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds spent timing each endpoint")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.chdir(args.workspace)
+    sys.path.insert(0, synthetic.REPO_ROOT)
+    results = measure(args.min_time)
+    with open(args.out, 'w') as f:
+        json.dump(results, f)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""
+Local load test: many dashboards against a live producer
+Builds a temporary workspace (synthetic rows and a benchmark LOF model, see
+benchmarks/endpoints.py), starts the API server and src/uav_producer.py on
+it, then runs N simulated dashboards for a fixed duration:
+
+    python -m benchmarks.loadtest --clients 50 --duration 60
+    python -m benchmarks.loadtest --server gunicorn --workers 4 --clients 200 --producer-rate 10
+    python -m benchmarks.loadtest --mode stream --clients 300 --server uvicorn
+
+Dashboard modes:
+- poll: GET /telemetry/latest?history_limit=150 every --latest-interval
+  seconds (conditional on the last ETag, as a browser revalidates) plus
+  GET /status every --status-interval seconds
+- stream: what App.tsx does today; one /telemetry/stream subscription plus
+  the /status poll
+
+Reports requests/s, p50/p95/p99 latency and errors per endpoint, the
+producer's insert rate, how far scoring lags behind it, and every
+"database is locked" seen in responses or in the server/producer logs.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from benchmarks import synthetic
+from benchmarks.endpoints import build_workspace
+
+
+SERVERS = ('flask', 'gunicorn', 'uvicorn')
+LOCKED_MESSAGE = 'database is locked'
+READY_TIMEOUT = 300
+HISTORY_LIMIT = 150
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server, port, workers):
+    """(argv, extra env) starting the API on 127.0.0.1:port"""
+    if server == 'flask':
+        return [sys.executable, '-m', 'flask', '--app', 'api_server', 'run',
+                '--host', '127.0.0.1', '--port', str(port)], {}
+    if server == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', '-c', os.path.join(synthetic.REPO_ROOT, 'gunicorn.conf.py'),
+                'api_server:app'], {'PUMA_BIND': f'127.0.0.1:{port}', 'PUMA_WORKERS': str(workers)}
+    return [sys.executable, '-m', 'uvicorn', 'asgi_server:app', '--host', '127.0.0.1',
+            '--port', str(port), '--no-access-log'], {}
+
+
+class Stats:
+    """Latencies, status codes and errors per endpoint, shared by all clients"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = defaultdict(Counter)
+        self.locked = 0
+        self.stream_rows = 0
+
+    def record(self, endpoint, seconds, status=None, error=None, locked=False):
+        with self._lock:
+            if status is not None:
+                self.statuses[endpoint][status] += 1
+            if error is None:
+                self.latencies[endpoint].append(seconds)
+            else:
+                self.errors[endpoint][error] += 1
+            if locked:
+                self.locked += 1
+
+    def add_stream_rows(self, rows):
+        with self._lock:
+            self.stream_rows += rows
+
+
+def _get(conn, path, headers=None):
+    """(status, body, response headers); reconnects lazily after a closed connection"""
+    try:
+        conn.request('GET', path, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, response.read(), response
+    except (http.client.HTTPException, OSError):
+        conn.close()
+        raise
+
+
+def timed_get(stats, conn, endpoint, path, headers=None):
+    start = time.perf_counter()
+    try:
+        status, body, response = _get(conn, path, headers)
+    except (http.client.HTTPException, OSError) as e:
+        stats.record(endpoint, time.perf_counter() - start, error=type(e).__name__)
+        return None
+    elapsed = time.perf_counter() - start
+    if status >= 400:
+        stats.record(endpoint, elapsed, status, error=f'http_{status}', locked=LOCKED_MESSAGE.encode() in body)
+    else:
+        stats.record(endpoint, elapsed, status)
+    return response
+
+
+class Dashboard(threading.Thread):
+    """One simulated dashboard: its own connection(s) and poll schedule"""
+
+    def __init__(self, index, args, port, stats, stop):
+        super().__init__(name=f'dashboard-{index}', daemon=True)
+        self.args = args
+        self.port = port
+        self.stats = stats
+        self.stop = stop
+        self.rng = random.Random(index)
+        self._stream_conn = None
+
+    def connection(self):
+        return http.client.HTTPConnection('127.0.0.1', self.port, timeout=self.args.timeout)
+
+    def run(self):
+        conn = self.connection()
+        now = time.monotonic()
+        # Random phase so the dashboards do not all fire in the same instant
+        schedule = {'status': now + self.rng.uniform(0, self.args.status_interval)}
+        if self.args.mode == 'poll':
+            schedule['latest'] = now + self.rng.uniform(0, self.args.latest_interval)
+        else:
+            threading.Thread(target=self.stream, name=f'{self.name}-stream', daemon=True).start()
+
+        etag = None
+        while True:
+            endpoint, due = min(schedule.items(), key=lambda item: item[1])
+            if self.stop.wait(max(0.0, due - time.monotonic())):
+                break
+            if endpoint == 'status':
+                timed_get(self.stats, conn, 'status', '/status')
+                interval = self.args.status_interval
+            else:
+                headers = {'If-None-Match': etag} if etag and self.args.etag else None
+                response = timed_get(self.stats, conn, 'latest',
+                                     f'/telemetry/latest?history_limit={HISTORY_LIMIT}', headers)
+                if response is not None and response.getheader('ETag'):
+                    etag = response.getheader('ETag')
+                interval = self.args.latest_interval
+            # Fixed rate; a slow response delays the next poll instead of bursting
+            schedule[endpoint] = max(due + interval, time.monotonic())
+        conn.close()
+        self.close_stream()
+
+    def stream(self):
+        """Hold one SSE subscription open; time-to-history is its latency"""
+        while not self.stop.is_set():
+            conn = self._stream_conn = self.connection()
+            start = time.perf_counter()
+            try:
+                conn.request('GET', f'/telemetry/stream?history_limit={HISTORY_LIMIT}')
+                response = conn.getresponse()
+                if response.status != 200:
+                    self.stats.record('stream', time.perf_counter() - start, response.status,
+                                      error=f'http_{response.status}')
+                    conn.close()
+                    self.stop.wait(1.0)
+                    continue
+                conn.sock.settimeout(None)
+                event = None
+                while not self.stop.is_set():
+                    line = response.readline()
+                    if not line:
+                        break
+                    if line.startswith(b'event:'):
+                        event = line[6:].strip()
+                    elif line.startswith(b'data:') and event == b'history':
+                        self.stats.record('stream', time.perf_counter() - start, response.status)
+                    elif line.startswith(b'data:') and event == b'telemetry':
+                        self.stats.add_stream_rows(1)
+            except (http.client.HTTPException, OSError, ValueError) as e:
+                if not self.stop.is_set():
+                    self.stats.record('stream', time.perf_counter() - start, error=type(e).__name__)
+                    self.stop.wait(1.0)
+            finally:
+                conn.close()
+
+    def close_stream(self):
+        conn = self._stream_conn
+        if conn is not None and conn.sock is not None:
+            try:
+                conn.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def wait_ready(port, process, timeout=READY_TIMEOUT):
+    """Poll /api/health/ready until the model is loaded"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode}")
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        try:
+            status, _, _ = _get(conn, '/api/health/ready')
+            if status == 200:
+                return
+        except (http.client.HTTPException, OSError):
+            pass
+        finally:
+            conn.close()
+        time.sleep(0.2)
+    raise RuntimeError(f"server not ready after {timeout} s")
+
+
+def table_counts(data_dir):
+    """(telemetry rows, highest scored id) straight from the workspace databases"""
+    conn = sqlite3.connect(f"file:{os.path.join(data_dir, 'uav_telemetry.db')}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("SELECT MAX(rowid) FROM telemetry").fetchone()[0] or 0
+        scores_path = os.path.join(data_dir, 'telemetry_scores.db')
+        scored = 0
+        if os.path.exists(scores_path):
+            conn.execute("ATTACH DATABASE ? AS scores", (f"file:{scores_path}?mode=ro",))
+            scored = conn.execute("SELECT MAX(telemetry_id) FROM scores.telemetry_scores").fetchone()[0] or 0
+        return rows, scored
+    finally:
+        conn.close()
+
+
+def count_locked(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'r', errors='replace') as f:
+        return sum(line.count(LOCKED_MESSAGE) for line in f)
+
+
+def summarize(stats, elapsed):
+    endpoints = {}
+    for endpoint in sorted(set(stats.latencies) | set(stats.errors)):
+        latencies = np.asarray(stats.latencies[endpoint]) * 1000
+        errors = sum(stats.errors[endpoint].values())
+        total = len(latencies) + errors
+        endpoints[endpoint] = {
+            'requests': total,
+            'requests_per_s': total / elapsed,
+            'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'p95_ms': float(np.percentile(latencies, 95)) if len(latencies) else None,
+            'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+            'max_ms': float(latencies.max()) if len(latencies) else None,
+            'error_rate': errors / total if total else 0.0,
+            'statuses': {str(k): v for k, v in sorted(stats.statuses[endpoint].items())},
+            'errors': dict(stats.errors[endpoint]),
+        }
+    return endpoints
+
+
+def print_report(report):
+    config = report['config']
+    print("\n" + "=" * 78)
+    print(f"📊 {config['clients']} dashboards ({config['mode']}) on {config['server']} "
+          f"for {report['elapsed_s']:.0f} s, producer {config['producer_rate']:g} Hz"
+          + (f" x {config['fleet']} UAVs" if config['fleet'] else ""))
+    print(f"{'endpoint':<10} {'req':>8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    for endpoint, s in report['endpoints'].items():
+        def ms(value):
+            return f"{value:9.1f}" if value is not None else f"{'-':>9}"
+        print(f"{endpoint:<10} {s['requests']:>8} {s['requests_per_s']:>8.1f} {ms(s['p50_ms'])} "
+              f"{ms(s['p95_ms'])} {ms(s['p99_ms'])} {s['error_rate']:>7.2%}")
+        if s['errors']:
+            print(f"{'':<10} errors: {s['errors']}")
+    producer = report['producer']
+    print(f"Producer: {producer['rows']} rows ({producer['rows_per_s']:.1f} rows/s), "
+          f"scoring lag at end: {producer['scoring_lag_rows']} rows")
+    if config['mode'] == 'stream':
+        print(f"Stream rows delivered: {report['stream_rows']}")
+    locked = report['database_locked']
+    print(f"'database is locked': {locked['responses']} responses, {locked['server_log']} in server log, "
+          f"{locked['producer_log']} in producer log")
+
+
+def run(args):
+    models = synthetic.train_models(args.train_rows)
+    workspace = args.workspace or tempfile.mkdtemp(prefix='puma-loadtest-')
+    data_dir = os.path.join(workspace, 'data')
+    build_workspace(workspace, models, args.seed_rows)
+
+    port = args.port or free_port()
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [synthetic.REPO_ROOT, env.get('PYTHONPATH')]))
+    env['PUMA_DATA_DIR'] = data_dir
+    env['PYTHONUNBUFFERED'] = '1'
+    server_log = os.path.join(workspace, 'server.log')
+    producer_log = os.path.join(workspace, 'producer.log')
+
+    argv, server_env = server_command(args.server, port, args.workers)
+    processes = []
+    stats, stop = Stats(), threading.Event()
+    try:
+        with open(server_log, 'w') as log:
+            server = subprocess.Popen(argv, cwd=workspace, env={**env, **server_env},
+                                      stdout=log, stderr=subprocess.STDOUT)
+        processes.append(server)
+        print(f"Starting {args.server} on port {port} (workspace {workspace})...")
+        wait_ready(port, server)
+        # Score the seeded rows before the clock starts
+        warmup = http.client.HTTPConnection('127.0.0.1', port, timeout=READY_TIMEOUT)
+        _get(warmup, f'/telemetry/latest?history_limit={HISTORY_LIMIT}')
+        warmup.close()
+
+        rows_before, _ = table_counts(data_dir)
+        if args.producer_rate > 0:
+            producer_argv = [sys.executable, os.path.join(synthetic.SRC_DIR, 'uav_producer.py'),
+                             '--rate', str(args.producer_rate)]
+            if args.fleet:
+                producer_argv += ['--fleet', str(args.fleet), '--seed', '0']
+            with open(producer_log, 'w') as log:
+                processes.append(subprocess.Popen(producer_argv, cwd=workspace, env=env,
+                                                  stdout=log, stderr=subprocess.STDOUT))
+
+        dashboards = [Dashboard(i, args, port, stats, stop) for i in range(args.clients)]
+        print(f"Running {args.clients} dashboards for {args.duration:g} s...")
+        start = time.monotonic()
+        for dashboard in dashboards:
+            dashboard.start()
+        stop.wait(args.duration)
+        stop.set()
+        elapsed = time.monotonic() - start
+        for dashboard in dashboards:
+            dashboard.join(timeout=args.timeout + 5)
+
+        rows_after, scored = table_counts(data_dir)
+    finally:
+        stop.set()
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    report = {
+        'config': {
+            'server': args.server, 'workers': args.workers, 'mode': args.mode, 'clients': args.clients,
+            'latest_interval': args.latest_interval, 'status_interval': args.status_interval,
+            'etag': args.etag, 'producer_rate': args.producer_rate, 'fleet': args.fleet,
+            'seed_rows': args.seed_rows, 'cpu_count': os.cpu_count(),
+        },
+        'elapsed_s': elapsed,
+        'endpoints': summarize(stats, elapsed),
+        'stream_rows': stats.stream_rows,
+        'producer': {
+            'rows': rows_after - rows_before,
+            'rows_per_s': (rows_after - rows_before) / elapsed,
+            'scoring_lag_rows': rows_after - scored,
+        },
+        'database_locked': {
+            'responses': stats.locked,
+            'server_log': count_locked(server_log),
+            'producer_log': count_locked(producer_log),
+        },
+        'workspace': workspace if args.keep or args.workspace else None,
+    }
+    if not (args.keep or args.workspace):
+        shutil.rmtree(workspace, ignore_errors=True)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the API with simulated dashboards and a live producer")
+    parser.add_argument("--clients", type=int, default=20, help="Simulated dashboards (default: 20)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load (default: 30)")
+    parser.add_argument("--mode", choices=('poll', 'stream'), default='poll',
+                        help="poll: /telemetry/latest + /status; stream: SSE + /status (default: poll)")
+    parser.add_argument("--latest-interval", type=float, default=1.0,
+                        help="Seconds between /telemetry/latest polls per dashboard (default: 1)")
+    parser.add_argument("--status-interval", type=float, default=5.0,
+                        help="Seconds between /status polls per dashboard (default: 5)")
+    parser.add_argument("--no-etag", dest="etag", action="store_false",
+                        help="Poll without If-None-Match (every poll reads and encodes)")
+    parser.add_argument("--server", choices=SERVERS, default='flask', help="API server to start (default: flask)")
+    parser.add_argument("--workers", type=int, default=1, help="Gunicorn worker processes (default: 1)")
+    parser.add_argument("--port", type=int, default=0, help="Server port (default: a free port)")
+    parser.add_argument("--producer-rate", type=float, default=1.0,
+                        help="Producer rate in Hz, 0 = no producer (default: 1)")
+    parser.add_argument("--fleet", type=int, default=0, help="Producer fleet size (rows per tick)")
+    parser.add_argument("--seed-rows", type=int, default=5000, help="Rows in the database before the test")
+    parser.add_argument("--train-rows", type=int, default=synthetic.TRAIN_ROWS,
+                        help="Synthetic rows the benchmark LOF is trained on (its scoring cost grows with it)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds")
+    parser.add_argument("--workspace", help="Directory to build the workspace in (kept afterwards)")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary workspace and its logs")
+    parser.add_argument("--out", help="Also write the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    print_report(report)
+    if report['workspace']:
+        print(f"Logs: {os.path.join(report['workspace'], 'server.log')}, "
+              f"{os.path.join(report['workspace'], 'producer.log')}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Report saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Run the benchmark suites and store the results as JSON
+    python -m benchmarks.run [--quick] [--only features,scoring] [--out FILE]
+    python -m benchmarks.run --compare benchmarks/results/<base>.json
+    python -m benchmarks.run --compare OLD.json --against NEW.json   (no new run)
+
+Results go to benchmarks/results/<commit>.json (<commit>-dirty with
+uncommitted changes), together with the machine and library versions they
+were measured on. Compare only runs from the same machine.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks import suites, synthetic
+
+
+RESULTS_DIR = os.path.join(synthetic.REPO_ROOT, 'benchmarks', 'results')
+# Relative change of the median beyond which --compare reports a difference
+DEFAULT_THRESHOLD = 0.20
+
+FULL = {
+    'batches': suites.BATCH_SIZES,
+    'train_rows': synthetic.TRAIN_ROWS,
+    'frame_rows': 10000,
+    'endpoint_rows': 20000,
+    'producer_rows': 20000,
+    'min_time': 0.5,
+}
+QUICK = {
+    'batches': suites.QUICK_BATCH_SIZES,
+    'train_rows': 3000,
+    'frame_rows': 1000,
+    'endpoint_rows': 3000,
+    'producer_rows': 2000,
+    'min_time': 0.1,
+}
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], cwd=synthetic.REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    import numpy
+    import pandas
+    import sklearn
+
+    versions = {'numpy': numpy.__version__, 'pandas': pandas.__version__, 'scikit-learn': sklearn.__version__}
+    try:
+        import orjson
+        versions['orjson'] = orjson.__version__
+    except ImportError:
+        versions['orjson'] = None
+    return {
+        'commit': _git('rev-parse', '--short', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'versions': versions,
+    }
+
+
+def default_out(meta):
+    name = meta['commit'] or 'unversioned'
+    if meta['dirty']:
+        name += '-dirty'
+    return os.path.join(RESULTS_DIR, f'{name}.json')
+
+
+def key(entry):
+    return f"{entry['suite']}/{entry['name']}@{entry['batch']}"
+
+
+def print_results(results):
+    print(f"{'benchmark':<48} {'median ms':>10} {'p95 ms':>10} {'rows/s':>12}")
+    for entry in results:
+        rate = f"{entry['rows_per_s']:,.0f}" if entry['rows_per_s'] is not None else '-'
+        print(f"{key(entry):<48} {entry['median_s'] * 1000:>10.3f} {entry['p95_s'] * 1000:>10.3f} {rate:>12}")
+
+
+def compare(base, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Print median changes of benchmarks present in both runs; returns the
+    keys that got slower by more than threshold
+    """
+    base_results = {key(entry): entry for entry in base['results']}
+    print(f"Comparing against {base['meta'].get('commit')} ({base['meta'].get('created')})")
+    if base['meta'].get('platform') != current['meta'].get('platform'):
+        print("⚠ Runs come from different platforms; differences are not meaningful")
+
+    slower = []
+    for entry in current['results']:
+        old = base_results.get(key(entry))
+        if old is None or not old['median_s']:
+            continue
+        ratio = entry['median_s'] / old['median_s']
+        if ratio > 1 + threshold:
+            mark = 'slower'
+            slower.append(key(entry))
+        elif ratio < 1 / (1 + threshold):
+            mark = 'faster'
+        else:
+            mark = ''
+        print(f"{key(entry):<48} {old['median_s'] * 1000:>10.3f} -> {entry['median_s'] * 1000:>10.3f} ms "
+              f"x{ratio:5.2f} {mark}")
+    return slower
+
+
+def run(only=None, quick=False, min_time=None):
+    settings = dict(QUICK if quick else FULL)
+    if min_time is not None:
+        settings['min_time'] = min_time
+    names = only or list(suites.SUITES)
+    unknown = set(names) - set(suites.SUITES)
+    if unknown:
+        raise SystemExit(f"❌ Unknown suite(s): {', '.join(sorted(unknown))} (choose from {', '.join(suites.SUITES)})")
+
+    ctx = dict(settings)
+    ctx['frame'] = synthetic.telemetry_frame(settings['frame_rows'])
+    if {'scaling', 'scoring', 'batching', 'endpoints'} & set(names):
+        print(f"Training benchmark models on {settings['train_rows']} synthetic rows...")
+        ctx['models'] = synthetic.train_models(settings['train_rows'])
+
+    results = []
+    for name in names:
+        start = time.perf_counter()
+        results.extend(suites.SUITES[name](ctx))
+        print(f"✓ {name} ({time.perf_counter() - start:.1f} s)")
+
+    settings['batches'] = list(settings['batches'])
+    return {'meta': {**environment(), 'quick': quick, 'settings': settings}, 'results': results}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scoring and ingestion hot paths on synthetic data")
+    parser.add_argument("--quick", action="store_true", help="Smaller data and batch sizes (smoke run)")
+    parser.add_argument("--only", help=f"Comma-separated suites (default: all of {', '.join(suites.SUITES)})")
+    parser.add_argument("--min-time", type=float, help="Seconds spent timing each benchmark")
+    parser.add_argument("--out", help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", metavar="BASE", help="Results file to compare against")
+    parser.add_argument("--against", metavar="FILE", help="With --compare: compare this file instead of a new run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative change reported as slower/faster (default: 0.20)")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with status 1 when a benchmark got slower than the threshold")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.against:
+        if not args.compare:
+            raise SystemExit("❌ --against needs --compare")
+        with open(args.against, 'r') as f:
+            current = json.load(f)
+    else:
+        only = [name.strip() for name in args.only.split(',')] if args.only else None
+        current = run(only, quick=args.quick, min_time=args.min_time)
+        print_results(current['results'])
+        out = args.out or default_out(current['meta'])
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        with open(out, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"✓ Results saved to {out}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            base = json.load(f)
+        slower = compare(base, current, args.threshold)
+        if slower and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Benchmark suites
+Each suite returns a list of result dicts:
+
+    {'suite', 'name', 'batch', 'calls', 'best_s', 'median_s', 'p95_s', 'rows_per_s'}
+
+A call is repeated until `min_time` seconds have passed (at least
+MIN_CALLS, at most MAX_CALLS times); latencies are per call and rows_per_s
+is batch / median.
+"""
+
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks import synthetic
+
+
+BATCH_SIZES = (1, 10, 100, 1000, 10000)
+QUICK_BATCH_SIZES = (1, 100, 1000)
+MIN_CALLS = 3
+MAX_CALLS = 1000
+# Producer batch sizes: one commit per row (the default) up to large group commits
+WRITER_BATCH_SIZES = (1, 10, 100, 1000)
+# Threads scoring single rows at the same time, as concurrent /api/predict calls do
+BATCHING_CALLERS = (1, 4, 16, 64)
+
+
+def time_call(fn, min_time=0.5, min_calls=MIN_CALLS, max_calls=MAX_CALLS):
+    """Per-call latencies of fn() in seconds, after one untimed warm-up call"""
+    fn()
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < min_calls or (len(timings) < max_calls and time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def result(suite, name, batch, timings):
+    timings = np.asarray(timings)
+    median = float(np.median(timings))
+    return {
+        'suite': suite,
+        'name': name,
+        'batch': int(batch),
+        'calls': len(timings),
+        'best_s': float(timings.min()),
+        'median_s': median,
+        'p95_s': float(np.percentile(timings, 95)),
+        'rows_per_s': batch / median if median > 0 else None,
+    }
+
+
+def _rows(X, batch):
+    """First `batch` rows of X, tiled when X is shorter"""
+    if len(X) >= batch:
+        return X[:batch]
+    return np.resize(X, (batch, X.shape[1]))
+
+
+def _frame(df, batch):
+    import pandas as pd
+
+    if len(df) >= batch:
+        return df.iloc[:batch].copy()
+    return pd.concat([df] * -(-batch // len(df)), ignore_index=True).iloc[:batch]
+
+
+def bench_features(ctx):
+    """Feature engineering: one-shot batches and the incremental engine's per-row path"""
+    from backend.feature_engine import FeatureEngine, feature_engineering
+
+    out = []
+    for batch in ctx['batches']:
+        df = _frame(ctx['frame'], batch)
+        out.append(result('features', 'feature_engineering', batch,
+                          time_call(lambda: feature_engineering(df), ctx['min_time'])))
+
+    # Live path: the score store feeds new rows to one long-lived engine
+    engine = FeatureEngine()
+    row = _frame(ctx['frame'], 1)
+    out.append(result('features', 'feature_engine_incremental', 1,
+                      time_call(lambda: engine.transform(row), ctx['min_time'])))
+    return out
+
+
+def bench_scaling(ctx):
+    """StandardScaler.transform vs the scorers' folded-in (X - mean) / scale"""
+    from backend.inference import ScalerTransform
+
+    scaler = ctx['models']['scaler']
+    folded = ScalerTransform(scaler)
+    out = []
+    for batch in ctx['batches']:
+        X = _rows(ctx['models']['X'], batch)
+        out.append(result('scaling', 'sklearn', batch, time_call(lambda: scaler.transform(X), ctx['min_time'])))
+        out.append(result('scaling', 'compiled', batch, time_call(lambda: folded(X), ctx['min_time'])))
+    return out
+
+
+def bench_scoring(ctx):
+    """IsolationForest vs LOF, each through sklearn and through the compiled scorer (scaling included)"""
+    from backend.inference import Scorer, compile_model
+
+    models = ctx['models']
+    out = []
+    for kind in ('isolation_forest', 'lof'):
+        scorers = {
+            'sklearn': Scorer(models[kind], models['scaler']),
+            'compiled': compile_model(models[kind], models['scaler']),
+        }
+        for batch in ctx['batches']:
+            X = _rows(models['X'], batch)
+            for variant, scorer in scorers.items():
+                out.append(result('scoring', f'{kind}/{variant}', batch,
+                                  time_call(lambda: scorer.score(X), ctx['min_time'])))
+    return out
+
+
+def _concurrent_calls(fn, callers, min_time):
+    """
+    (per-call latencies, total calls, elapsed seconds) of `callers` threads
+    calling fn() in a loop for min_time seconds
+    """
+    timings = [[] for _ in range(callers)]
+    barrier = threading.Barrier(callers + 1)
+
+    def caller(out):
+        fn()
+        barrier.wait()
+        deadline = time.perf_counter() + min_time
+        while len(out) < MIN_CALLS or time.perf_counter() < deadline:
+            start = time.perf_counter()
+            fn()
+            out.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=caller, args=(out,)) for out in timings]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    flat = [t for out in timings for t in out]
+    return flat, len(flat), elapsed
+
+
+def bench_batching(ctx):
+    """
+    Single-row score calls from N concurrent callers: one model call each
+    vs coalesced by the MicroBatcher (batch = callers; rows_per_s is the
+    combined rate of all callers)
+    """
+    from backend.batching import MicroBatcher
+    from backend.inference import compile_model
+
+    models = ctx['models']
+    row = models['X'][:1]
+    out = []
+    for kind in ('isolation_forest', 'lof'):
+        scorer = compile_model(models[kind], models['scaler'])
+        batcher = MicroBatcher(scorer.score)
+        for variant, score in (('direct', scorer.score), ('batched', batcher.score)):
+            for callers in BATCHING_CALLERS:
+                timings, calls, elapsed = _concurrent_calls(lambda: score(row), callers, ctx['min_time'])
+                out.append({
+                    **result('batching', f'{kind}/{variant}', callers, timings),
+                    'rows_per_s': calls / elapsed,
+                })
+        stats = batcher.stats()
+        print(f"   {kind}: {stats['calls_per_batch']:.1f} calls per model call with the batcher")
+    return out
+
+
+def bench_serialization(ctx):
+    """Scored rows to JSON bytes: records and columns layouts vs plain to_dict + json"""
+    from backend.serialization import dumps, frame_payload
+
+    out = []
+    for batch in ctx['batches']:
+        df = _frame(ctx['frame'], batch)
+        df['id'] = np.arange(1, len(df) + 1)
+        df['is_anomaly'] = (df['event'] != '').astype(int)
+        df['anomaly_score'] = np.linspace(-0.5, 0.5, len(df))
+        variants = {
+            'records': lambda: dumps(frame_payload(df, 'records')),
+            'columns': lambda: dumps(frame_payload(df, 'columns')),
+            'pandas_to_dict_json': lambda: json.dumps(df.to_dict('records')).encode('utf-8'),
+        }
+        for name, fn in variants.items():
+            out.append(result('serialization', name, batch, time_call(fn, ctx['min_time'])))
+    return out
+
+
+def bench_producer(ctx):
+    """Sustained inserts/s of the producer's TelemetryWriter per group-commit size"""
+    producer = synthetic.src_module('uav_producer')
+    df = ctx['frame']
+    df = df.assign(vehicle_id='UAV-001')
+    records = df.astype(object).where(df.notna(), None).to_dict('records')
+    rows = ctx['producer_rows']
+
+    out = []
+    with tempfile.TemporaryDirectory(prefix='puma-bench-') as tmp:
+        for batch_size in WRITER_BATCH_SIZES:
+            db_path = os.path.join(tmp, f'producer-{batch_size}.db')
+            columns = _init_producer_db(producer, tmp, db_path)
+            conn = sqlite3.connect(db_path)
+            producer.configure_writer_connection(conn)
+            writer = producer.TelemetryWriter(conn, columns, batch_size=batch_size, flush_interval=3600)
+
+            # One call = buffering batch_size rows plus their commit
+            timings = []
+            start = batch_start = time.perf_counter()
+            for i in range(rows):
+                if writer.write(records[i % len(records)]):
+                    now = time.perf_counter()
+                    timings.append(now - batch_start)
+                    batch_start = now
+            writer.flush()
+            elapsed = time.perf_counter() - start
+            conn.close()
+
+            out.append({
+                **result('producer', f'writer/batch_{batch_size}', batch_size, timings or [elapsed]),
+                # Sustained rate over the whole run rather than batch / median
+                'rows_per_s': writer.rows_written / elapsed,
+            })
+    return out
+
+
+def _init_producer_db(producer, data_dir, db_path):
+    """Create a fresh telemetry table through the producer's own init_db/migrations"""
+    saved = producer.DB_PATH, producer.DATA_DIR, producer.CSV_PATH
+    producer.DB_PATH, producer.DATA_DIR = db_path, data_dir
+    producer.CSV_PATH = os.path.join(data_dir, 'missing.csv')
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return producer.init_db()
+    finally:
+        producer.DB_PATH, producer.DATA_DIR, producer.CSV_PATH = saved
+
+
+def bench_endpoints(ctx):
+    from benchmarks import endpoints
+
+    return endpoints.run(ctx)
+
+
+SUITES = {
+    'features': bench_features,
+    'scaling': bench_scaling,
+    'scoring': bench_scoring,
+    'batching': bench_batching,
+    'serialization': bench_serialization,
+    'producer': bench_producer,
+    'endpoints': bench_endpoints,
+}
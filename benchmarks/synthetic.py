@@ -0,0 +1,119 @@
+"""
+Synthetic telemetry and models for the benchmarks
+Rows come from the vectorized generator (generate_dummy_data.generate_cycle)
+and the models are trained on them like train_model_adaptive.ipynb does
+(normal rows only, StandardScaler, IsolationForest and LOF novelty), with
+fixed seeds so every run sees the same data and the same trees/neighbours.
+"""
+
+import importlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(REPO_ROOT, 'src')
+FEATURES_PATH = os.path.join(REPO_ROOT, 'data', 'feature_names.json')
+
+SEED = 42
+# Fixed start time so the generated dt/date strings are reproducible too
+BASE_TIMESTAMP = 1_700_000_000
+DATA_PER_CYCLE = 600
+ANOMALY_RATIO = 0.20
+# Rows the deployed model was trained on (models/model_metadata.json)
+TRAIN_ROWS = 18000
+
+
+def src_module(name):
+    """Import a script from src/ (the producer and generator are not a package)"""
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+    return importlib.import_module(name)
+
+
+def feature_names():
+    """Model input columns, in the order the models are trained on"""
+    with open(FEATURES_PATH, 'r') as f:
+        return json.load(f)
+
+
+def telemetry_frame(rows, seed=SEED, anomaly_ratio=ANOMALY_RATIO):
+    """rows of generated telemetry, whole flight cycles concatenated in time order"""
+    generator = src_module('generate_dummy_data')
+    per_cycle = sum(generator.phase_lengths(DATA_PER_CYCLE))
+    cycles = max(1, -(-rows // per_cycle))
+    seeds = np.random.SeedSequence(seed).spawn(cycles)
+    parts = [
+        generator.generate_cycle(cycle, int(per_cycle * anomaly_ratio), cycle_seed,
+                                 BASE_TIMESTAMP, DATA_PER_CYCLE)
+        for cycle, cycle_seed in zip(range(1, cycles + 1), seeds)
+    ]
+    df = pd.DataFrame({
+        col: np.concatenate([part[col] for part in parts])[:rows] for col in generator.OUTPUT_COLUMNS
+    })
+    # One row per second across cycles, like the producer
+    df['timestamp'] = BASE_TIMESTAMP + np.arange(len(df), dtype=np.int64)
+    return df
+
+
+def feature_matrix(df, names=None):
+    """Engineered features of df as the (rows, features) array the scalers take"""
+    from backend.feature_engine import feature_engineering
+
+    names = names or feature_names()
+    engineered = feature_engineering(df)
+    return np.column_stack([
+        engineered[name].to_numpy(dtype=float) if name in engineered.columns else np.zeros(len(engineered))
+        for name in names
+    ])
+
+
+def train_models(rows=TRAIN_ROWS, seed=SEED):
+    """
+    {'scaler', 'isolation_forest', 'lof', 'names', 'X'}: models fitted on the
+    normal rows of a generated training set; X holds every engineered row
+    (normal and anomalous) for scoring benchmarks
+    """
+    from sklearn.ensemble import IsolationForest
+    from sklearn.neighbors import LocalOutlierFactor
+    from sklearn.preprocessing import StandardScaler
+
+    names = feature_names()
+    df = telemetry_frame(rows, seed=seed)
+    X = feature_matrix(df, names)
+    X_normal = X[(df['event'] == '').to_numpy()]
+
+    scaler = StandardScaler().fit(X_normal)
+    X_scaled = scaler.transform(X_normal)
+    isolation_forest = IsolationForest(n_estimators=100, random_state=seed).fit(X_scaled)
+    lof = LocalOutlierFactor(n_neighbors=20, novelty=True, contamination='auto').fit(X_scaled)
+    return {
+        'scaler': scaler,
+        'isolation_forest': isolation_forest,
+        'lof': lof,
+        'names': names,
+        'X': X,
+    }
+
+
+def save_models(models, directory, model='lof'):
+    """Write one trained model in the legacy models/ layout the API server loads"""
+    import joblib
+
+    os.makedirs(directory, exist_ok=True)
+    model_file = 'lof_novelty.joblib' if model == 'lof' else 'isolation_forest.joblib'
+    model_path = os.path.join(directory, model_file)
+    joblib.dump(models[model], model_path)
+    joblib.dump(models['scaler'], os.path.join(directory, 'data_scaler.joblib'))
+    with open(os.path.join(directory, 'model_metadata.json'), 'w') as f:
+        json.dump({
+            'date_trained': 'benchmark',
+            'n_samples_total': int(models[model].n_samples_fit_ if model == 'lof' else models[model].max_samples_),
+            'n_features_used': len(models['names']),
+            'used_features': models['names'],
+        }, f, indent=2)
+    return model_path
@@ -18,54 +18,57 @@ function App() {
   const [historyLimit, setHistoryLimit] = useState<number>(150);
   const [lastUpdate, setLastUpdate] = useState<string>('--:--:--');
 
-  // Fetch data from API
-  const fetchData = async () => {
+  const updateLastUpdate = () => {
+    const now = new Date();
+    setLastUpdate(now.toLocaleTimeString('id-ID'));
+  };
+
+  // Check database status
+  const fetchStatus = async () => {
     try {
-      console.log('🔄 Fetching data from API...');
-
-      // Get latest telemetry with history
-      const response = await uavApi.getLatestTelemetry(historyLimit);
-      console.log('✅ Data received:', response);
-      console.log('📊 History length:', response.history?.length);
-      console.log('📍 Latest data:', response.latest);
-
-      setTelemetryData(response.history || []);
-      setLatestData(response.latest);
-
-      // Update last update time
-      const now = new Date();
-      setLastUpdate(now.toLocaleTimeString('id-ID'));
-
-      // Check database status
-      try {
-        const status = await uavApi.getDatabaseStatus();
-        console.log('💾 Database status:', status);
-        setDbStatus(status.connected);
-      } catch (error) {
-        console.error('❌ Database status error:', error);
-        setDbStatus(false);
-      }
-
-      setLoading(false);
+      const status = await uavApi.getDatabaseStatus();
+      console.log('💾 Database status:', status);
+      setDbStatus(status.connected);
     } catch (error) {
-      console.error('❌ Error fetching data:', error);
-      setLoading(false);
+      console.error('❌ Database status error:', error);
+      setDbStatus(false);
     }
   };
 
-  // Initial data fetch
+  // Server-push stream: history once, then only newly scored rows
   useEffect(() => {
-    fetchData();
+    console.log('🔄 Subscribing to telemetry stream...');
+
+    const close = uavApi.streamTelemetry(historyLimit, {
+      onHistory: (history) => {
+        console.log('📊 History length:', history.length);
+        setTelemetryData(history);
+        setLatestData(history[0] ?? null);
+        updateLastUpdate();
+        setLoading(false);
+      },
+      onTelemetry: (row) => {
+        setTelemetryData(prev => [row, ...prev].slice(0, historyLimit));
+        setLatestData(row);
+        updateLastUpdate();
+      },
+      onError: (error) => {
+        // EventSource reconnects on its own and receives a fresh history
+        console.error('❌ Telemetry stream error:', error);
+        setLoading(false);
+      },
+    });
+
+    return close;
   }, [historyLimit]);
 
-  // Auto-refresh every 1 second for real-time updates
+  // Database status is refreshed at a slower pace than the stream
   useEffect(() => {
-    const interval = setInterval(() => {
-      fetchData();
-    }, 1000); // Update setiap 1 detik (real-time)
+    fetchStatus();
+    const interval = setInterval(fetchStatus, 5000);
 
     return () => clearInterval(interval);
-  }, [historyLimit]);
+  }, []);
 
   // Calculate statistics
   const anomalyCount = telemetryData.filter(d => d.is_anomaly).length;
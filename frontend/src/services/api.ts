@@ -3,7 +3,8 @@ import type {
     UAVTelemetry,
     TelemetryResponse,
     LatestTelemetry,
-    DatabaseStatus
+    DatabaseStatus,
+    TelemetryHistory
 } from '../types/uav';
 
 // API Base URL - sesuaikan dengan backend Python Anda
@@ -27,10 +28,24 @@ export const uavApi = {
         return response.data;
     },
 
-    // Get latest telemetry
-    getLatestTelemetry: async (historyLimit: number = 150): Promise<LatestTelemetry> => {
-        const response = await api.get<LatestTelemetry>('/telemetry/latest', {
-            params: { history_limit: historyLimit }
+    // Get latest telemetry (pass the newest known row id as `since` for deltas only)
+    getLatestTelemetry: async (historyLimit: number = 150, since?: number): Promise<LatestTelemetry> => {
+        const params = since !== undefined
+            ? { history_limit: historyLimit, since }
+            : { history_limit: historyLimit };
+        const response = await api.get<LatestTelemetry>('/telemetry/latest', { params });
+        return response.data;
+    },
+
+    // Get downsampled chart history for a time range (same cost for 5 minutes or 24 hours)
+    getHistory: async (
+        from?: number,
+        to?: number,
+        points: number = 500,
+        mode: 'lttb' | 'minmax' = 'lttb'
+    ): Promise<TelemetryHistory> => {
+        const response = await api.get<TelemetryHistory>('/telemetry/history', {
+            params: { from, to, points, mode },
         });
         return response.data;
     },
@@ -41,6 +56,31 @@ export const uavApi = {
         return response.data;
     },
 
+    // Subscribe to the server-push stream: full history once, then one row per event
+    streamTelemetry: (
+        historyLimit: number,
+        handlers: {
+            onHistory: (history: UAVTelemetry[]) => void;
+            onTelemetry: (row: UAVTelemetry) => void;
+            onError?: (event: Event) => void;
+        }
+    ): (() => void) => {
+        const url = `${API_BASE_URL}/telemetry/stream?history_limit=${historyLimit}`;
+        const source = new EventSource(url);
+
+        source.addEventListener('history', (event) => {
+            handlers.onHistory(JSON.parse((event as MessageEvent).data));
+        });
+        source.addEventListener('telemetry', (event) => {
+            handlers.onTelemetry(JSON.parse((event as MessageEvent).data));
+        });
+        if (handlers.onError) {
+            source.onerror = handlers.onError;
+        }
+
+        return () => source.close();
+    },
+
     // Get anomalies only
     getAnomalies: async (): Promise<UAVTelemetry[]> => {
         const response = await api.get<UAVTelemetry[]>('/telemetry/anomalies');
@@ -1,5 +1,6 @@
 // UAV Telemetry Data Types
 export interface UAVTelemetry {
+    id?: number;           // Telemetry row id (stream / delta-sync cursor)
     timestamp: number;      // Unix timestamp (seconds)
     dt: string;            // Datetime string format: "YYYY/MM/DD HH:MM:SS"
     date: string;          // Date string format: "YYYY/MM/DD"
@@ -24,6 +25,27 @@ export interface LatestTelemetry {
     history: UAVTelemetry[];
 }
 
+// Downsampled chart history (/telemetry/history)
+export interface HistorySeries {
+    t: number[];           // Bucket start (unix seconds)
+    v: (number | null)[];
+}
+
+export interface TelemetryHistory {
+    from: number | null;
+    to: number | null;
+    resolution: number | null;  // Rollup bucket size in seconds (1, 10 or 60)
+    mode?: 'lttb' | 'minmax';
+    buckets?: number;
+    rows?: number;
+    anomalies?: number;
+    series: {
+        altitude?: HistorySeries;
+        battery_level?: HistorySeries;
+        anomaly_score?: HistorySeries;
+    };
+}
+
 export interface DatabaseStatus {
     status: string;
     connected: boolean;
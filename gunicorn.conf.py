@@ -0,0 +1,39 @@
+"""
+Gunicorn configuration for serving the PUMA API with several processes
+    pip install gunicorn
+    gunicorn -c gunicorn.conf.py api_server:app
+
+Every worker loads the model itself (preload_app = False: the background
+loader and registry watcher threads would not survive the fork). The model
+arrays are still held once: a <model>.compiled/ export, or the uncompressed
+joblib file, is memory-mapped read-only, so all workers share the same
+page-cache pages.
+
+Scoring of new telemetry rows happens once per row, not once per worker:
+workers serialize on the score store's write lock and skip rows another
+worker already scored. Sizing (see README, "Production Serving"):
+    scoring load  = ingest rows/s x µs/row (python -m backend.inference ... --measure)
+    workers       = min(CPU cores, ceil(peak requests/s x CPU seconds per request / 0.7))
+
+Environment overrides: PUMA_BIND, PUMA_WORKERS, PUMA_THREADS.
+"""
+
+import multiprocessing
+import os
+
+
+bind = os.environ.get("PUMA_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("PUMA_WORKERS", multiprocessing.cpu_count()))
+
+# Threads per worker: each open /telemetry/stream client holds one
+worker_class = "gthread"
+threads = int(os.environ.get("PUMA_THREADS", 8))
+
+preload_app = False
+
+# Worker heartbeat timeout; long-lived SSE responses are not affected under gthread
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
@@ -0,0 +1,216 @@
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Simulator armada UAV ter-vektorisasi.
+# State N kendaraan disimpan dalam array NumPy dan dimajukan bersamaan, dengan
+# logika yang sama seperti generate_new_telemetry() di uav_producer.py:
+# fase CLIMB/CRUISE/DESCEND/LANDED, baterai, RTL saat baterai rendah, dan injeksi anomali.
+
+CLIMB, CRUISE, DESCEND, LANDED = 0, 1, 2, 3
+PHASE_NAMES = ("CLIMB", "CRUISE", "DESCEND", "LANDED")
+
+LOW_BATTERY_THRESHOLD = 25.0
+ANOMALY_PROBABILITY = 0.05
+
+# Jenis anomali (kode) dan bobotnya saat baterai normal: motor 2/5, sensor 2/5, baterai 1/5
+MOTOR_FAIL, SENSOR_GLITCH, BATTERY_DROP = 0, 1, 2
+ANOMALY_WEIGHTS = [0.4, 0.4, 0.2]
+
+
+class FleetSimulator:
+    """
+    Simulasi N UAV sekaligus. step() menghasilkan satu baris telemetri per kendaraan
+    sebagai dict kolom -> array (siap untuk TelemetryWriter.write_batch).
+    """
+
+    def __init__(self, n_vehicles, target_altitude=5000.0, climb_rate=30.0, descend_rate=-25.0,
+                 seed=None, vehicle_prefix="UAV"):
+        self.n = int(n_vehicles)
+        self.rng = np.random.default_rng(seed)
+        n, rng = self.n, self.rng
+
+        self.vehicle_ids = np.array([f"{vehicle_prefix}-{i + 1:03d}" for i in range(n)], dtype=object)
+        self.target_altitude = target_altitude
+        self.climb_rate = climb_rate
+        self.descend_rate = descend_rate
+
+        now = time.time()
+        self.phase = np.full(n, CLIMB, dtype=np.int8)
+        self.cruise_duration = rng.integers(120, 181, n).astype(float)
+        self.cruise_start = np.full(n, now)
+        self.landed_time = np.full(n, now)
+        self.mission_number = np.ones(n, dtype=np.int64)
+
+        self.altitude = np.zeros(n)
+        self.battery_level = np.full(n, 100.0)
+        self.heading = np.full(n, 90.0)
+        # Setiap kendaraan mulai dari titik yang sedikit berbeda
+        self.gps_lat = -7.27 + rng.uniform(-0.05, 0.05, n)
+        self.gps_lon = 112.74 + rng.uniform(-0.05, 0.05, n)
+        self.motor_temp = np.full((n, 4), 25.0)
+        self.waypoint_id = np.zeros(n, dtype=np.int64)
+
+    def _uniform(self, low, high, size=None):
+        return self.rng.uniform(low, high, self.n if size is None else size)
+
+    def step(self, now=None):
+        """Majukan semua kendaraan satu tick dan kembalikan barisnya (dict kolom -> array)"""
+        now = time.time() if now is None else now
+        n, rng = self.n, self.rng
+        current_time = datetime.fromtimestamp(now)
+
+        mode = np.full(n, "Auto", dtype=object)
+        event = np.full(n, "", dtype=object)
+
+        # Baterai dihitung SEBELUM pengecekan fase
+        flying = self.phase != LANDED
+        self.battery_level = np.where(
+            flying, np.maximum(5, self.battery_level - self._uniform(0.05, 0.10)), self.battery_level
+        )
+        battery_voltage = 14.8 * (self.battery_level / 100) + self._uniform(-0.1, 0.1)
+        battery_current = np.where(flying, self._uniform(5, 25), 0.0)
+        temperature_battery = self._uniform(20, 45)
+
+        # RTL jika baterai habis
+        rtl = np.isin(self.phase, (CLIMB, CRUISE)) & (self.battery_level < LOW_BATTERY_THRESHOLD)
+        self.phase[rtl] = DESCEND
+        event[rtl] = "Low Battery U-Turn"
+
+        ground_speed = self._uniform(10, 70)
+        airspeed = ground_speed + self._uniform(-2, 2)
+        vertical_speed = np.zeros(n)
+
+        phase = self.phase.copy()
+
+        # CLIMB
+        climb = phase == CLIMB
+        change = self.climb_rate + self._uniform(-1, 1)
+        self.altitude = np.where(climb, np.maximum(0, self.altitude + change), self.altitude)
+        vertical_speed = np.where(climb, change, vertical_speed)
+        reached = climb & (self.altitude >= self.target_altitude)
+        self.altitude[reached] = self.target_altitude
+        vertical_speed[reached] = 0
+        self.phase[reached] = CRUISE
+        self.cruise_start[reached] = now
+
+        # CRUISE
+        cruise = phase == CRUISE
+        change = self._uniform(-1.5, 1.5)
+        self.altitude = np.where(cruise, self.target_altitude + change, self.altitude)
+        vertical_speed = np.where(cruise, change, vertical_speed)
+        self.phase[cruise & (now - self.cruise_start >= self.cruise_duration)] = DESCEND
+
+        # DESCEND
+        descend = phase == DESCEND
+        change = self.descend_rate + self._uniform(-1, 1)
+        self.altitude = np.where(descend, np.maximum(0, self.altitude + change), self.altitude)
+        vertical_speed = np.where(descend, change, vertical_speed)
+        mode[descend] = "RTL"
+        touchdown = descend & (self.altitude <= 0)
+        self.altitude[touchdown] = 0
+        vertical_speed[touchdown] = 0
+        self.phase[touchdown] = LANDED
+        self.landed_time[touchdown] = now
+
+        # LANDED: ganti baterai setelah 5 detik lalu mulai misi baru
+        landed = phase == LANDED
+        self.altitude[landed] = 0
+        vertical_speed[landed] = 0
+        ground_speed[landed] = 0
+        airspeed[landed] = 0
+        mode[landed] = "Manual"
+        relaunch = landed & (now - self.landed_time > 5)
+        self.battery_level[relaunch] = 100.0
+        self.phase[relaunch] = CLIMB
+        self.mission_number[relaunch] += 1
+        self.cruise_duration[relaunch] = rng.integers(120, 181, int(relaunch.sum()))
+
+        gps_alt = self.altitude + self._uniform(-2, 2)
+        lidar_altitude = self.altitude + self._uniform(-0.5, 0.5)
+
+        # Posisi & orientasi (hanya saat terbang)
+        flying = self.phase != LANDED
+        self.heading = np.where(flying, (self.heading + self._uniform(-5, 5)) % 360, self.heading)
+        distance = np.where(flying, ground_speed / 111000.0, 0.0)
+        self.gps_lat = self.gps_lat + np.sin(np.deg2rad(self.heading)) * distance
+        self.gps_lon = self.gps_lon + np.cos(np.deg2rad(self.heading)) * distance
+        pitch = np.where(flying, self._uniform(-10, 10), 0.0)
+        roll = np.where(flying, self._uniform(-20, 20), 0.0)
+
+        # Motor
+        motor_rpm = np.where(flying[:, None], self._uniform(3000, 8000, (n, 4)), 0.0)
+        self.motor_temp = np.where(
+            flying[:, None], self._uniform(40, 90, (n, 4)), np.maximum(25, self.motor_temp - 0.1)
+        )
+
+        system_status = np.where(
+            self.phase == LANDED, "Landed",
+            np.where(self.battery_level < 15, "Warning", "Normal")
+        ).astype(object)
+
+        # === Injeksi anomali (5% saat terbang) ===
+        inject = flying & (rng.random(n) < ANOMALY_PROBABILITY)
+        anomaly_type = rng.choice(3, size=n, p=ANOMALY_WEIGHTS)
+        # Baterai kritis: jangan injeksi anomali baterai
+        critical = self.battery_level < LOW_BATTERY_THRESHOLD + 5
+        anomaly_type = np.where(critical & (anomaly_type == BATTERY_DROP),
+                                rng.integers(0, 2, n), anomaly_type)
+
+        motor_fail = inject & (anomaly_type == MOTOR_FAIL)
+        motor_num = rng.integers(1, 5, n)
+        rows = np.nonzero(motor_fail)[0]
+        motor_rpm[rows, motor_num[rows] - 1] = 0
+        self.motor_temp[rows, motor_num[rows] - 1] = 150.0
+        event[rows] = np.char.add(np.char.add("Motor ", motor_num[rows].astype(str)), " Failure")
+
+        glitch = inject & (anomaly_type == SENSOR_GLITCH)
+        self.altitude[glitch] += self._uniform(50, 150)[glitch]
+        event[glitch] = "Altitude Sensor Glitch"
+
+        drop = inject & (anomaly_type == BATTERY_DROP)
+        self.battery_level[drop] = np.maximum(5, self.battery_level[drop] - self._uniform(10, 20)[drop])
+        event[drop] = "Sudden Battery Drop"
+
+        self.waypoint_id = (self.waypoint_id + (rng.random(n) < 0.25)) % 10
+
+        mission_id = np.char.add(
+            np.char.add(self.vehicle_ids.astype(str), "-M"),
+            np.char.zfill(self.mission_number.astype(str), 3)
+        ).astype(object)
+
+        return {
+            "timestamp": int(now),
+            "dt": current_time.strftime("%Y/%m/%d %H:%M:%S"),
+            "date": current_time.strftime("%Y/%m/%d"),
+            "altitude": self.altitude.copy(), "gps_alt": gps_alt,
+            "gps_lat": self.gps_lat.copy(), "gps_lon": self.gps_lon.copy(),
+            "heading": self.heading.copy(), "pitch": pitch, "roll": roll, "yaw": self.heading.copy(),
+            "ground_speed": ground_speed, "airspeed": airspeed, "vertical_speed": vertical_speed,
+            "accel_x": self._uniform(-0.5, 0.5), "accel_y": self._uniform(-0.5, 0.5),
+            "accel_z": self._uniform(-0.5, 0.5),
+            "gyro_x": self._uniform(-0.02, 0.02), "gyro_y": self._uniform(-0.02, 0.02),
+            "gyro_z": self._uniform(-0.02, 0.02),
+            "battery_level": self.battery_level.copy(), "battery_voltage": battery_voltage,
+            "battery_current": battery_current, "temperature_battery": temperature_battery,
+            "motor_rpm_1": motor_rpm[:, 0], "motor_rpm_2": motor_rpm[:, 1],
+            "motor_rpm_3": motor_rpm[:, 2], "motor_rpm_4": motor_rpm[:, 3],
+            "motor_temp_1": self.motor_temp[:, 0].copy(), "motor_temp_2": self.motor_temp[:, 1].copy(),
+            "motor_temp_3": self.motor_temp[:, 2].copy(), "motor_temp_4": self.motor_temp[:, 3].copy(),
+            "throttle_position": np.where(flying, self._uniform(40, 100), 0.0),
+            "payload_weight": rng.choice([0.0, 2.5, 5.0, 10.0], n),
+            "lidar_altitude": lidar_altitude,
+            "obstacle_distance": self._uniform(5, 200),
+            "sat_count": rng.integers(5, 13, n),
+            "gps_fix_type": rng.choice([2, 3], n),
+            "link_quality": self._uniform(40, 100),
+            "signal_strength": self._uniform(-110, -50),
+            "mode": mode, "system_status": system_status,
+            "mission_id": mission_id, "waypoint_id": self.waypoint_id.copy(), "event": event,
+            "vehicle_id": self.vehicle_ids,
+        }
+
+    def phase_counts(self):
+        """Jumlah kendaraan per fase, untuk log"""
+        return {PHASE_NAMES[p]: int((self.phase == p).sum()) for p in range(4)}
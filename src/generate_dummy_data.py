@@ -398,12 +398,425 @@ def generate_data_v3(total_cycles=10, data_per_cycle=600, anomaly_ratio=0.20, ou
     
     return df
 
+# ============================================================
+# v4: generator ter-vektorisasi + paralel, output Parquet terpartisi
+# ============================================================
+
+# Urutan kolom sama dengan templat v3 (dan CSV lama)
+OUTPUT_COLUMNS = [
+    "timestamp", "dt", "date", "altitude", "gps_alt", "gps_lat", "gps_lon",
+    "heading", "pitch", "roll", "yaw", "ground_speed", "airspeed", "vertical_speed",
+    "accel_x", "accel_y", "accel_z", "gyro_x", "gyro_y", "gyro_z",
+    "battery_level", "battery_voltage", "battery_current", "temperature_battery",
+    "motor_rpm_1", "motor_rpm_2", "motor_rpm_3", "motor_rpm_4",
+    "motor_temp_1", "motor_temp_2", "motor_temp_3", "motor_temp_4",
+    "throttle_position", "payload_weight", "lidar_altitude", "obstacle_distance",
+    "sat_count", "gps_fix_type", "link_quality", "signal_strength",
+    "mode", "system_status", "mission_id", "waypoint_id", "event"
+]
+
+ANOMALY_TYPES = [
+    "motor_fail", "sensor_glitch", "battery_drop",
+    "communication_loss", "gps_drift", "imu_spike",
+    "overheating", "stall_warning", "vibration_high"
+]
+# Anomali yang menyetel system_status="Error" (sisanya "Warning")
+ERROR_ANOMALIES = {"motor_fail", "communication_loss", "overheating"}
+
+CLIMB, CRUISE, DESCEND, LANDED = 0, 1, 2, 3
+
+
+def phase_lengths(data_per_cycle):
+    """
+    Jumlah baris per fase dalam satu cycle, persis seperti loop v3:
+    CLIMB 30%, CRUISE 40%, DESCEND 25%, LANDED 5% (baris LANDED terakhir
+    memicu 'break' sehingga tidak ikut tersimpan).
+    """
+    lengths = [
+        int(data_per_cycle * 0.30),
+        int(data_per_cycle * 0.40),
+        int(data_per_cycle * 0.25),
+        max(0, int(data_per_cycle * 0.05) - 1),
+    ]
+    # Loop v3 berhenti setelah data_per_cycle iterasi
+    remaining = data_per_cycle
+    for i, length in enumerate(lengths):
+        lengths[i] = min(length, remaining)
+        remaining -= lengths[i]
+    return lengths
+
+
+def _reflected_walk(start, increments, floor=0.0):
+    """
+    x_i = max(floor, x_{i-1} + increments_i) tanpa loop Python
+    (rekursi Lindley: x_n = S_n - min(0, min_k S_k), relatif terhadap floor).
+    """
+    if len(increments) == 0:
+        return np.empty(0)
+    walk = (start - floor) + np.cumsum(increments)
+    return walk - np.minimum(0, np.minimum.accumulate(walk)) + floor
+
+
+def _segment_altitude(start, change, glitch):
+    """
+    Ketinggian kumulatif satu fase: alt_i = max(0, alt_{i-1} + change_i) + glitch_i.
+    Glitch sensor ditambahkan SETELAH update fase sehingga terbawa ke baris berikutnya.
+    """
+    carried = np.concatenate([[0.0], glitch[:-1]]) if len(glitch) else glitch
+    return _reflected_walk(start, change + carried) + glitch
+
+
+def _format_times(timestamps):
+    """Kolom dt ("YYYY/MM/DD HH:MM:SS") dan date ("YYYY/MM/DD") dari unix timestamp, waktu lokal"""
+    if len(timestamps) == 0:
+        return np.empty(0, dtype=object), np.empty(0, dtype=object)
+    # Offset zona waktu lokal diambil sekali per cycle (cycle hanya berdurasi menit)
+    first = datetime.fromtimestamp(int(timestamps[0]))
+    local = np.datetime64(first.replace(microsecond=0), "s") + (timestamps - timestamps[0]).astype("timedelta64[s]")
+    iso = np.datetime_as_string(local, unit="s")
+    dt = np.char.replace(np.char.replace(iso, "-", "/"), "T", " ")
+    return dt.astype(object), dt.astype("U10").astype(object)
+
+
+def generate_cycle(cycle, n_anomalies, seed, base_timestamp, data_per_cycle=600, target_altitude=5000.0):
+    """
+    Satu cycle penerbangan lengkap (CLIMB -> CRUISE -> DESCEND -> LANDED) sebagai
+    dict kolom -> array NumPy, dengan tepat n_anomalies baris anomali (hanya saat terbang).
+    """
+    rng = np.random.default_rng(seed)
+    lengths = phase_lengths(data_per_cycle)
+    n_climb, n_cruise, n_descend, n_landed = lengths
+    n = sum(lengths)
+
+    phase = np.repeat(np.arange(4, dtype=np.int8), lengths)
+    flying = phase != LANDED
+    climb_rate = target_altitude / n_climb
+    descend_rate = -target_altitude / n_descend
+
+    def uniform(low, high, size=n):
+        return rng.uniform(low, high, size)
+
+    # --- Pilih baris & jenis anomali lebih dulu (efeknya ada yang kumulatif) ---
+    flying_rows = np.flatnonzero(flying)
+    anomaly_rows = np.sort(rng.choice(flying_rows, size=min(n_anomalies, len(flying_rows)), replace=False))
+    anomaly_kind = np.full(n, -1, dtype=np.int8)
+    anomaly_kind[anomaly_rows] = rng.integers(0, len(ANOMALY_TYPES), len(anomaly_rows))
+    is_kind = {name: anomaly_kind == i for i, name in enumerate(ANOMALY_TYPES)}
+
+    # --- Ketinggian (kumulatif per fase, glitch terbawa ke baris berikutnya) ---
+    glitch = np.where(is_kind["sensor_glitch"], uniform(100, 300), 0.0)
+    climb_end, cruise_end, descend_end = n_climb, n_climb + n_cruise, n_climb + n_cruise + n_descend
+
+    altitude = np.zeros(n)
+    vertical_speed = np.zeros(n)
+
+    change = climb_rate + uniform(-0.5, 0.5, n_climb)
+    altitude[:climb_end] = _segment_altitude(0.0, change, glitch[:climb_end])
+    vertical_speed[:climb_end] = change
+    if n_climb:
+        altitude[climb_end - 1] = target_altitude + glitch[climb_end - 1]
+        vertical_speed[climb_end - 1] = 0
+
+    change = uniform(-1.5, 1.5, n_cruise)
+    altitude[climb_end:cruise_end] = target_altitude + change + glitch[climb_end:cruise_end]
+    vertical_speed[climb_end:cruise_end] = change
+
+    descend_start = altitude[cruise_end - 1] if cruise_end else 0.0
+    change = descend_rate + uniform(-0.5, 0.5, n_descend)
+    altitude[cruise_end:descend_end] = _segment_altitude(descend_start, change, glitch[cruise_end:descend_end])
+    vertical_speed[cruise_end:descend_end] = change
+    if n_descend:
+        altitude[descend_end - 1] = glitch[descend_end - 1]
+        vertical_speed[descend_end - 1] = 0
+
+    altitude_before_glitch = altitude - glitch
+
+    # --- Kecepatan, sensor altitude, posisi & orientasi ---
+    ground_speed = np.where(flying, uniform(10, 70), 0.0)
+    airspeed = np.where(flying, ground_speed + uniform(-2, 2), 0.0)
+    gps_alt = altitude_before_glitch + uniform(-2, 2)
+    lidar_altitude = altitude_before_glitch + uniform(-0.5, 0.5)
+
+    heading = (90.0 + np.cumsum(np.where(flying, uniform(-5, 5), 0.0))) % 360
+    distance = ground_speed / 111000.0
+    drift = is_kind["gps_drift"]
+    gps_lat = -7.27 + (cycle - 1) * 0.02 + np.cumsum(
+        np.sin(np.deg2rad(heading)) * distance + np.where(drift, uniform(-0.1, 0.1), 0.0))
+    gps_lon = 112.74 + (cycle - 1) * 0.02 + np.cumsum(
+        np.cos(np.deg2rad(heading)) * distance + np.where(drift, uniform(-0.1, 0.1), 0.0))
+    pitch = np.where(flying, uniform(-10, 10), 0.0)
+    roll = np.where(flying, uniform(-20, 20), 0.0)
+
+    accel = rng.uniform(-0.5, 0.5, (3, n))
+    gyro = rng.uniform(-0.02, 0.02, (3, n))
+
+    # --- Baterai (kumulatif; battery_drop ikut mengurangi secara permanen) ---
+    decrease = np.where(flying, uniform(0.05, 0.10), 0.0)
+    drop = np.where(is_kind["battery_drop"], uniform(20, 40), 0.0)
+    battery_level = _reflected_walk(100.0, -(decrease + drop), floor=5.0)
+    battery_before = np.concatenate([[100.0], battery_level[:-1]])
+    battery_voltage = np.where(
+        is_kind["battery_drop"],
+        14.8 * (battery_level / 100) - uniform(1, 3),
+        14.8 * (np.maximum(5, battery_before - decrease) / 100) + uniform(-0.1, 0.1)
+    )
+    battery_current = np.where(flying, uniform(5, 25), 0.0)
+    temperature_battery = uniform(20, 45)
+
+    # --- Motor ---
+    motor_rpm = np.where(flying, rng.uniform(3000, 8000, (4, n)), 0.0)
+    motor_temp = np.where(flying, rng.uniform(40, 90, (4, n)), 25.0)
+
+    throttle_position = np.where(flying, uniform(40, 100), 0.0)
+    payload_weight = rng.choice([0.0, 2.5, 5.0, 10.0], n)
+    obstacle_distance = uniform(5, 200)
+    sat_count = rng.integers(5, 13, n)
+    gps_fix_type = rng.choice([2, 3], n)
+    link_quality = uniform(40, 100)
+    signal_strength = uniform(-110, -50)
+
+    mode = np.array(["Auto", "Auto", "RTL", "Manual"], dtype=object)[phase]
+    system_status = np.array(["Normal", "Normal", "Normal", "Landed"], dtype=object)[phase]
+    # Status DESCEND memakai baterai sebelum dikurangi pada baris tersebut
+    system_status[(phase == DESCEND) & (battery_before < 15)] = "Warning"
+
+    # --- Efek anomali per baris ---
+    event = np.full(n, "", dtype=object)
+
+    rows = np.flatnonzero(is_kind["motor_fail"])
+    motor_num = rng.integers(1, 5, len(rows))
+    motor_rpm[motor_num - 1, rows] = 0
+    motor_temp[motor_num - 1, rows] = 150.0
+    event[rows] = [f"Motor {m} Failure" for m in motor_num]
+
+    mask = is_kind["sensor_glitch"]
+    gps_alt[mask] = altitude[mask] + uniform(-50, 50, mask.sum())
+    event[mask] = "Altitude Sensor Glitch"
+
+    event[is_kind["battery_drop"]] = "Sudden Battery Drop"
+
+    mask = is_kind["communication_loss"]
+    link_quality[mask] = uniform(0, 10, mask.sum())
+    signal_strength[mask] = uniform(-120, -100, mask.sum())
+    sat_count[mask] = rng.integers(0, 4, mask.sum())
+    event[mask] = "Communication Loss"
+
+    mask = is_kind["gps_drift"]
+    gps_fix_type[mask] = 1
+    event[mask] = "GPS Drift"
+
+    mask = is_kind["imu_spike"]
+    accel[:, mask] = rng.uniform(-10, 10, (3, mask.sum()))
+    gyro[:, mask] = rng.uniform(-1, 1, (3, mask.sum()))
+    event[mask] = "IMU Sensor Spike"
+
+    mask = is_kind["overheating"]
+    motor_temp[:, mask] += rng.uniform(30, 60, (4, mask.sum()))
+    temperature_battery[mask] += uniform(20, 40, mask.sum())
+    event[mask] = "System Overheating"
+
+    mask = is_kind["stall_warning"]
+    airspeed[mask] = uniform(0, 5, mask.sum())
+    ground_speed[mask] = uniform(0, 5, mask.sum())
+    vertical_speed[mask] = uniform(-10, -5, mask.sum())
+    event[mask] = "Stall Warning"
+
+    mask = is_kind["vibration_high"]
+    motor_rpm[:, mask] *= rng.uniform(1.2, 1.5, (4, mask.sum()))
+    event[mask] = "High Vibration"
+
+    for name, mask in is_kind.items():
+        system_status[mask] = "Error" if name in ERROR_ANOMALIES else "Warning"
+
+    # Suhu motor saat LANDED turun 0.1 per baris dari suhu baris terbang terakhir
+    if n_landed:
+        last_temp = motor_temp[:, descend_end - 1:descend_end] if descend_end else np.full((4, 1), 25.0)
+        motor_temp[:, descend_end:] = np.maximum(25, last_temp - 0.1 * np.arange(1, n_landed + 1))
+
+    timestamp = base_timestamp + (cycle - 1) * 600 + np.arange(n, dtype=np.int64)
+    dt, date = _format_times(timestamp)
+
+    data = {
+        "timestamp": timestamp, "dt": dt, "date": date,
+        "altitude": altitude, "gps_alt": gps_alt, "gps_lat": gps_lat, "gps_lon": gps_lon,
+        "heading": heading, "pitch": pitch, "roll": roll, "yaw": heading.copy(),
+        "ground_speed": ground_speed, "airspeed": airspeed, "vertical_speed": vertical_speed,
+        "accel_x": accel[0], "accel_y": accel[1], "accel_z": accel[2],
+        "gyro_x": gyro[0], "gyro_y": gyro[1], "gyro_z": gyro[2],
+        "battery_level": battery_level, "battery_voltage": battery_voltage,
+        "battery_current": battery_current, "temperature_battery": temperature_battery,
+        "throttle_position": throttle_position, "payload_weight": payload_weight,
+        "lidar_altitude": lidar_altitude, "obstacle_distance": obstacle_distance,
+        "sat_count": sat_count, "gps_fix_type": gps_fix_type,
+        "link_quality": link_quality, "signal_strength": signal_strength,
+        "mode": mode, "system_status": system_status,
+        "mission_id": np.full(n, f"M{cycle:03d}", dtype=object),
+        "waypoint_id": np.arange(1, n + 1, dtype=np.int64) % 20,
+        "event": event,
+    }
+    for i in range(4):
+        data[f"motor_rpm_{i + 1}"] = motor_rpm[i]
+        data[f"motor_temp_{i + 1}"] = motor_temp[i]
+    return {col: data[col] for col in OUTPUT_COLUMNS}
+
+
+def _generate_chunk(chunk_index, cycles, anomaly_counts, seeds, base_timestamp, data_per_cycle, out_dir):
+    """
+    Worker process: generate sekelompok cycle lalu tulis langsung ke Parquet,
+    satu file per hari (partisi day=YYYY-MM-DD). Hanya statistik yang dikirim balik.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parts = [
+        generate_cycle(cycle, count, seed, base_timestamp, data_per_cycle)
+        for cycle, count, seed in zip(cycles, anomaly_counts, seeds)
+    ]
+    table = pa.table({col: np.concatenate([part[col] for part in parts]) for col in OUTPUT_COLUMNS})
+
+    events = table.column("event").to_numpy(zero_copy_only=False)
+    days = table.column("date").to_numpy(zero_copy_only=False)
+    for day in pd.unique(days):
+        partition_dir = os.path.join(out_dir, f"day={day.replace('/', '-')}")
+        os.makedirs(partition_dir, exist_ok=True)
+        day_rows = np.flatnonzero(days == day)
+        pq.write_table(table.take(day_rows), os.path.join(partition_dir, f"part-{chunk_index:05d}.parquet"))
+
+    anomalies = events[events != ""]
+    return {
+        "rows": table.num_rows,
+        "anomalies": len(anomalies),
+        "distribution": pd.Series(anomalies, dtype=object).value_counts().to_dict(),
+        "max_altitude": float(np.max(table.column("altitude").to_numpy())),
+    }
+
+
+def generate_data_v4(total_cycles=10, data_per_cycle=600, anomaly_ratio=0.20,
+                     out_dir="data/telemetry_parquet", workers=None, cycles_per_file=100, seed=None,
+                     base_timestamp=None):
+    """
+    Versi ter-vektorisasi dari generate_data_v3: setiap cycle dibuat sebagai array
+    NumPy per kolom, cycle dibagi ke process pool, dan hasilnya ditulis sebagai
+    Parquet terpartisi per hari (out_dir/day=YYYY-MM-DD/part-NNNNN.parquet).
+
+    Target anomali sama seperti v3 (anomaly_ratio x total_cycles x data_per_cycle),
+    dibagi rata ke setiap cycle sehingga jumlahnya tepat dan tidak bergantung
+    pada urutan eksekusi worker. Dengan seed yang sama hasilnya identik
+    berapa pun jumlah worker.
+
+    Baca kembali dengan: pd.read_parquet(out_dir).sort_values("timestamp")
+
+    Parameters:
+    - total_cycles: Jumlah cycle penerbangan lengkap
+    - data_per_cycle: Jumlah data points (baris) per cycle
+    - anomaly_ratio: Rasio anomali dari total data (0.20 = 20%)
+    - out_dir: Direktori output dataset Parquet
+    - workers: Jumlah proses (default: jumlah CPU)
+    - cycles_per_file: Jumlah cycle per tugas worker / file Parquet
+    - seed: Seed RNG (None = acak)
+    - base_timestamp: Unix timestamp baris pertama (None = sekarang); isi bersama
+      seed agar dataset dapat diulang persis
+
+    Partisi day=* lama di out_dir dihapus dulu supaya part dari run sebelumnya
+    tidak ikut terbaca.
+    """
+    import glob
+    import shutil
+    from concurrent.futures import ProcessPoolExecutor
+
+    for partition in glob.glob(os.path.join(out_dir, "day=*")):
+        shutil.rmtree(partition)
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.perf_counter()
+    if base_timestamp is None:
+        base_timestamp = int(datetime.now().timestamp())
+
+    total_data_points = total_cycles * data_per_cycle
+    target_anomalies = int(total_data_points * anomaly_ratio)
+    # Bagi target anomali ke setiap cycle (sisa pembagian ke cycle-cycle awal)
+    per_cycle = np.full(total_cycles, target_anomalies // total_cycles)
+    per_cycle[:target_anomalies % total_cycles] += 1
+
+    cycle_seeds = np.random.SeedSequence(seed).spawn(total_cycles)
+    cycles = np.arange(1, total_cycles + 1)
+    chunks = [
+        (i, cycles[lo:lo + cycles_per_file].tolist(), per_cycle[lo:lo + cycles_per_file].tolist(),
+         cycle_seeds[lo:lo + cycles_per_file], base_timestamp, data_per_cycle, out_dir)
+        for i, lo in enumerate(range(0, total_cycles, cycles_per_file))
+    ]
+    workers = workers or os.cpu_count() or 1
+
+    print(f"🚁 Generating {total_cycles} complete flight cycles (vectorized, {workers} workers)...")
+    print(f"Phase distribution: {dict(zip(['CLIMB', 'CRUISE', 'DESCEND', 'LANDED'], phase_lengths(data_per_cycle)))}")
+    print(f"🎯 Target anomalies: {target_anomalies} ({anomaly_ratio*100}% of {total_data_points} total data)")
+    print("=" * 70)
+
+    total_rows, anomaly_count, max_altitude = 0, 0, 0.0
+    distribution = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_generate_chunk, *chunk) for chunk in chunks]
+        for done, future in enumerate(futures, start=1):
+            stats = future.result()
+            total_rows += stats["rows"]
+            anomaly_count += stats["anomalies"]
+            max_altitude = max(max_altitude, stats["max_altitude"])
+            for event, count in stats["distribution"].items():
+                distribution[event] = distribution.get(event, 0) + count
+            print(f"   ✓ Chunk {done}/{len(chunks)}: {total_rows} rows, {anomaly_count} anomalies")
+
+    elapsed = time.perf_counter() - started
+    actual_anomaly_ratio = anomaly_count / total_rows if total_rows else 0.0
+
+    print("\n" + "=" * 70)
+    print("📊 GENERATION SUMMARY")
+    print("=" * 70)
+    print(f"✅ Successfully generated {total_rows} rows in {elapsed:.1f}s ({total_rows / elapsed:,.0f} rows/s)")
+    print(f"📁 Saved to: {out_dir} (Parquet, partitioned by day)")
+    print(f"📈 Max altitude: {max_altitude:.1f}m")
+    print(f"🚨 ABNORMALITIES SUMMARY:")
+    print(f"   • Target anomalies: {target_anomalies} ({anomaly_ratio*100}%)")
+    print(f"   • Actual anomalies: {anomaly_count} ({actual_anomaly_ratio*100:.1f}%)")
+    print(f"   • Distribution: {distribution}")
+
+    return {
+        "rows": total_rows,
+        "anomalies": anomaly_count,
+        "target_anomalies": target_anomalies,
+        "distribution": distribution,
+        "out_dir": out_dir,
+    }
+
 if __name__ == "__main__":
-    # Generate 30 cycle lengkap dengan 600 data per cycle = 18,000 baris total
-    # Dengan 20% anomali = 3,600 data anomali
-    df = generate_data_v3(
-        total_cycles=30, 
-        data_per_cycle=600,
-        anomaly_ratio=0.20,  # 20% anomali
-        out_path="data/telemetry_data1.csv"
-    )
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate UAV training telemetry")
+    parser.add_argument("--cycles", type=int, default=30, help="Jumlah cycle penerbangan (default: 30)")
+    parser.add_argument("--data-per-cycle", type=int, default=600, help="Baris per cycle (default: 600)")
+    parser.add_argument("--anomaly-ratio", type=float, default=0.20, help="Rasio anomali (default: 0.20)")
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah proses (default: jumlah CPU)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed RNG untuk hasil yang dapat diulang")
+    parser.add_argument("--base-timestamp", type=int, default=None,
+                        help="Unix timestamp baris pertama (default: sekarang)")
+    parser.add_argument("--out", default=None,
+                        help="Output: direktori Parquet (default: data/telemetry_parquet), atau file .csv untuk generator v3")
+    args = parser.parse_args()
+
+    if args.out and args.out.endswith(".csv"):
+        # Generator lama (satu proses, baris demi baris) untuk CSV
+        df = generate_data_v3(
+            total_cycles=args.cycles,
+            data_per_cycle=args.data_per_cycle,
+            anomaly_ratio=args.anomaly_ratio,
+            out_path=args.out
+        )
+    else:
+        # Default: 30 cycle x 600 data = 18,000 baris, 20% anomali
+        generate_data_v4(
+            total_cycles=args.cycles,
+            data_per_cycle=args.data_per_cycle,
+            anomaly_ratio=args.anomaly_ratio,
+            out_dir=args.out or "data/telemetry_parquet",
+            workers=args.workers,
+            seed=args.seed,
+            base_timestamp=args.base_timestamp
+        )
@@ -1,20 +1,134 @@
 import sqlite3
 import time
 import random
+import argparse
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import os
 
+from fleet_simulator import FleetSimulator
+
 # --- Konfigurasi Path ---
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(BASE_DIR)
-DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+# PUMA_DATA_DIR mengarahkan produser ke direktori data lain (mis. uji beban pada DB sementara)
+DATA_DIR = os.environ.get("PUMA_DATA_DIR", os.path.join(PROJECT_ROOT, "data"))
 DB_PATH = os.path.join(DATA_DIR, "uav_telemetry.db")
 CSV_PATH = os.path.join(DATA_DIR, "telemetry_data.csv")
 # ------------------------
 
+DEFAULT_VEHICLE_ID = "UAV-001"
+
+# --- Skema & Migrasi ---
+# Setiap migrasi dijalankan sekali, berurutan, dan dicatat di tabel schema_version.
+# id INTEGER PRIMARY KEY AUTOINCREMENT = alias rowid yang monoton (tidak pernah dipakai ulang),
+# sehingga "N baris terbaru" cukup membaca ujung B-tree tanpa full scan + sort.
+TELEMETRY_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_telemetry_timestamp ON telemetry (timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_telemetry_mission_id ON telemetry (mission_id)",
+    "CREATE INDEX IF NOT EXISTS idx_telemetry_event ON telemetry (event)",
+]
+
+
+def _telemetry_columns(cursor):
+    cursor.execute("PRAGMA table_info(telemetry)")
+    return [(row[1], row[2]) for row in cursor.fetchall()]
+
+
+def _migration_1_primary_key(cursor):
+    """Tambah kunci monoton 'id' (mempertahankan rowid lama) dan indeks sekunder"""
+    columns = _telemetry_columns(cursor)
+    if "id" not in [name for name, _ in columns]:
+        column_defs = ", ".join(f"{name} {col_type}" for name, col_type in columns)
+        column_names = ", ".join(name for name, _ in columns)
+        cursor.execute(
+            f"CREATE TABLE telemetry_migrated (id INTEGER PRIMARY KEY AUTOINCREMENT, {column_defs})"
+        )
+        cursor.execute(
+            f"INSERT INTO telemetry_migrated (id, {column_names}) "
+            f"SELECT rowid, {column_names} FROM telemetry ORDER BY rowid"
+        )
+        cursor.execute("DROP TABLE telemetry")
+        cursor.execute("ALTER TABLE telemetry_migrated RENAME TO telemetry")
+
+    for sql in TELEMETRY_INDEXES:
+        cursor.execute(sql)
+
+
+def _migration_2_vehicle_id(cursor):
+    """Kolom vehicle_id untuk mode armada (multi-UAV)"""
+    if "vehicle_id" not in [name for name, _ in _telemetry_columns(cursor)]:
+        cursor.execute("ALTER TABLE telemetry ADD COLUMN vehicle_id TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_telemetry_vehicle_id ON telemetry (vehicle_id, id)")
+
+
+def _migration_3_row_count(cursor):
+    """Jumlah baris telemetry dipelihara trigger, agar API tidak perlu COUNT(*)"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS telemetry_row_count (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        total INTEGER NOT NULL
+    )
+    """)
+    cursor.execute("INSERT OR REPLACE INTO telemetry_row_count (id, total) SELECT 0, COUNT(*) FROM telemetry")
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS telemetry_row_count_insert AFTER INSERT ON telemetry
+    BEGIN UPDATE telemetry_row_count SET total = total + 1 WHERE id = 0; END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS telemetry_row_count_delete AFTER DELETE ON telemetry
+    BEGIN UPDATE telemetry_row_count SET total = total - 1 WHERE id = 0; END
+    """)
+
+
+# (versi, deskripsi, fungsi)
+SCHEMA_MIGRATIONS = [
+    (1, "telemetry primary key + indexes", _migration_1_primary_key),
+    (2, "telemetry vehicle_id", _migration_2_vehicle_id),
+    (3, "telemetry row count", _migration_3_row_count),
+]
+
+
+def migrate_db(conn):
+    """
+    Jalankan migrasi skema yang belum diterapkan (in-place, satu transaksi per migrasi).
+    Mengembalikan versi skema saat ini.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TEXT
+    )
+    """)
+    conn.commit()
+
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    current_version = cursor.fetchone()[0]
+
+    for version, description, migrate in SCHEMA_MIGRATIONS:
+        if version <= current_version:
+            continue
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            migrate(cursor)
+            cursor.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (version, description, datetime.now().strftime("%Y/%m/%d %H:%M:%S"))
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        current_version = version
+        print(f"✓ Migrasi skema v{version} diterapkan: {description}")
+
+    return current_version
+
+
 def init_db():
     """
     Inisialisasi database SQLite dan membuat tabel telemetry.
@@ -47,14 +161,15 @@ def init_db():
     def get_sqlite_type(col_name):
         if col_name in ["timestamp", "sat_count", "gps_fix_type", "waypoint_id"]:
             return "INTEGER"
-        elif col_name in ["dt", "date", "mode", "system_status", "mission_id", "event"]:
+        elif col_name in ["dt", "date", "mode", "system_status", "mission_id", "event", "vehicle_id"]:
             return "TEXT"
         else:
             return "REAL"
     
-    column_defs = [f"{col} {get_sqlite_type(col)}" for col in columns]
+    column_defs = [f"{col} {get_sqlite_type(col)}" for col in columns if col != "id"]
     create_table_sql = f"""
     CREATE TABLE IF NOT EXISTS telemetry (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
         {', '.join(column_defs)}
     )
     """
@@ -62,6 +177,9 @@ def init_db():
     cursor.execute(create_table_sql)
     conn.commit()
     print("✓ Tabel 'telemetry' berhasil dibuat/diverifikasi")
+
+    schema_version = migrate_db(conn)
+    print(f"✓ Versi skema database: v{schema_version}")
     
     if os.path.exists(csv_path):
         try:
@@ -76,12 +194,105 @@ def init_db():
             print(f"⚠ Error saat memuat data historis: {e}")
     
     conn.close()
+    columns = [col for col in columns if col != "id"]
+    if "vehicle_id" not in columns:
+        columns.append("vehicle_id")
     return columns
 
 
+# --- Jalur Tulis (Batched / Group Commit) ---
+SYNCHRONOUS_MODES = ["OFF", "NORMAL", "FULL", "EXTRA"]
+
+
+def configure_writer_connection(conn, synchronous="NORMAL", wal_autocheckpoint=1000, busy_timeout_ms=5000):
+    """
+    Atur PRAGMA koneksi penulis.
+    WAL + synchronous=NORMAL: fsync hanya saat checkpoint, bukan setiap commit
+    (tetap aman dari korupsi; yang hilang saat mati listrik hanya commit terakhir).
+    """
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL;")
+    cursor.execute(f"PRAGMA synchronous={synchronous};")
+    cursor.execute(f"PRAGMA wal_autocheckpoint={int(wal_autocheckpoint)};")
+    cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)};")
+    return cursor.execute("PRAGMA journal_mode;").fetchone()[0]
+
+
+class TelemetryWriter:
+    """
+    Buffer baris telemetri lalu tulis dengan satu executemany + satu commit per batch.
+    Flush terjadi jika buffer mencapai batch_size ATAU flush_interval detik terlewati.
+    """
+
+    def __init__(self, conn, columns, batch_size=1, flush_interval=1.0):
+        self.conn = conn
+        self.columns = list(columns)
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        # Statement disusun sekali; sqlite3 menyimpan hasil prepare-nya di cache koneksi
+        placeholders = ",".join("?" for _ in self.columns)
+        self.insert_sql = f"INSERT INTO telemetry ({','.join(self.columns)}) VALUES ({placeholders})"
+
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._started = time.monotonic()
+        self.rows_written = 0
+        self.flushes = 0
+
+    def write(self, row):
+        """Tambah satu baris (dict) ke buffer; mengembalikan True jika batch di-flush"""
+        self._buffer.append(tuple(row.get(col) for col in self.columns))
+        if (len(self._buffer) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        """Tulis semua baris di buffer dalam satu transaksi"""
+        if self._buffer:
+            self.conn.executemany(self.insert_sql, self._buffer)
+            self.conn.commit()
+            self.rows_written += len(self._buffer)
+            self.flushes += 1
+            self._buffer.clear()
+        self._last_flush = time.monotonic()
+
+    def write_batch(self, data):
+        """
+        Tambah banyak baris sekaligus dari dict kolom -> array (mode armada).
+        Nilai skalar di-broadcast ke semua baris; array NumPy diubah ke tipe Python via tolist().
+        """
+        n = next((len(v) for v in data.values() if hasattr(v, "__len__") and not isinstance(v, str)), 1)
+        values = []
+        for col in self.columns:
+            value = data.get(col)
+            if hasattr(value, "tolist"):
+                values.append(value.tolist())
+            elif hasattr(value, "__len__") and not isinstance(value, str):
+                values.append(list(value))
+            else:
+                values.append([value] * n)
+        self._buffer.extend(zip(*values))
+        if (len(self._buffer) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+            return True
+        return False
+
+    @property
+    def pending(self):
+        return len(self._buffer)
+
+    def inserts_per_second(self):
+        """Laju insert rata-rata (sustained) sejak writer dibuat"""
+        elapsed = time.monotonic() - self._started
+        return self.rows_written / elapsed if elapsed > 0 else 0.0
+
+
 def get_last_row_template(cursor, columns):
     """Mengambil baris terakhir dari database sebagai templat"""
-    cursor.execute("SELECT * FROM telemetry ORDER BY timestamp DESC LIMIT 1")
+    cursor.execute(f"SELECT {', '.join(columns)} FROM telemetry ORDER BY id DESC LIMIT 1")
     row = cursor.fetchone()
     
     if row:
@@ -107,7 +318,8 @@ def get_last_row_template(cursor, columns):
             "sat_count": 10, "gps_fix_type": 3,
             "link_quality": 80.0, "signal_strength": -80.0,
             "mode": "Auto", "system_status": "Landed",
-            "mission_id": "M002", "waypoint_id": 0, "event": ""
+            "mission_id": "M002", "waypoint_id": 0, "event": "",
+            "vehicle_id": DEFAULT_VEHICLE_ID
         }
 
 
@@ -302,30 +514,64 @@ def generate_new_telemetry(template, state):
     return new_data, state
 
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="UAV Telemetry Producer")
+    parser.add_argument("--rate", type=float, default=1.0,
+                        help="Laju sampel telemetri dalam Hz (default: 1)")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Flush setelah N baris (default: sama dengan --rate, minimal 1)")
+    parser.add_argument("--flush-interval", type=float, default=1.0,
+                        help="Flush paling lambat setiap N detik (default: 1.0)")
+    parser.add_argument("--synchronous", choices=SYNCHRONOUS_MODES, default="NORMAL",
+                        help="PRAGMA synchronous untuk koneksi penulis (default: NORMAL)")
+    parser.add_argument("--wal-autocheckpoint", type=int, default=1000,
+                        help="PRAGMA wal_autocheckpoint dalam halaman (default: 1000)")
+    parser.add_argument("--fleet", type=int, default=0,
+                        help="Mode armada: simulasikan N UAV sekaligus (vektorisasi NumPy), N baris per tick")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed RNG untuk mode armada")
+    parser.add_argument("--report-interval", type=float, default=5.0,
+                        help="Interval laporan inserts/sec dalam detik (default: 5)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Loop utama produser data telemetri"""
+    args = parse_args(argv)
+    rows_per_tick = max(1, args.fleet)
+    batch_size = args.batch_size or max(1, int(args.rate * rows_per_tick))
+
     print("🚁 UAV Telemetry Producer dimulai...")
     print("=" * 50)
     print(f"Database target: {DB_PATH}")
     print(f"CSV sumber: {CSV_PATH}")
+    print(f"Laju: {args.rate:g} Hz | Batch: {batch_size} baris / {args.flush_interval:g} s | synchronous={args.synchronous}")
     
     columns = init_db()
     
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
-    # --- PERBAIKAN DATABASE LOCK (BARU) ---
-    # Aktifkan mode WAL (Write-Ahead Logging)
-    # Ini mengizinkan 'app.py' (pembaca) berjalan TANPA diblokir oleh 'uav_producer.py' (penulis)
+    # --- PERBAIKAN DATABASE LOCK ---
+    # Mode WAL mengizinkan 'api_server.py' (pembaca) berjalan TANPA diblokir oleh produser (penulis)
     try:
-        cursor.execute("PRAGMA journal_mode=WAL;")
-        print("✓ Mode WAL (Write-Ahead Logging) diaktifkan untuk mengatasi database lock.")
+        journal_mode = configure_writer_connection(
+            conn, synchronous=args.synchronous, wal_autocheckpoint=args.wal_autocheckpoint
+        )
+        print(f"✓ Mode jurnal: {journal_mode.upper()} | synchronous={args.synchronous}")
     except Exception as e:
-        print(f"⚠ Peringatan: Gagal mengaktifkan mode WAL. {e}")
+        print(f"⚠ Peringatan: Gagal mengatur PRAGMA penulis. {e}")
     # -------------------------------
+
+    writer = TelemetryWriter(conn, columns, batch_size=batch_size, flush_interval=args.flush_interval)
+
+    if args.fleet > 0:
+        run_fleet(args, conn, writer)
+        return
     
     # PANGGILAN PERTAMA (DAN SATU-SATUNYA)
     template = get_last_row_template(cursor, columns)
+    template["vehicle_id"] = template.get("vehicle_id") or DEFAULT_VEHICLE_ID
     
     # === Setting Misi 5000m ===
     cruise_time_seconds = random.randint(120, 180) # Acak 2-3 menit (120-180 detik)
@@ -368,39 +614,99 @@ def main():
     print("\n🔄 Memulai loop produser (Ctrl+C untuk berhenti)...")
     print("=" * 50)
     
+    tick = 1.0 / args.rate if args.rate > 0 else 0.0
+    next_tick = time.monotonic()
+    next_report = time.monotonic() + args.report_interval
+
     try:
         while True:
             new_data, flight_state = generate_new_telemetry(template, flight_state)
             
-            values = []
-            for col in columns:
-                values.append(new_data.get(col))
-
-            placeholders = ','.join(['?' for _ in columns])
-            insert_sql = f"INSERT INTO telemetry ({','.join(columns)}) VALUES ({placeholders})"
-            
-            cursor.execute(insert_sql, values)
-            conn.commit()
+            writer.write(new_data)
             
             template = new_data
             
-            timestamp_str = new_data.get("dt", "N/A")
-            altitude = new_data.get("altitude", 0)
-            battery = new_data.get("battery_level", 0)
-            status = new_data.get("system_status", "Unknown")
-            phase = flight_state["phase"]
-            
-            print(f"[{timestamp_str}] ✓ Fase: {phase} | Alt: {altitude:.1f}m | Battery: {battery:.1f}% | Status: {status}")
+            if args.rate <= 1:
+                timestamp_str = new_data.get("dt", "N/A")
+                altitude = new_data.get("altitude", 0)
+                battery = new_data.get("battery_level", 0)
+                status = new_data.get("system_status", "Unknown")
+                phase = flight_state["phase"]
+                
+                print(f"[{timestamp_str}] ✓ Fase: {phase} | Alt: {altitude:.1f}m | Battery: {battery:.1f}% | Status: {status}")
+
+            now = time.monotonic()
+            if now >= next_report:
+                print(f"📈 {writer.rows_written} baris | {writer.inserts_per_second():.1f} inserts/sec | "
+                      f"{writer.flushes} commit | Fase: {flight_state['phase']}")
+                next_report = now + args.report_interval
             
-            time.sleep(1)
+            # Jadwal tetap (bukan sleep(1) setelah kerja) agar laju tidak melorot
+            next_tick += tick
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()
             
     except KeyboardInterrupt:
         print("\n\n⚠ Produser dihentikan oleh user")
     except Exception as e:
         print(f"\n❌ Error: {e}")
     finally:
+        try:
+            writer.flush()
+        except Exception as e:
+            print(f"⚠ Gagal menulis {writer.pending} baris terakhir: {e}")
+        print(f"📊 Total {writer.rows_written} baris, rata-rata {writer.inserts_per_second():.1f} inserts/sec")
+        conn.close()
+        print("✓ Koneksi database ditutup")
+
+
+def run_fleet(args, conn, writer):
+    """Loop produser mode armada: N UAV dimajukan bersama, N baris per tick"""
+    fleet = FleetSimulator(args.fleet, seed=args.seed)
+
+    print(f"✈️  Mode armada: {fleet.n} UAV ({fleet.vehicle_ids[0]} .. {fleet.vehicle_ids[-1]}), "
+          f"target {args.rate * fleet.n:,.0f} baris/detik")
+    print("\n🔄 Memulai loop produser (Ctrl+C untuk berhenti)...")
+    print("=" * 50)
+
+    tick = 1.0 / args.rate if args.rate > 0 else 0.0
+    next_tick = time.monotonic()
+    next_report = time.monotonic() + args.report_interval
+
+    try:
+        while True:
+            writer.write_batch(fleet.step())
+
+            now = time.monotonic()
+            if now >= next_report:
+                phases = ", ".join(f"{name} {count}" for name, count in fleet.phase_counts().items())
+                print(f"📈 {writer.rows_written} baris | {writer.inserts_per_second():.1f} inserts/sec | "
+                      f"{writer.flushes} commit | {phases}")
+                next_report = now + args.report_interval
+
+            next_tick += tick
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()
+
+    except KeyboardInterrupt:
+        print("\n\n⚠ Produser dihentikan oleh user")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+    finally:
+        try:
+            writer.flush()
+        except Exception as e:
+            print(f"⚠ Gagal menulis {writer.pending} baris terakhir: {e}")
+        print(f"📊 Total {writer.rows_written} baris, rata-rata {writer.inserts_per_second():.1f} inserts/sec")
         conn.close()
         print("✓ Koneksi database ditutup")
 
+
 if __name__ == "__main__":
     main()
\ No newline at end of file